@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncio 浏览器环境采集器（直连 CDP）
+
+不经过 DrissionPage，直接通过 DevTools websocket 驱动浏览器，
+在一个事件循环里并发采集多个页面，每个页面只占用一个 CDP session，
+不需要为每个标签页开一个线程。
+
+探针与 collect.py 完全相同（见 probes.py），输出结构与
+BrowserEnvCollector.collect_all 一致。
+
+安装依赖:
+    pip install websockets
+
+用法:
+    python async_collect.py https://a.com https://b.com --address 127.0.0.1:9222
+    python async_collect.py --urls urls.txt --launch --concurrency 16 --output-dir templates/async
+
+    async with AsyncBrowserEnvCollector('127.0.0.1:9222') as collector:
+        results = await collector.collect_many(['https://a.com', 'https://b.com'])
+"""
+
+import os
+import sys
+import json
+import shutil
+import asyncio
+import argparse
+import tempfile
+import itertools
+import urllib.request
+from time import perf_counter
+from pathlib import Path
+
+from batch import read_urls, url_to_filename
+from jsonl_sink import add_sink_arguments, open_sink
+from launch_profile import (
+    FAST_START_ARGUMENTS, clone_profile, add_launch_arguments, launch_profile_from_args
+)
+from probes import (
+    build_batch_expression, unpack_batch_result, build_result, expand, layout_probes,
+    describe_layout, add_sections_arguments
+)
+from readiness import STALE_MARK, parse_strategy, async_wait_ready, add_wait_arguments
+
+try:
+    from websockets.asyncio.client import connect as ws_connect
+except ImportError:
+    print("请先安装 websockets: pip install websockets")
+    sys.exit(1)
+
+
+class CDPError(Exception):
+    """CDP 命令返回错误"""
+
+
+class CDPConnection:
+    """
+    浏览器级 CDP 连接
+
+    使用 Target.attachToTarget(flatten=True) 的扁平 session 模式，
+    所有标签页的命令和事件都复用这一条 websocket。
+    """
+
+    def __init__(self, ws_url):
+        self.ws_url = ws_url
+        self.ws = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._waiters = []
+        self._reader = None
+
+    async def connect(self):
+        self.ws = await ws_connect(self.ws_url, max_size=None, ping_interval=None)
+        self._reader = asyncio.create_task(self._read_loop())
+        return self
+
+    async def close(self):
+        if self._reader:
+            self._reader.cancel()
+        if self.ws:
+            await self.ws.close()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError('CDP 连接已关闭'))
+        self._pending.clear()
+
+    async def _read_loop(self):
+        try:
+            async for raw in self.ws:
+                message = json.loads(raw)
+                if 'id' in message:
+                    future = self._pending.pop(message['id'], None)
+                    if future and not future.done():
+                        if 'error' in message:
+                            future.set_exception(CDPError(message['error'].get('message', str(message['error']))))
+                        else:
+                            future.set_result(message.get('result', {}))
+                else:
+                    self._dispatch(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f'CDP 连接中断: {e}'))
+
+    def _dispatch(self, message):
+        method = message.get('method')
+        session_id = message.get('sessionId')
+        for waiter in list(self._waiters):
+            w_method, w_session, future = waiter
+            if w_method == method and w_session == session_id and not future.done():
+                future.set_result(message.get('params', {}))
+                self._waiters.remove(waiter)
+
+    async def send(self, method, params=None, session_id=None, timeout=30):
+        """
+        发送 CDP 命令并等待返回
+
+        Args:
+            method: CDP 方法名，如 'Runtime.evaluate'
+            params: 参数
+            session_id: 目标 session，None 表示浏览器级命令
+            timeout: 超时时间（秒）
+        """
+        message_id = next(self._ids)
+        message = {'id': message_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        await self.ws.send(json.dumps(message))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(message_id, None)
+
+    def expect_event(self, method, session_id=None):
+        """
+        预先登记要等待的事件（需在触发事件的命令之前调用）
+
+        Returns:
+            asyncio.Future: 事件参数
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((method, session_id, future))
+        return future
+
+    def discard_event(self, future):
+        self._waiters = [w for w in self._waiters if w[2] is not future]
+        if not future.done():
+            future.cancel()
+
+
+def fetch_ws_url(address, timeout=10):
+    """从 http://address/json/version 获取浏览器 websocket 地址"""
+    with urllib.request.urlopen(f'http://{address}/json/version', timeout=timeout) as resp:
+        return json.loads(resp.read().decode('utf-8'))['webSocketDebuggerUrl']
+
+
+async def launch_browser(executable='chrome', headless=True, arguments=None, timeout=20,
+                         fast_start=False, template=None):
+    """
+    启动一个带远程调试端口的浏览器
+
+    Args:
+        executable: 浏览器可执行文件路径或命令名
+        headless: 是否无头模式
+        arguments: 额外启动参数
+        timeout: 等待调试端口就绪的超时时间（秒）
+        fast_start: 追加快速启动参数（见 launch_profile.py）
+        template: 用户目录模板（由 launch_profile.py prewarm 生成），提供时从模板副本启动
+
+    Returns:
+        tuple: (process, address, user_data_dir)
+    """
+    if template is not None:
+        user_data_dir = str(clone_profile(template)[0])
+    else:
+        user_data_dir = tempfile.mkdtemp(prefix='async-collect-')
+    args = [
+        '--remote-debugging-port=0',
+        f'--user-data-dir={user_data_dir}',
+        '--no-first-run',
+        '--no-default-browser-check',
+        '--disable-blink-features=AutomationControlled',
+        '--no-sandbox',
+        '--disable-dev-shm-usage',
+    ]
+    if headless:
+        args.append('--headless=new')
+    if fast_start or template is not None:
+        args.extend(arg for arg in FAST_START_ARGUMENTS if arg not in args)
+    args.extend(arguments or [])
+
+    process = await asyncio.create_subprocess_exec(
+        shutil.which(executable) or executable, *args, 'about:blank',
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+
+    # 浏览器就绪后会把端口写入 DevToolsActivePort
+    port_file = Path(user_data_dir) / 'DevToolsActivePort'
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        if port_file.exists():
+            lines = port_file.read_text().splitlines()
+            if lines and lines[0].strip():
+                return process, f'127.0.0.1:{lines[0].strip()}', user_data_dir
+        if process.returncode is not None:
+            break
+        await asyncio.sleep(0.05)
+
+    process.kill()
+    raise RuntimeError(f'浏览器启动失败: {executable}')
+
+
+class AsyncBrowserEnvCollector:
+    """asyncio 浏览器环境采集器"""
+
+    def __init__(self, address=None, ws_url=None, concurrency=8, probes=None,
+                 wait='load', wait_timeout=10, sections=None):
+        """
+        初始化采集器
+
+        Args:
+            address: 浏览器调试地址，如 '127.0.0.1:9222'
+            ws_url: 浏览器 websocket 地址（与 address 二选一）
+            concurrency: 同时采集的页面数上限
+            probes: 探针列表，默认由 sections 决定
+            wait: 页面就绪策略（见 readiness.py）
+            wait_timeout: 就绪等待的硬性截止时间（秒）
+            sections: 只采集指定分段（见 probes.LAYOUTS['template']），None 表示全部
+        """
+        parse_strategy(wait)
+        self.address = address
+        self.ws_url = ws_url
+        self.concurrency = concurrency
+        self.wait = wait
+        self.wait_timeout = wait_timeout
+        self.sections = sections
+        self.probes = expand(probes) if probes else layout_probes('template', sections)
+        self.conn = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def start(self):
+        """连接浏览器"""
+        if not self.ws_url:
+            loop = asyncio.get_running_loop()
+            self.ws_url = await loop.run_in_executor(None, fetch_ws_url, self.address)
+        self.conn = await CDPConnection(self.ws_url).connect()
+        return self
+
+    async def stop(self):
+        """断开连接（不关闭浏览器）"""
+        if self.conn:
+            await self.conn.close()
+            self.conn = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def _open_target(self):
+        target = await self.conn.send('Target.createTarget', {'url': 'about:blank'})
+        target_id = target['targetId']
+        attached = await self.conn.send('Target.attachToTarget', {'targetId': target_id, 'flatten': True})
+        session_id = attached['sessionId']
+        await self.conn.send('Page.enable', session_id=session_id)
+        return target_id, session_id
+
+    async def _close_target(self, target_id):
+        try:
+            await self.conn.send('Target.closeTarget', {'targetId': target_id}, timeout=5)
+        except Exception:
+            pass
+
+    async def _send_navigate(self, session_id, url, timeout):
+        result = await self.conn.send('Page.navigate', {'url': url}, session_id, timeout)
+        if result.get('errorText'):
+            raise CDPError(f"导航失败: {result['errorText']}")
+
+    async def navigate(self, session_id, url, timeout=30):
+        """
+        导航并按就绪策略等待
+
+        load 策略直接等待 Page.loadEventFired 事件，其他策略轮询页面状态。
+        超过 wait_timeout 仍未就绪时不报错，照常采集并在结果中标记 timedOut。
+
+        Returns:
+            dict: {strategy, ready, timedOut, waitedMs, navigateMs}
+        """
+        started = perf_counter()
+
+        if self.wait == 'load':
+            loaded = self.conn.expect_event('Page.loadEventFired', session_id)
+            try:
+                await self._send_navigate(session_id, url, timeout)
+                navigate_ms = round((perf_counter() - started) * 1000, 1)
+                waited_from = perf_counter()
+                try:
+                    await asyncio.wait_for(loaded, self.wait_timeout)
+                    ready = True
+                except asyncio.TimeoutError:
+                    ready = False
+            finally:
+                self.conn.discard_event(loaded)
+            return {
+                'strategy': self.wait,
+                'ready': ready,
+                'timedOut': not ready,
+                'waitedMs': round((perf_counter() - waited_from) * 1000, 1),
+                'navigateMs': navigate_ms,
+            }
+
+        await self.evaluate(session_id, f'window.{STALE_MARK} = true', timeout)
+        await self._send_navigate(session_id, url, timeout)
+        navigate_ms = round((perf_counter() - started) * 1000, 1)
+
+        async def evaluate(expression):
+            return await self.evaluate(session_id, expression, timeout)
+
+        readiness = await async_wait_ready(evaluate, self.wait, self.wait_timeout)
+        readiness['navigateMs'] = navigate_ms
+        return readiness
+
+    async def evaluate(self, session_id, expression, timeout=30):
+        """执行 JS 表达式并按值返回结果"""
+        result = await self.conn.send('Runtime.evaluate', {
+            'expression': expression,
+            'returnByValue': True,
+            'awaitPromise': True,
+        }, session_id, timeout)
+        if result.get('exceptionDetails'):
+            details = result['exceptionDetails']
+            raise CDPError(details.get('exception', {}).get('description') or details.get('text'))
+        return result.get('result', {}).get('value')
+
+    async def collect(self, url=None, timeout=30):
+        """
+        采集单个页面
+
+        Args:
+            url: 要访问的URL（可选，默认 about:blank）
+            timeout: 导航与执行的超时时间（秒）
+
+        Returns:
+            dict: 与 BrowserEnvCollector.collect_all 相同结构的环境信息
+        """
+        async with self._semaphore:
+            target_id, session_id = await self._open_target()
+            try:
+                readiness = None
+                if url:
+                    readiness = await self.navigate(session_id, url, timeout)
+                raw = await self.evaluate(session_id, build_batch_expression(self.probes), timeout)
+                values, errors = unpack_batch_result(raw, self.probes)
+                result = build_result(values, url, errors, self.sections)
+                if readiness:
+                    result['readiness'] = readiness
+                return result
+            finally:
+                await self._close_target(target_id)
+
+    async def collect_many(self, urls, timeout=30):
+        """
+        并发采集多个页面，单个失败不影响其他页面
+
+        Returns:
+            list: 与 urls 一一对应，失败项为 {'sourceUrl': url, 'error': '...'}
+        """
+        async def one(url):
+            try:
+                return await self.collect(url, timeout)
+            except Exception as e:
+                return {'sourceUrl': url, 'error': str(e) or type(e).__name__}
+
+        return await asyncio.gather(*(one(url) for url in urls))
+
+
+async def run(args):
+    urls = list(args.url)
+    if args.urls:
+        urls.extend(read_urls(args.urls))
+    if not urls:
+        urls = [None]
+
+    process = user_data_dir = None
+    address = args.address
+    if args.launch:
+        # 与其他采集器相同的启动配置，模板不存在时自动生成
+        profile = launch_profile_from_args(args, headless=args.headless)
+        await asyncio.get_running_loop().run_in_executor(None, profile.ensure_template)
+        started = perf_counter()
+        process, address, user_data_dir = await launch_browser(
+            args.browser_path, args.headless, fast_start=profile.fast_start, template=profile.template)
+        print(f"浏览器启动: {profile.mode} {(perf_counter() - started) * 1000:.0f}ms")
+
+    failed = 0
+    try:
+        async with AsyncBrowserEnvCollector(address, concurrency=args.concurrency,
+                                            wait=args.wait, wait_timeout=args.wait_timeout,
+                                            sections=args.sections) as collector:
+            results = await collector.collect_many(urls, timeout=args.timeout)
+
+        sink = open_sink(args)
+        output_dir = Path(args.output_dir)
+        if not sink:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        for index, (url, data) in enumerate(zip(urls, results), 1):
+            if 'error' in data and 'objects' not in data:
+                failed += 1
+                print(f"[{index}/{len(urls)}] 失败 {url}: {data['error']}")
+                continue
+            if sink:
+                path, seq = sink.write(data)
+                print(f"[{index}/{len(urls)}] 完成 {url or 'about:blank'} -> {path.name}#{seq}")
+                continue
+            path = output_dir / url_to_filename(url or 'about:blank', index)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            print(f"[{index}/{len(urls)}] 完成 {url or 'about:blank'} -> {path.name}")
+        if sink:
+            sink.close()
+    finally:
+        if process:
+            process.kill()
+            await process.wait()
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='asyncio 浏览器环境采集器（直连 CDP）')
+    parser.add_argument('url', nargs='*', help='要访问的URL')
+    parser.add_argument('--urls', help='URL 列表文件（每行一个），- 表示从 stdin 读取')
+    parser.add_argument('--address', default='127.0.0.1:9222', help='浏览器调试地址')
+    parser.add_argument('--launch', action='store_true', help='自动启动一个新浏览器')
+    parser.add_argument('--browser-path', default=os.environ.get('CHROME_PATH', 'chrome'),
+                        help='--launch 时使用的浏览器路径')
+    parser.add_argument('--headless', action='store_true', default=True, help='无头模式')
+    parser.add_argument('--no-headless', dest='headless', action='store_false', help='有头模式')
+    parser.add_argument('--concurrency', '-c', type=int, default=8, help='同时采集的页面数')
+    parser.add_argument('--timeout', type=float, default=30, help='单个页面的超时时间（秒）')
+    parser.add_argument('--output-dir', default='templates/async', help='结果目录')
+    add_launch_arguments(parser)
+    add_wait_arguments(parser)
+    add_sink_arguments(parser)
+    add_sections_arguments(parser, 'template')
+
+    args = parser.parse_args()
+    if args.list_sections:
+        print('\n'.join(describe_layout('template')))
+        return
+    try:
+        layout_probes('template', args.sections)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == '__main__':
+    main()
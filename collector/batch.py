@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多 URL 批量采集
+
+在一个共享浏览器中同时使用 M 个标签页并发采集，
+每个 URL 完成后立即回调写出结果，不等待整批结束。
+
+- 调度由 scheduler.Scheduler 完成：在途数量上限、单个 URL 超时（超时的标签页重建），
+  命令行批量模式另外启用优先级、按域名限流、重试和死信
+- run_batch 是不重试、不限流的简化入口
+
+URL 列表每行一个 URL，可以在 URL 后跟一个整数优先级（数值大的先采集），
+也可以是死信文件的 JSON 行（{"url": ..., "priority": ...}）。
+
+用法:
+    urls = read_urls('urls.txt')          # 或 read_urls('-') 从 stdin 读取
+    with BrowserPool(size=1, tabs_per_browser=4) as pool:
+        run_batch(urls, collect_fn, pool, on_result=write_result, timeout=30)
+
+    命令行中直接使用 run_batch_cli(args, collect_fn, write_fn)
+"""
+
+import re
+import sys
+import json
+import hashlib
+from pathlib import Path
+from urllib.parse import urlparse
+
+from probes import save_raw_blobs
+from deep_walk import save_graph
+
+
+# 默认死信文件名：内容是 JSONL，但不用 .jsonl / .json 后缀，
+# 以免 corpus_index / schema 等按后缀扫描结果目录的工具把死信当作采集结果
+DEAD_LETTER_NAME = 'dead_letter.urls'
+
+
+def parse_url_line(line):
+    """
+    解析 URL 列表中的一行
+
+    支持 'https://a.com'、'https://a.com 10'（带优先级）和死信 JSON 行
+
+    Returns:
+        tuple: (url, priority)
+    """
+    if line.startswith('{'):
+        entry = json.loads(line)
+        return entry['url'], int(entry.get('priority') or 0)
+    parts = line.split()
+    if len(parts) == 2 and re.fullmatch(r'-?\d+', parts[1]):
+        return parts[0], int(parts[1])
+    return line, 0
+
+
+def read_jobs(source):
+    """
+    读取带优先级的 URL 列表
+
+    Args:
+        source: 文件路径，'-' 表示从 stdin 读取；空行和 # 开头的行被忽略
+
+    Returns:
+        list: [(url, priority)]（保持原顺序）
+    """
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    jobs = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            jobs.append(parse_url_line(line))
+    return jobs
+
+
+def read_urls(source):
+    """
+    读取 URL 列表
+
+    Args:
+        source: 文件路径，'-' 表示从 stdin 读取；空行和 # 开头的行被忽略
+
+    Returns:
+        list: URL 列表（保持原顺序，忽略优先级）
+    """
+    return [url for url, _ in read_jobs(source)]
+
+
+def url_to_filename(url, index, suffix='.json'):
+    """
+    根据 URL 生成结果文件名，形如 0001_www.example.com_1a2b3c4d.json
+
+    Args:
+        url: 目标URL
+        index: URL 在列表中的序号
+        suffix: 文件后缀
+    """
+    host = urlparse(url).netloc or 'blank'
+    host = re.sub(r'[^A-Za-z0-9._-]', '_', host)
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]
+    return f"{index:04d}_{host}_{digest}{suffix}"
+
+
+def run_batch(urls, collect_fn, pool, on_result, concurrency=None, max_inflight=None,
+              timeout=60, acquire_timeout=None):
+    """
+    批量并发采集：按列表顺序各采集一次，不重试、不按域名限流
+
+    即 scheduler.Scheduler 关闭优先级、限流和重试后的用法，需要这些功能时直接使用 Scheduler。
+
+    Args:
+        urls: URL 列表
+        collect_fn: 采集函数 collect_fn(page, url, timeout) -> data
+        pool: 已启动的 BrowserPool
+        on_result: 结果回调 on_result(index, url, data, error, elapsed)，
+                   每个 URL 完成（或超时）后立即在主线程调用
+        concurrency: 并发标签页数，默认等于池中标签页总数
+        max_inflight: 同时在途的 URL 数上限，默认为 concurrency
+        timeout: 单个 URL 的超时时间（秒）
+        acquire_timeout: 等待空闲标签页的超时时间（秒）
+
+    Returns:
+        dict: 统计信息 {total, ok, failed, timeout, elapsed, ...}
+    """
+    from scheduler import Scheduler
+
+    scheduler = Scheduler(pool, collect_fn, on_result, concurrency=concurrency, max_inflight=max_inflight,
+                          timeout=timeout, per_domain=0, rate=None, retries=0, retry_partial=False,
+                          acquire_timeout=acquire_timeout)
+    scheduler.add_many(urls)
+    return scheduler.run()
+
+
+def add_batch_arguments(parser, urls_group=None):
+    """
+    为采集器命令行添加批量模式参数（含 scheduler.add_scheduler_arguments 的调度参数）
+
+    Args:
+        parser: argparse 解析器
+        urls_group: 放置 --urls 的参数组（如与 --url 互斥的组），默认放在批量模式组
+    """
+    from scheduler import add_scheduler_arguments
+
+    group = parser.add_argument_group('批量模式')
+    (urls_group or group).add_argument('--urls', help='URL 列表文件（每行一个，可跟优先级），- 表示从 stdin 读取')
+    group.add_argument('--output-dir', default='templates/batch', help='批量模式结果目录')
+    group.add_argument('--concurrency', '-c', type=int, default=4, help='并发标签页数')
+    group.add_argument('--max-inflight', type=int, default=None, help='同时在途的 URL 数上限')
+    group.add_argument('--timeout', type=float, default=60, help='单个 URL 单次尝试的超时时间（秒）')
+    add_scheduler_arguments(parser)
+    return group
+
+
+def print_batch_summary(stats):
+    """打印批量采集统计"""
+    print("\n=== 批量采集摘要 ===")
+    print(f"总数: {stats['total']}  成功: {stats['ok']}  失败: {stats['failed']}  超时: {stats['timeout']}")
+    if 'dead' in stats:
+        print(f"重试: {stats['retried']}  部分结果: {stats['partial']}  死信: {stats['dead']}")
+    print(f"耗时: {stats['elapsed']:.1f}s")
+
+
+def run_batch_cli(args, collect_fn, write_fn, browser='chrome', headless=True, suffix='.json',
+                  sink_prefix='collect'):
+    """
+    命令行批量模式入口（三个采集器共用）
+
+    Args:
+        args: argparse 解析结果（需包含 add_batch_arguments 添加的参数，
+              add_launch_arguments 添加的启动配置参数可选）
+        collect_fn: 采集函数 collect_fn(page, url, timeout) -> data
+        write_fn: 写出函数 write_fn(data, path, url)；指定 --sink 时结果已追加到
+                  JSONL 分片，path 为 None。结果中的原始数据（--raw-blobs）和对象图（--deep）
+                  在此之前已写到 .raw.json / .graph.json 旁路文件（分片模式下在 <sink>/raw/），
+                  结果中只留引用
+        browser: 浏览器类型
+        headless: 是否无头模式
+        suffix: 结果文件后缀
+        sink_prefix: JSONL 分片文件名前缀
+
+    Returns:
+        int: 进程退出码，全部成功为 0
+    """
+    from browser_pool import BrowserPool
+    from jsonl_sink import open_sink
+    from launch_profile import launch_profile_from_args
+    from scheduler import Scheduler, write_dead_letters
+
+    jobs = read_jobs(args.urls)
+    if not jobs:
+        print("URL 列表为空")
+        return 1
+
+    sink = open_sink(args, prefix=sink_prefix)
+    output_dir = Path(args.output_dir)
+    if not sink:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    raw_dir = Path(args.sink) / 'raw' if sink else output_dir
+    total = len(jobs)
+
+    print(f"批量采集 {total} 个 URL，并发标签页: {args.concurrency}，"
+          f"结果{'分片目录' if sink else '目录'}: {args.sink if sink else output_dir}")
+
+    def on_result(index, url, data, error, elapsed):
+        if error:
+            print(f"[{index}/{total}] 失败 {url}: {error}")
+            return
+        save_raw_blobs(data, raw_dir / url_to_filename(url, index, '.raw.json'))
+        save_graph(data, raw_dir / url_to_filename(url, index, '.graph.json'))
+        if sink:
+            path, seq = sink.write(data)
+            write_fn(data, None, url)
+            print(f"[{index}/{total}] 完成 {url} -> {path.name}#{seq} ({elapsed:.1f}s)")
+            return
+        path = output_dir / url_to_filename(url, index, suffix)
+        write_fn(data, path, url)
+        print(f"[{index}/{total}] 完成 {url} -> {path.name} ({elapsed:.1f}s)")
+
+    def on_retry(index, url, attempt, error, delay):
+        print(f"[{index}/{total}] 第 {attempt} 次失败 {url}: {error}，{delay:.1f}s 后重试")
+
+    pool = BrowserPool(size=1, tabs_per_browser=args.concurrency,
+                       launch=launch_profile_from_args(args, browser, headless))
+    scheduler = Scheduler(pool, collect_fn, on_result,
+                          concurrency=args.concurrency,
+                          max_inflight=args.max_inflight,
+                          timeout=args.timeout,
+                          per_domain=args.per_domain,
+                          rate=args.rate,
+                          burst=args.burst,
+                          retries=args.retries,
+                          backoff=args.backoff,
+                          backoff_max=args.backoff_max,
+                          retry_partial=args.retry_partial,
+                          on_retry=on_retry)
+    scheduler.add_many(jobs)
+    try:
+        with pool:
+            stats = scheduler.run()
+    finally:
+        if sink:
+            sink.close()
+        dead_path = write_dead_letters(scheduler.dead_letters,
+                                       args.dead_letter or raw_dir / DEAD_LETTER_NAME)
+
+    print_batch_summary(stats)
+    if dead_path:
+        print(f"死信 {len(scheduler.dead_letters)} 个，已写入: {dead_path}（可作为 --urls 重新采集）")
+    return 0 if stats['dead'] == 0 else 1
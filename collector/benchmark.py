@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+采集器基准测试
+
+按阶段计时：浏览器启动、导航、每个探针、批量采集、三个采集器的完整采集、
+JSON 序列化、generate_env_code / generate_js_code 以及文件写入。
+
+两种后端:
+    fake    fake_env.FakeChromiumPage，确定性结果，不需要浏览器（离线 CI）
+    chrome  本机无头 Chrome（DrissionPage）
+
+每个阶段重复多次取中位数；可保存为基线，之后与基线比较，
+中位数变慢超过阈值（且超过绝对噪声下限）时以退出码 1 结束。
+
+用法:
+    python benchmark.py --save-baseline bench/baseline-fake.json
+    python benchmark.py --baseline bench/baseline-fake.json --threshold 0.25
+    python benchmark.py --backend chrome --url http://127.0.0.1:8000/ --repeat 5
+"""
+
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import importlib.util
+from pathlib import Path
+from datetime import datetime
+from contextlib import redirect_stdout
+
+from fake_env import FakeChromiumPage
+from probes import probe_script
+from collect import BrowserEnvCollector, generate_env_code
+
+
+COLLECTOR_DIR = Path(__file__).resolve().parent
+
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_MS = 0.5
+
+
+def load_script_module(name):
+    """按文件路径加载带连字符的采集器脚本（website-env-collector.py 等）"""
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), COLLECTOR_DIR / f'{name}.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class PhaseTimer:
+    """按阶段累积耗时样本（毫秒）"""
+
+    def __init__(self):
+        self.samples = {}
+
+    def measure(self, phase, fn, *args, **kwargs):
+        """
+        执行 fn 并记录耗时，采集器的打印输出被丢弃
+
+        Returns:
+            fn 的返回值
+        """
+        with redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = fn(*args, **kwargs)
+            elapsed = (time.perf_counter() - started) * 1000
+        self.samples.setdefault(phase, []).append(elapsed)
+        return result
+
+    def summary(self):
+        """
+        Returns:
+            dict: {phase: {n, min, median, mean, p95}}（毫秒）
+        """
+        result = {}
+        for phase, values in self.samples.items():
+            ordered = sorted(values)
+            result[phase] = {
+                'n': len(ordered),
+                'min': round(ordered[0], 4),
+                'median': round(statistics.median(ordered), 4),
+                'mean': round(statistics.fmean(ordered), 4),
+                'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            }
+        return result
+
+
+def launch(backend, headless=True, latency=0.0):
+    """启动浏览器（或创建假页面）"""
+    if backend == 'fake':
+        return FakeChromiumPage(latency=latency, nav_latency=latency)
+
+    # 只有真实浏览器后端需要 DrissionPage，fake 后端可在离线 CI 中运行
+    from DrissionPage import ChromiumPage
+    from browser_pool import build_options
+    return ChromiumPage(addr_or_opts=build_options('chrome', headless, auto_port=True))
+
+
+def run_round(timer, backend, url, workdir, website, fingerprint, headless=True, latency=0.0):
+    """
+    执行一轮完整流程，每个阶段记录一次样本
+    """
+    page = timer.measure('launch', launch, backend, headless, latency)
+    try:
+        timer.measure('navigate', page.get, url)
+
+        collector = BrowserEnvCollector(page=page, wait='none')
+        for name in collector.probes:
+            timer.measure(f'probe:{name}', collector._run_js, probe_script(name))
+
+        timer.measure('collect_batch', collector.collect_batch, collector.probes)
+        data = timer.measure('collect_all', collector.collect_all, url)
+        env_data = timer.measure('collect_website', website.collect_website_environment,
+                                 url, page=page, wait='none')
+        timer.measure('collect_fingerprint', fingerprint.collect_fingerprint,
+                      url, page=page, wait='none')
+
+        timer.measure('json_serialize', json.dumps, data, indent=2, ensure_ascii=False)
+        code = timer.measure('generate_env_code', generate_env_code, data)
+        timer.measure('generate_env_code:compact', generate_env_code, data, compact=True)
+        timer.measure('generate_js_code', website.generate_js_code, env_data, url)
+
+        timer.measure('write:template', collector.save_to_file, data, workdir / 'env.json', quiet=True)
+        timer.measure('write:env_code', (workdir / 'env.js').write_text, code, encoding='utf-8')
+        timer.measure('write:website', website.write_env_file, env_data, workdir / 'website.js', url, 'js')
+    finally:
+        page.quit()
+
+
+def run_benchmark(backend='fake', url='https://example.com/', repeat=20, warmup=2,
+                  headless=True, latency=0.0):
+    """
+    运行基准测试
+
+    Args:
+        backend: 'fake' 或 'chrome'
+        url: 导航目标
+        repeat: 计入统计的轮数
+        warmup: 预热轮数（不计入统计）
+        headless: chrome 后端是否无头
+        latency: fake 后端每次 run_js / 导航的模拟延迟（秒）
+
+    Returns:
+        dict: {backend, url, repeat, latency, python, createdAt, phases}
+    """
+    website = load_script_module('website-env-collector')
+    fingerprint = load_script_module('fingerprint-collector')
+
+    with tempfile.TemporaryDirectory(prefix='collector-bench-') as tmp:
+        workdir = Path(tmp)
+        for _ in range(warmup):
+            run_round(PhaseTimer(), backend, url, workdir, website, fingerprint, headless, latency)
+
+        timer = PhaseTimer()
+        for _ in range(repeat):
+            run_round(timer, backend, url, workdir, website, fingerprint, headless, latency)
+
+    return {
+        'backend': backend,
+        'url': url,
+        'repeat': repeat,
+        'latency': latency if backend == 'fake' else None,
+        'python': platform.python_version(),
+        'createdAt': datetime.now().isoformat(),
+        'phases': timer.summary(),
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """
+    与基线比较中位数
+
+    Args:
+        results: run_benchmark 的结果
+        baseline: 之前保存的结果
+        threshold: 允许的相对变慢比例（0.25 表示 25%）
+        min_delta_ms: 绝对噪声下限，变慢不足该值时不算回归
+
+    Returns:
+        list: [{phase, baseline, current, ratio, regression}]，按相对变化从大到小
+    """
+    rows = []
+    for phase, stats in results['phases'].items():
+        base = baseline.get('phases', {}).get(phase)
+        if not base:
+            continue
+        current, previous = stats['median'], base['median']
+        ratio = current / previous if previous > 0 else float('inf')
+        rows.append({
+            'phase': phase,
+            'baseline': previous,
+            'current': current,
+            'ratio': round(ratio, 3),
+            'regression': ratio > 1 + threshold and current - previous > min_delta_ms,
+        })
+    rows.sort(key=lambda row: row['ratio'], reverse=True)
+    return rows
+
+
+def print_results(results, rows=None):
+    """打印阶段耗时（以及与基线的对比）"""
+    baseline = {row['phase']: row for row in rows or []}
+    print(f"后端: {results['backend']}  URL: {results['url']}  轮数: {results['repeat']}")
+    print(f"{'阶段':<28}{'中位数ms':>12}{'p95ms':>12}{'基线ms':>12}{'比例':>8}")
+    for phase, stats in results['phases'].items():
+        row = baseline.get(phase)
+        base = f"{row['baseline']:.3f}" if row else '-'
+        ratio = f"{row['ratio']:.2f}" if row else '-'
+        mark = '  回归' if row and row['regression'] else ''
+        print(f"{phase:<28}{stats['median']:>12.3f}{stats['p95']:>12.3f}{base:>12}{ratio:>8}{mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='采集器基准测试')
+    parser.add_argument('--backend', choices=['fake', 'chrome'], default='fake', help='浏览器后端')
+    parser.add_argument('--url', default='https://example.com/',
+                        help='导航目标（chrome 后端建议使用本地页面）')
+    parser.add_argument('--repeat', type=int, default=20, help='计入统计的轮数')
+    parser.add_argument('--warmup', type=int, default=2, help='预热轮数')
+    parser.add_argument('--no-headless', dest='headless', action='store_false', default=True,
+                        help='chrome 后端使用有头模式')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='fake 后端每次 run_js / 导航的模拟延迟（秒）')
+    parser.add_argument('--output', '-o', help='结果输出路径 (JSON)')
+    parser.add_argument('--save-baseline', help='把本次结果保存为基线')
+    parser.add_argument('--baseline', help='与基线比较，回归时退出码为 1')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='允许的中位数相对变慢比例')
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help='绝对噪声下限（毫秒），变慢不足该值时不算回归')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.backend, args.url, args.repeat, args.warmup,
+                            args.headless, args.latency)
+
+    rows = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        for key in ('backend', 'latency'):
+            if baseline.get(key) != results[key]:
+                print(f"基线的 {key} 为 {baseline.get(key)}，与本次 {results[key]} 不一致")
+                return 2
+        rows = compare(results, baseline, args.threshold, args.min_delta_ms)
+
+    print_results(results, rows)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+            print(f"结果已保存到: {path}")
+
+    regressions = [row for row in rows or [] if row['regression']]
+    if regressions:
+        print(f"\n{len(regressions)} 个阶段超过阈值 {args.threshold:.0%}: "
+              f"{', '.join(row['phase'] for row in regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
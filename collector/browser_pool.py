@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器池
+
+常驻 N 个 Chromium 实例，每个实例预先打开若干标签页，
+采集时借出标签页、用完归还，避免每次采集都冷启动浏览器。
+
+- 每个标签页在独立的浏览器上下文中，归还时丢弃并新建上下文
+  （cookie / storage 只属于该标签页，不影响同一浏览器中仍在采集的其他标签页）
+- 借出前做健康检查，失效的标签页或浏览器自动重建
+- 浏览器使用次数达到上限或内存超限时整体回收重启
+
+用法:
+    pool = BrowserPool(size=2, tabs_per_browser=4)
+    pool.start()
+    with pool.session() as page:
+        page.get('https://example.com')
+        page.run_js('return navigator.userAgent')
+    pool.close()
+"""
+
+import sys
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+try:
+    from DrissionPage import ChromiumPage, ChromiumOptions
+except ImportError:
+    print("请先安装 DrissionPage: pip install DrissionPage")
+    sys.exit(1)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from launch_profile import FAST_START_ARGUMENTS, free_port, release_profile
+
+
+# 采集器统一使用的启动参数（禁用一些可能影响环境采集的功能）
+DEFAULT_ARGUMENTS = [
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+]
+
+
+def _set_argument(options, arg):
+    """设置启动参数，--disable-features 与已有的值合并（浏览器只认最后一个）"""
+    name, _, value = arg.partition('=')
+    if name == '--disable-features':
+        features = []
+        for existing in options.arguments:
+            if existing.startswith('--disable-features='):
+                features.extend(existing.split('=', 1)[1].split(','))
+        features.extend(value.split(','))
+        value = ','.join(dict.fromkeys(f for f in features if f))
+    options.set_argument(name, value or None)
+
+
+def build_options(browser='chrome', headless=True, arguments=None, auto_port=False,
+                  fast_start=False, user_data_dir=None):
+    """
+    构建浏览器启动配置
+
+    Args:
+        browser: 浏览器类型 ('chrome' 或 'edge')
+        headless: 是否无头模式
+        arguments: 启动参数列表，默认 DEFAULT_ARGUMENTS
+        auto_port: 是否自动分配端口和用户目录（多实例并存时需要）
+        fast_start: 追加 FAST_START_ARGUMENTS（见 launch_profile.py）
+        user_data_dir: 指定用户目录（如模板副本），同时分配一个空闲端口
+
+    Returns:
+        ChromiumOptions: 启动配置
+    """
+    options = ChromiumOptions()
+
+    if headless:
+        options.headless(True)
+
+    # 设置浏览器路径（根据系统调整）
+    if browser == 'edge':
+        options.set_browser_path('msedge')
+
+    for arg in (DEFAULT_ARGUMENTS if arguments is None else arguments):
+        _set_argument(options, arg)
+
+    if fast_start:
+        for arg in FAST_START_ARGUMENTS:
+            _set_argument(options, arg)
+
+    if user_data_dir is not None:
+        options.set_user_data_path(user_data_dir)
+        options.set_local_port(free_port())
+    elif auto_port:
+        options.auto_port()
+
+    return options
+
+
+def process_memory_mb(pid):
+    """
+    获取浏览器进程（含子进程）占用内存，单位 MB
+
+    安装了 psutil 时统计整个进程树，否则只读取主进程的 /proc 信息。
+    无法获取时返回 None。
+    """
+    if not pid:
+        return None
+
+    if psutil:
+        try:
+            proc = psutil.Process(pid)
+            rss = proc.memory_info().rss
+            for child in proc.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return rss / 1024 / 1024
+        except psutil.Error:
+            return None
+
+    try:
+        with open(f'/proc/{pid}/status', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class PooledBrowser:
+    """池中的一个浏览器实例"""
+
+    def __init__(self, index, options_factory, tabs_per_browser):
+        self.index = index
+        self.options = options_factory()
+        try:
+            self.page = ChromiumPage(addr_or_opts=self.options)
+        except Exception:
+            release_profile(getattr(self.options, 'user_data_path', None))
+            raise
+        self.uses = 0
+        self.retiring = False
+        self.returned = set()
+        self.started_at = time.time()
+        self.slots = [PoolSlot(self) for _ in range(tabs_per_browser)]
+
+    def run_cdp(self, method, **params):
+        """在浏览器级会话上执行 CDP 命令（Target.* 需要浏览器级会话）"""
+        browser = self.page.browser
+        run = getattr(browser, 'run_cdp', None) or browser._run_cdp
+        return run(method, **params)
+
+    @property
+    def pid(self):
+        try:
+            return self.page.browser.process_id
+        except Exception:
+            return None
+
+    def quit(self):
+        try:
+            self.page.quit()
+        except Exception as e:
+            print(f"关闭浏览器失败: {e}")
+        release_profile(getattr(self.options, 'user_data_path', None))
+
+
+class PoolSlot:
+    """
+    池中的一个标签页
+
+    每个槽位使用独立的浏览器上下文（Target.createBrowserContext）。
+    cookie 清理（Network.clearBrowserCookies）是浏览器级的，同一浏览器的
+    多个标签页共用 cookie 时，归还一个标签页会清掉其他标签页正在采集的 cookie，
+    所以重置时直接丢弃整个上下文。
+    """
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.context = None
+        self.page = None
+        self.uses = 0
+        self.open()
+
+    def open(self):
+        """新建浏览器上下文并在其中打开一个空白标签页"""
+        self.context = self.browser.run_cdp('Target.createBrowserContext')['browserContextId']
+        target = self.browser.run_cdp('Target.createTarget', url='about:blank',
+                                      browserContextId=self.context)['targetId']
+        self.page = self.browser.page.get_tab(target)
+
+    def close(self):
+        """关闭标签页并销毁它的浏览器上下文"""
+        try:
+            self.page.close()
+        except Exception:
+            pass
+        if self.context:
+            try:
+                self.browser.run_cdp('Target.disposeBrowserContext', browserContextId=self.context)
+            except Exception:
+                pass
+        self.context = None
+
+    def healthy(self):
+        """健康检查：标签页能正常执行 JS"""
+        try:
+            return self.page.run_js('return 1', timeout=5) == 1
+        except Exception:
+            return False
+
+    def reset(self):
+        """重置标签页状态，供下一次采集使用（只影响本槽位的上下文）"""
+        self.reopen()
+
+    def reopen(self):
+        """销毁当前上下文，新建上下文和标签页"""
+        self.close()
+        self.open()
+
+
+class BrowserPool:
+    """常驻浏览器池"""
+
+    def __init__(self, size=1, tabs_per_browser=1, browser='chrome', headless=True,
+                 arguments=None, max_uses=100, max_memory_mb=None, options_factory=None, launch=None):
+        """
+        初始化浏览器池
+
+        Args:
+            size: 浏览器实例数量
+            tabs_per_browser: 每个浏览器预开的标签页数量
+            browser: 浏览器类型 ('chrome' 或 'edge')
+            headless: 是否无头模式
+            arguments: 启动参数列表，默认 DEFAULT_ARGUMENTS
+            max_uses: 单个浏览器累计借出次数上限，达到后回收重启
+            max_memory_mb: 单个浏览器内存上限（MB），超过后回收重启
+            options_factory: 自定义启动配置工厂，返回 ChromiumOptions
+            launch: LaunchProfile（见 launch_profile.py），提供时按它的快速启动参数和
+                    用户目录模板启动每个浏览器，忽略 browser / headless / arguments
+        """
+        self.size = size
+        self.tabs_per_browser = tabs_per_browser
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+
+        if options_factory is None and launch is not None:
+            def options_factory():
+                return launch.options(auto_port=True)
+        elif options_factory is None:
+            def options_factory():
+                return build_options(browser, headless, arguments, auto_port=True)
+        self.options_factory = options_factory
+
+        self.browsers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {'launched': 0, 'recycled': 0, 'reopened_tabs': 0, 'checkouts': 0}
+
+    def start(self):
+        """启动全部浏览器并预开标签页"""
+        for i in range(self.size):
+            self._launch(i)
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _launch(self, index):
+        """启动一个浏览器并把它的标签页放入空闲队列"""
+        pooled = PooledBrowser(index, self.options_factory, self.tabs_per_browser)
+        with self._lock:
+            if index < len(self.browsers):
+                self.browsers[index] = pooled
+            else:
+                self.browsers.append(pooled)
+            self.stats['launched'] += 1
+        for slot in pooled.slots:
+            self._idle.put(slot)
+        return pooled
+
+    def acquire(self, timeout=None):
+        """
+        借出一个空闲标签页
+
+        Args:
+            timeout: 等待空闲标签页的超时时间（秒），None 表示一直等待
+
+        Returns:
+            PoolSlot: 标签页槽位，通过 slot.page 使用
+        """
+        if self._closed:
+            raise RuntimeError('浏览器池已关闭')
+
+        while True:
+            try:
+                slot = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError('等待空闲标签页超时')
+
+            if slot.browser.retiring:
+                self._retire(slot.browser, slot)
+                continue
+
+            if not slot.healthy():
+                if not self._repair(slot):
+                    continue
+
+            with self._lock:
+                slot.uses += 1
+                slot.browser.uses += 1
+                self.stats['checkouts'] += 1
+            return slot
+
+    def release(self, slot, broken=False):
+        """
+        归还标签页
+
+        Args:
+            slot: acquire 借出的槽位
+            broken: 调用方判定标签页已不可用（如采集超时）
+        """
+        if self._closed:
+            return
+
+        if not broken:
+            try:
+                slot.reset()
+            except Exception as e:
+                print(f"重置标签页失败: {e}")
+                broken = True
+
+        if broken and not self._repair(slot):
+            return
+
+        pooled = slot.browser
+        if not pooled.retiring and self._should_recycle(pooled):
+            pooled.retiring = True
+
+        if pooled.retiring:
+            self._retire(pooled, slot)
+        else:
+            self._idle.put(slot)
+
+    @contextmanager
+    def session(self, timeout=None):
+        """
+        借出标签页的上下文管理器
+
+        用法:
+            with pool.session() as page:
+                page.get(url)
+        """
+        slot = self.acquire(timeout)
+        broken = False
+        try:
+            yield slot.page
+        except Exception:
+            broken = not slot.healthy()
+            raise
+        finally:
+            self.release(slot, broken=broken)
+
+    def _should_recycle(self, pooled):
+        if self.max_uses and pooled.uses >= self.max_uses:
+            return True
+        if self.max_memory_mb:
+            memory = process_memory_mb(pooled.pid)
+            if memory is not None and memory > self.max_memory_mb:
+                print(f"浏览器 #{pooled.index} 内存 {memory:.0f}MB 超过上限，准备回收")
+                return True
+        return False
+
+    def _repair(self, slot):
+        """
+        修复失效的标签页：先尝试重开标签页，失败则回收整个浏览器
+
+        Returns:
+            bool: 槽位是否已修复可用
+        """
+        try:
+            slot.reopen()
+            if slot.healthy():
+                with self._lock:
+                    self.stats['reopened_tabs'] += 1
+                return True
+        except Exception as e:
+            print(f"重开标签页失败: {e}")
+
+        slot.browser.retiring = True
+        self._retire(slot.browser, slot)
+        return False
+
+    def _retire(self, pooled, slot):
+        """标记槽位已归还，浏览器的全部槽位都归还后重启该浏览器"""
+        with self._lock:
+            pooled.returned.add(id(slot))
+            done = len(pooled.returned) >= len(pooled.slots)
+
+        if not done:
+            return
+
+        pooled.quit()
+        with self._lock:
+            self.stats['recycled'] += 1
+        if not self._closed:
+            self._launch(pooled.index)
+
+    def close(self):
+        """关闭全部浏览器"""
+        self._closed = True
+        for pooled in self.browsers:
+            pooled.quit()
+        self.browsers = []
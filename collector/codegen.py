@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑环境代码生成
+
+把采集结果生成为压缩后的环境模块，用于 standalone-runner.js --env
+和沙箱 load-env。与逐行 Object.defineProperty / 内联大对象的写法相比：
+
+- 所有分段的值放在同一张查找表里，每个分段是一段 JSON 字符串，
+  字符串字面量的解析远快于同样大小的对象字面量
+- 全局对象（navigator、screen 等）安装为惰性 getter，第一次访问时
+  才 JSON.parse 对应分段，之后替换为普通数据属性
+- 环境中已经存在的对象（如先加载了 ProxyEnv）只按键安装惰性 getter，
+  不替换对象本身
+- 提供目标脚本时，按脚本中出现的标识符裁剪：脚本从未提到的分段不生成，
+  window 上的属性按键裁剪
+
+裁剪是词法层面的（标识符与字符串中出现的单词），动态拼接属性名的脚本
+需要用 keep 参数保留分段。
+
+用法:
+    python codegen.py templates/env_template.json -o env.js --target a_bogus119.js
+    code = generate_module(template_data, target_script=script_text)
+"""
+
+import re
+import sys
+import json
+import argparse
+from pathlib import Path
+
+
+# 模板结构（collect.py）中可安装的分段: 全局名 -> objects 下的键
+TEMPLATE_SECTIONS = ('navigator', 'screen', 'document', 'location', 'performance')
+
+# 网站结构（website-env-collector.py）中可安装的分段
+WEBSITE_SECTIONS = ('location', 'navigator', 'screen', 'document', 'performance')
+
+# 压缩模块的运行时（约 600 字节）:
+#   g(i)          取第 i 个分段（首次访问时解析）
+#   L(o, k, i)    o[k] 安装为惰性对象，首次访问后替换为数据属性
+#   P(o, i, ks)   在已有对象 o 上按键安装惰性 getter
+#   I(k, i)       全局 k 已存在时在原对象上走 P（此时需要键列表，立即解析），否则走 L
+RUNTIME = (
+    "var W=typeof window!=='undefined'?window:globalThis,C=[];"
+    "function g(i){return C[i]||(C[i]=JSON.parse(S[i]))}"
+    "function D(o,k,v){Object.defineProperty(o,k,{value:v,writable:!0,configurable:!0,enumerable:!0});return v}"
+    "function L(o,k,i){Object.defineProperty(o,k,{configurable:!0,enumerable:!0,"
+    "get:function(){return D(o,k,g(i))},set:function(v){D(o,k,v)}})}"
+    "function P(o,i,ks){ks.forEach(function(k){try{Object.defineProperty(o,k,{configurable:!0,enumerable:!0,"
+    "get:function(){return g(i)[k]},set:function(v){D(o,k,v)}})}catch(e){}})}"
+    "function I(k,i){var e=W[k];e&&typeof e==='object'?P(e,i,Object.keys(g(i))):L(W,k,i)}"
+)
+
+_IDENTIFIER_RE = re.compile(r'[A-Za-z_$][\w$]*')
+
+
+def used_names(script):
+    """
+    目标脚本中出现的全部标识符 / 单词
+
+    Args:
+        script: 目标脚本源码
+
+    Returns:
+        set: 名称集合
+    """
+    return set(_IDENTIFIER_RE.findall(script or ''))
+
+
+def _installable(value):
+    """去掉采集时附带的元信息键（如 __methods__）"""
+    if isinstance(value, dict):
+        return {k: v for k, v in value.items() if not k.startswith('__')}
+    return value
+
+
+def detect_layout(data):
+    """根据结构判断采集结果来自哪个采集器"""
+    return 'template' if isinstance(data.get('objects'), dict) else 'website'
+
+
+def extract_sections(data, layout=None):
+    """
+    从采集结果中取出可安装的分段
+
+    Returns:
+        tuple: (globals, window_props)，globals 为 {全局名: 值}，
+               window_props 为直接挂在 window 上的属性
+    """
+    layout = layout or detect_layout(data)
+    if layout == 'template':
+        source = data.get('objects') or {}
+        names = TEMPLATE_SECTIONS
+    else:
+        source = data
+        names = WEBSITE_SECTIONS
+
+    sections = {}
+    for name in names:
+        value = _installable(source.get(name))
+        if isinstance(value, dict) and value and 'error' not in value:
+            sections[name] = value
+
+    window_props = _installable(source.get('window')) or {}
+    if not isinstance(window_props, dict) or 'error' in window_props:
+        window_props = {}
+    return sections, window_props
+
+
+def _js_string(value):
+    """值 -> 紧凑 JSON -> 单引号 JS 字符串字面量（JSON 中双引号多，单引号包裹不需要转义）"""
+    text = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    return "'" + text.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def generate_module(data, layout=None, target_script=None, keep=(), header=True):
+    """
+    生成紧凑的惰性环境模块
+
+    Args:
+        data: 采集结果（collect.py 模板或 website-env-collector.py 结构）
+        layout: 'template' | 'website'，默认自动判断
+        target_script: 目标脚本源码，提供时按其中出现的名称裁剪分段
+        keep: 无论是否出现都保留的分段/window 属性名
+        header: 是否带一行来源说明注释
+
+    Returns:
+        str: JavaScript 代码
+    """
+    sections, window_props = extract_sections(data, layout)
+
+    if target_script is not None:
+        used = used_names(target_script) | set(keep)
+        sections = {name: value for name, value in sections.items() if name in used}
+        window_props = {key: value for key, value in window_props.items() if key in used}
+
+    table = []
+    installs = []
+    for name, value in sections.items():
+        installs.append(f"I({json.dumps(name)},{len(table)})")
+        table.append(_js_string(value))
+    if window_props:
+        installs.append(f"P(W,{len(table)},{json.dumps(list(window_props), separators=(',', ':'))})")
+        table.append(_js_string(window_props))
+
+    parts = []
+    if header:
+        source = data.get('sourceUrl') or (data.get('location') or {}).get('href') or ''
+        names = list(sections) + (['window'] if window_props else [])
+        fields = [data.get('browser'), data.get('version'), source, 'sections=' + ','.join(names)]
+        parts.append('/* env ' + ' '.join(str(field) for field in fields if field) + ' */')
+    parts.append("(function(){var S=[" + ','.join(table) + "];" + RUNTIME + ';'.join(installs) + "})();")
+    return '\n'.join(parts) + '\n'
+
+
+def add_codegen_arguments(parser):
+    """为采集器命令行添加紧凑代码生成参数"""
+    parser.add_argument('--compact', action='store_true',
+                        help='生成压缩的惰性环境模块（共享查找表、首次访问时解析）')
+    parser.add_argument('--target-script', help='目标脚本，按其中出现的名称裁剪环境分段（隐含 --compact）')
+    parser.add_argument('--keep', default='', help='裁剪时总是保留的分段/window 属性，逗号分隔')
+
+
+def codegen_options(args):
+    """
+    从命令行参数解析代码生成选项
+
+    Returns:
+        dict: 传给 generate_env_code / generate_js_code 的关键字参数
+    """
+    target = None
+    if args.target_script:
+        with open(args.target_script, 'r', encoding='utf-8') as f:
+            target = f.read()
+    return {
+        'compact': bool(args.compact or target is not None),
+        'target_script': target,
+        'keep': [name.strip() for name in args.keep.split(',') if name.strip()],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='紧凑环境代码生成')
+    parser.add_argument('input', help='采集结果 JSON 文件')
+    parser.add_argument('--output', '-o', help='输出文件路径，默认打印')
+    parser.add_argument('--target', help='目标脚本，按其中出现的名称裁剪分段')
+    parser.add_argument('--keep', default='', help='总是保留的分段/属性，逗号分隔')
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    target = None
+    if args.target:
+        with open(args.target, 'r', encoding='utf-8') as f:
+            target = f.read()
+
+    keep = [name.strip() for name in args.keep.split(',') if name.strip()]
+    code = generate_module(data, target_script=target, keep=keep)
+
+    if args.output:
+        Path(args.output).write_text(code, encoding='utf-8')
+        print(f"环境代码已生成: {args.output} ({len(code.encode('utf-8'))} bytes)")
+    else:
+        sys.stdout.write(code)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
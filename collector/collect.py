@@ -7,66 +7,101 @@ DrissionPage 浏览器环境采集器
 输出标准化 JSON 模板供 Node.js 沙箱使用。
 
 安装依赖:
-    pip install DrissionPage
+    pip install DrissionPage（只有采集时需要，离线生成代码不需要）
 
 使用方法:
     python collect.py [url] [--output output.json] [--browser chrome|edge]
+    python collect.py --urls urls.txt --output-dir templates/batch -c 4
+    python collect.py https://example.com --deep
+    python collect.py gen-code templates/ --out-dir env/generated -j 8
 """
 
+import os
 import json
 import sys
+import time
+import hashlib
 import argparse
-from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
-try:
-    from DrissionPage import ChromiumPage, ChromiumOptions
-except ImportError:
-    print("请先安装 DrissionPage: pip install DrissionPage")
-    sys.exit(1)
+from batch import add_batch_arguments, run_batch_cli
+from launch_profile import LaunchProfile, add_launch_arguments, launch_profile_from_args
+from readiness import navigate as navigate_and_wait, add_wait_arguments
+from template_store import TemplateStore, add_store_arguments
+from jsonl_sink import add_sink_arguments, open_sink
+from codegen import generate_module, add_codegen_arguments, codegen_options
+from timing import (
+    NULL_TIMINGS, TIMINGS_KEY, make_timings, MetricsCollector, add_timing_arguments
+)
+from deep_walk import DeepWalker, GRAPH_KEY, graph_path, save_graph, add_deep_arguments, deep_options_from_args
+from section_cache import SectionCache, CACHEABLE_SECTIONS, browser_identity
+from probes import (
+    DEFAULT_PROBES, probe_script, build_batch_script, unpack_batch_result, build_result, expand,
+    raw_blobs_path, save_raw_blobs, layout_probes, estimate_cost, describe_layout,
+    add_sections_arguments, batch_probe_timings
+)
 
 
 class BrowserEnvCollector:
     """浏览器环境采集器"""
     
-    def __init__(self, browser='chrome', headless=True):
+    def __init__(self, browser='chrome', headless=True, page=None, wait='load', wait_timeout=10,
+                 cache=None, raw_blobs=False, sections=None, timings=False, launch=None, deep=None):
         """
         初始化采集器
         
         Args:
             browser: 浏览器类型 ('chrome' 或 'edge')
             headless: 是否无头模式
+            page: 外部提供的页面/标签页（如 BrowserPool 借出的标签页），
+                  提供时不再自行启动和关闭浏览器
+            wait: 页面就绪策略（见 readiness.py）
+            wait_timeout: 就绪等待的硬性截止时间（秒）
+            cache: SectionCache 实例，缓存与页面无关的分段（webgl、canvas 等）
+            raw_blobs: 同时采集 canvas dataURL 和音频采样（写出时由 save_raw_blobs
+                       移到旁路文件），默认只采集页面内计算的摘要
+            sections: 只采集指定分段（见 probes.LAYOUTS['template']），None 表示全部
+            timings: 记录分阶段耗时到结果的 __timings__ 分段（见 timing.py），
+                     最近一次采集的 Timings 保存在 self.timings
+            launch: LaunchProfile（见 launch_profile.py），默认按 browser / headless
+                    使用默认启动参数
+            deep: DeepWalker 参数（见 deep_walk.py），提供时在探针之后遍历对象图，
+                  写入结果的 deepGraph 字段；None 表示不遍历
         """
         self.browser = browser
         self.headless = headless
-        self.page = None
+        self.wait = wait
+        self.wait_timeout = wait_timeout
+        self.page = page
+        self.launch = launch or LaunchProfile(browser, headless)
+        self.options = None
+        self.cache = cache
+        self.raw_blobs = raw_blobs
+        self.sections = sections
+        self.timing_enabled = timings
+        self.timings = NULL_TIMINGS
+        self.probes = layout_probes('template', sections, raw_blobs)
+        self.deep = deep
+        self._cache_key = None
+        self._owns_page = page is None
         
     def start(self):
         """启动浏览器"""
-        options = ChromiumOptions()
+        if not self._owns_page:
+            return
         
-        if self.headless:
-            options.headless(True)
-        
-        # 设置浏览器路径（根据系统调整）
-        if self.browser == 'edge':
-            options.set_browser_path('msedge')
-        
-        # 禁用一些可能影响环境采集的功能
-        options.set_argument('--disable-blink-features=AutomationControlled')
-        options.set_argument('--no-sandbox')
-        options.set_argument('--disable-dev-shm-usage')
-        
-        self.page = ChromiumPage(addr_or_opts=options)
+        self.options = self.launch.options()
+        self.page = self.launch.launch(self.options)
         
     def stop(self):
         """关闭浏览器"""
-        if self.page:
-            self.page.quit()
+        if self.page and self._owns_page:
+            self.launch.quit(self.page)
             
-    def navigate(self, url):
+    def navigate(self, url, timeout=None):
         """导航到指定URL"""
-        self.page.get(url)
+        self.page.get(url, timeout=timeout)
     
     def _run_js(self, script):
         """安全执行JS并返回结果"""
@@ -79,368 +114,227 @@ class BrowserEnvCollector:
         
     def collect_navigator(self):
         """采集 navigator 对象"""
-        script = """
-        return (function() {
-            const nav = {};
-            const props = [
-                'userAgent', 'appCodeName', 'appName', 'appVersion',
-                'platform', 'product', 'productSub', 'vendor', 'vendorSub',
-                'language', 'languages', 'onLine', 'cookieEnabled',
-                'doNotTrack', 'hardwareConcurrency', 'maxTouchPoints',
-                'deviceMemory', 'webdriver'
-            ];
-            
-            props.forEach(prop => {
-                try {
-                    const value = navigator[prop];
-                    if (value !== undefined) {
-                        if (Array.isArray(value)) {
-                            nav[prop] = Array.from(value);
-                        } else {
-                            nav[prop] = value;
-                        }
-                    }
-                } catch(e) {}
-            });
-            
-            // 采集方法列表
-            nav.__methods__ = [];
-            for (let key in navigator) {
-                if (typeof navigator[key] === 'function') {
-                    nav.__methods__.push(key);
-                }
-            }
-            
-            // 采集 connection
-            if (navigator.connection) {
-                nav.connection = {
-                    downlink: navigator.connection.downlink,
-                    effectiveType: navigator.connection.effectiveType,
-                    rtt: navigator.connection.rtt,
-                    saveData: navigator.connection.saveData
-                };
-            }
-            
-            // 采集 userAgentData
-            if (navigator.userAgentData) {
-                nav.userAgentData = {
-                    brands: navigator.userAgentData.brands,
-                    mobile: navigator.userAgentData.mobile,
-                    platform: navigator.userAgentData.platform
-                };
-            }
-            
-            return nav;
-        })()
-        """
-        return self._run_js(script) or {}
+        return self._run_js(probe_script('navigator')) or {}
         
     def collect_screen(self):
         """采集 screen 对象"""
-        script = """
-        return (function() {
-            return {
-                width: screen.width,
-                height: screen.height,
-                availWidth: screen.availWidth,
-                availHeight: screen.availHeight,
-                availLeft: screen.availLeft || 0,
-                availTop: screen.availTop || 0,
-                colorDepth: screen.colorDepth,
-                pixelDepth: screen.pixelDepth,
-                orientation: screen.orientation ? {
-                    angle: screen.orientation.angle,
-                    type: screen.orientation.type
-                } : null
-            };
-        })()
-        """
-        return self._run_js(script) or {}
+        return self._run_js(probe_script('screen')) or {}
         
     def collect_window(self):
         """采集 window 对象"""
-        script = """
-        return (function() {
-            return {
-                innerWidth: window.innerWidth,
-                innerHeight: window.innerHeight,
-                outerWidth: window.outerWidth,
-                outerHeight: window.outerHeight,
-                screenX: window.screenX,
-                screenY: window.screenY,
-                screenLeft: window.screenLeft,
-                screenTop: window.screenTop,
-                pageXOffset: window.pageXOffset,
-                pageYOffset: window.pageYOffset,
-                devicePixelRatio: window.devicePixelRatio,
-                isSecureContext: window.isSecureContext,
-                origin: window.origin
-            };
-        })()
-        """
-        return self._run_js(script) or {}
+        return self._run_js(probe_script('window')) or {}
         
     def collect_document(self):
         """采集 document 对象"""
-        script = """
-        return (function() {
-            return {
-                title: document.title,
-                domain: document.domain,
-                URL: document.URL,
-                documentURI: document.documentURI,
-                baseURI: document.baseURI,
-                referrer: document.referrer,
-                characterSet: document.characterSet,
-                charset: document.charset,
-                inputEncoding: document.inputEncoding,
-                contentType: document.contentType,
-                readyState: document.readyState,
-                hidden: document.hidden,
-                visibilityState: document.visibilityState,
-                __methods__: ['createElement', 'createTextNode', 'getElementById', 
-                             'getElementsByClassName', 'getElementsByTagName',
-                             'querySelector', 'querySelectorAll']
-            };
-        })()
-        """
-        return self._run_js(script) or {}
+        return self._run_js(probe_script('document')) or {}
         
     def collect_location(self):
         """采集 location 对象"""
-        script = """
-        return (function() {
-            return {
-                href: location.href,
-                protocol: location.protocol,
-                host: location.host,
-                hostname: location.hostname,
-                port: location.port,
-                pathname: location.pathname,
-                search: location.search,
-                hash: location.hash,
-                origin: location.origin
-            };
-        })()
-        """
-        return self._run_js(script) or {}
+        return self._run_js(probe_script('location')) or {}
         
     def collect_performance(self):
         """采集 performance 对象"""
-        script = """
-        return (function() {
-            const timing = performance.timing;
-            return {
-                timeOrigin: performance.timeOrigin,
-                timing: timing ? {
-                    navigationStart: timing.navigationStart,
-                    domLoading: timing.domLoading,
-                    domInteractive: timing.domInteractive,
-                    domComplete: timing.domComplete,
-                    loadEventEnd: timing.loadEventEnd
-                } : null,
-                memory: performance.memory ? {
-                    jsHeapSizeLimit: performance.memory.jsHeapSizeLimit,
-                    totalJSHeapSize: performance.memory.totalJSHeapSize,
-                    usedJSHeapSize: performance.memory.usedJSHeapSize
-                } : null
-            };
-        })()
-        """
-        return self._run_js(script) or {}
+        return self._run_js(probe_script('performance')) or {}
         
     def collect_plugins(self):
         """采集 plugins 信息"""
-        script = """
-        return (function() {
-            const plugins = [];
-            for (let i = 0; i < navigator.plugins.length; i++) {
-                const plugin = navigator.plugins[i];
-                plugins.push({
-                    name: plugin.name,
-                    filename: plugin.filename,
-                    description: plugin.description
-                });
-            }
-            return plugins;
-        })()
-        """
-        return self._run_js(script) or []
+        return self._run_js(probe_script('plugins')) or []
         
     def collect_webgl(self):
         """采集 WebGL 信息"""
-        script = """
-        return (function() {
-            try {
-                const canvas = document.createElement('canvas');
-                const gl = canvas.getContext('webgl') || canvas.getContext('experimental-webgl');
-                if (!gl) return null;
-                
-                const debugInfo = gl.getExtension('WEBGL_debug_renderer_info');
-                return {
-                    vendor: gl.getParameter(gl.VENDOR),
-                    renderer: gl.getParameter(gl.RENDERER),
-                    unmaskedVendor: debugInfo ? gl.getParameter(debugInfo.UNMASKED_VENDOR_WEBGL) : null,
-                    unmaskedRenderer: debugInfo ? gl.getParameter(debugInfo.UNMASKED_RENDERER_WEBGL) : null,
-                    version: gl.getParameter(gl.VERSION),
-                    shadingLanguageVersion: gl.getParameter(gl.SHADING_LANGUAGE_VERSION),
-                    maxTextureSize: gl.getParameter(gl.MAX_TEXTURE_SIZE),
-                    maxViewportDims: gl.getParameter(gl.MAX_VIEWPORT_DIMS)
-                };
-            } catch(e) {
-                return null;
-            }
-        })()
-        """
-        return self._run_js(script)
+        return self._run_js(probe_script('webgl'))
         
     def collect_canvas_fingerprint(self):
         """采集 Canvas 指纹"""
-        script = """
-        return (function() {
-            try {
-                const canvas = document.createElement('canvas');
-                canvas.width = 200;
-                canvas.height = 50;
-                const ctx = canvas.getContext('2d');
-                
-                ctx.textBaseline = 'top';
-                ctx.font = '14px Arial';
-                ctx.fillStyle = '#f60';
-                ctx.fillRect(0, 0, 100, 50);
-                ctx.fillStyle = '#069';
-                ctx.fillText('Canvas Fingerprint', 2, 15);
-                ctx.fillStyle = 'rgba(102, 204, 0, 0.7)';
-                ctx.fillText('Canvas Fingerprint', 4, 17);
-                
-                return canvas.toDataURL();
-            } catch(e) {
-                return null;
-            }
-        })()
-        """
-        return self._run_js(script)
+        return self._run_js(probe_script('canvas'))
         
     def collect_audio_context(self):
         """采集 AudioContext 信息"""
-        script = """
-        return (function() {
-            try {
-                const AudioContext = window.AudioContext || window.webkitAudioContext;
-                if (!AudioContext) return null;
-                
-                const ctx = new AudioContext();
-                return {
-                    sampleRate: ctx.sampleRate,
-                    state: ctx.state,
-                    baseLatency: ctx.baseLatency,
-                    outputLatency: ctx.outputLatency
-                };
-            } catch(e) {
-                return null;
-            }
-        })()
+        return self._run_js(probe_script('audioContext'))
+    
+    def collect_browser_info(self):
+        """采集浏览器名称与版本"""
+        return self._run_js(probe_script('browserInfo'))
+    
+    def collect_batch(self, names=None, timings=NULL_TIMINGS):
+        """
+        批量采集：所有探针合并为一次 run_js 调用
+        
+        每个探针在页面内独立捕获异常，某个探针失败只影响它自己。
+        若整次调用失败（如页面上下文丢失），退回逐个采集。
+        
+        Args:
+            names: 探针名称列表，默认 DEFAULT_PROBES
+            timings: Timings 实例，记录页面内各探针耗时（probe:<name>）
+            
+        Returns:
+            tuple: (values, errors)
         """
-        return self._run_js(script)
+        names = expand(DEFAULT_PROBES if names is None else names)
+        if not names:
+            return {}, {}
         
-    def collect_all(self, url=None):
+        raw = self._run_js(build_batch_script(names))
+        
+        if raw is None:
+            return self._collect_sequential(names, timings)
+        
+        for name, ms in batch_probe_timings(raw, names).items():
+            timings.record(f'probe:{name}', ms)
+        values, errors = unpack_batch_result(raw, names)
+        for name, error in errors.items():
+            print(f"JS执行错误 [{name}]: {error}")
+        return values, errors
+    
+    def _collect_sequential(self, names=None, timings=NULL_TIMINGS):
+        """逐个探针采集（每个探针一次 CDP 往返）"""
+        names = DEFAULT_PROBES if names is None else names
+        values = {}
+        for name in names:
+            with timings.span(f'probe:{name}'):
+                values[name] = self._run_js(probe_script(name))
+        return values, {}
+    
+    def collect_deep(self, **options):
+        """
+        遍历对象图（分页传回，见 deep_walk.py）
+
+        Args:
+            **options: DeepWalker 参数，默认使用构造时的 deep 参数
+
+        Returns:
+            dict: env-graph/1 对象图，失败时返回 None
+        """
+        try:
+            return DeepWalker(self.page, **(options or self.deep or {})).walk()
+        except Exception as e:
+            print(f"对象图遍历失败: {e}")
+            return None
+    
+    def cache_key(self):
+        """当前浏览器的分段缓存键（浏览器版本 + 可执行文件哈希 + 启动参数）"""
+        if self._cache_key is None:
+            browser_path = flags = None
+            if self.options is not None:
+                browser_path = self.options.browser_path
+                flags = self.options.arguments
+            identity = browser_identity(self.page, browser_path, flags)
+            self._cache_key = self.cache.make_key(identity)
+        return self._cache_key
+        
+    def collect_all(self, url=None, batch=True, timeout=None):
         """
         采集所有环境信息
         
         Args:
             url: 要访问的URL（可选）
+            batch: 是否合并为一次 run_js 批量采集
+            timeout: 页面加载超时时间（秒），默认使用 DrissionPage 配置
             
         Returns:
             dict: 采集到的环境信息
         """
-        self.start()
+        timings = self.timings = make_timings(self.timing_enabled)
+        with timings.span('launch'):
+            self.start()
+        timings.attach(self.page)
         
         try:
+            readiness = None
             if url:
-                self.navigate(url)
-                # 等待页面加载完成
-                self.page.wait.doc_loaded()
+                # 导航并按策略等待页面就绪
+                readiness = navigate_and_wait(self.page, url, self.wait, self.wait_timeout, timeout,
+                                              timings=timings)
             else:
                 # 访问空白页
-                self.navigate('about:blank')
-                
-            # 获取浏览器信息
-            browser_info = self._run_js("""
-            return (function() {
-                const ua = navigator.userAgent;
-                let browser = 'Unknown';
-                let version = '';
-                
-                if (ua.includes('Chrome')) {
-                    browser = 'Chrome';
-                    version = ua.match(/Chrome\\/(\\d+\\.\\d+\\.\\d+\\.\\d+)/)?.[1] || '';
-                } else if (ua.includes('Firefox')) {
-                    browser = 'Firefox';
-                    version = ua.match(/Firefox\\/(\\d+\\.\\d+)/)?.[1] || '';
-                } else if (ua.includes('Edge')) {
-                    browser = 'Edge';
-                    version = ua.match(/Edge\\/(\\d+\\.\\d+)/)?.[1] || '';
-                }
-                
-                return { browser: browser, version: version };
-            })()
-            """)
+                with timings.span('navigate'):
+                    self.navigate('about:blank')
+            
+            # 与页面无关的分段优先从缓存读取
+            names = list(self.probes)
+            cached = {}
+            if self.cache:
+                with timings.span('cache'):
+                    cached = self.cache.get(self.cache_key(), names)
+                names = [name for name in names if name not in cached]
             
-            # 确保 browser_info 不为 None
-            if browser_info is None:
-                browser_info = {'browser': 'Unknown', 'version': ''}
+            with timings.span('probes'):
+                if batch:
+                    values, errors = self.collect_batch(names, timings)
+                else:
+                    values, errors = self._collect_sequential(names, timings)
             
-            result = {
-                "browser": browser_info.get('browser', 'Unknown'),
-                "version": browser_info.get('version', ''),
-                "collectedAt": datetime.utcnow().isoformat() + 'Z',
-                "sourceUrl": url or 'about:blank',
-                "objects": {
-                    "navigator": self.collect_navigator(),
-                    "screen": self.collect_screen(),
-                    "window": self.collect_window(),
-                    "document": self.collect_document(),
-                    "location": self.collect_location(),
-                    "performance": self.collect_performance()
-                },
-                "plugins": self.collect_plugins(),
-                "webgl": self.collect_webgl(),
-                "canvas": self.collect_canvas_fingerprint(),
-                "audioContext": self.collect_audio_context()
-            }
+            if self.cache:
+                self.cache.put(self.cache_key(), {
+                    name: values.get(name) for name in CACHEABLE_SECTIONS
+                    if name in values and name not in errors
+                })
+                values.update(cached)
             
+            result = build_result(values, url, errors, self.sections)
+            if self.deep is not None:
+                with timings.span('deep'):
+                    graph = self.collect_deep()
+                if graph:
+                    result[GRAPH_KEY] = graph
+            if readiness:
+                result['readiness'] = readiness
+            if self.cache:
+                result['cache'] = {'key': self.cache_key(), 'hits': sorted(cached)}
+            if self.timing_enabled:
+                result[TIMINGS_KEY] = timings.to_dict()
             return result
             
         finally:
             self.stop()
             
-    def save_to_file(self, data, output_path):
+    def save_to_file(self, data, output_path, quiet=False, timings=NULL_TIMINGS):
         """
-        保存采集结果到文件
+        保存采集结果到文件（原始数据写到同名 .raw.json 旁路文件）
         
         Args:
             data: 采集的数据
             output_path: 输出文件路径
+            quiet: 不打印保存提示
+            timings: Timings 实例，记录 serialize / save 两个 span
+                     （发生在写出之后，只进入指标文件，不在文件的 __timings__ 中）
         """
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-            
-        print(f"环境信息已保存到: {output_path}")
+        raw_path = save_raw_blobs(data, raw_blobs_path(output_path))
+        if raw_path and not quiet:
+            print(f"原始数据已保存到: {raw_path}")
+        deep_path = save_graph(data, graph_path(output_path))
+        if deep_path and not quiet:
+            print(f"对象图已保存到: {deep_path} ({data[GRAPH_KEY]['nodes']} 个节点)")
+        
+        with timings.span('serialize'):
+            text = json.dumps(data, indent=2, ensure_ascii=False)
+        with timings.span('save'):
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        
+        if not quiet:
+            print(f"环境信息已保存到: {output_path}")
 
 
-def generate_env_code(template_data):
+def generate_env_code(template_data, compact=False, target_script=None, keep=()):
     """
     根据采集模板生成环境代码
     
     Args:
         template_data: 采集的环境数据
+        compact: 生成压缩的惰性环境模块（见 codegen.py）
+        target_script: 目标脚本源码，提供时按其中出现的名称裁剪分段（仅 compact）
+        keep: 裁剪时总是保留的分段/属性名
         
     Returns:
         str: 生成的JavaScript环境代码
     """
+    if compact:
+        return generate_module(template_data, 'template', target_script, keep)
+    
     code_lines = [
         "/**",
         f" * 自动生成的浏览器环境代码",
@@ -488,27 +382,272 @@ def generate_env_code(template_data):
     return "\n".join(code_lines)
 
 
+# 离线生成代码的增量清单（位于输出目录）
+GEN_CODE_MANIFEST = '.gen-code.json'
+
+# 目录中不是采集模板的 JSON 旁路文件
+SIDECAR_SUFFIXES = ('.raw.json', '.graph.json')
+
+
+def generator_fingerprint():
+    """代码生成器的指纹（collect.py + codegen.py 的内容哈希），生成器变化后全部重新生成"""
+    digest = hashlib.sha256()
+    for path in (Path(__file__), Path(__file__).with_name('codegen.py')):
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def find_templates(inputs):
+    """
+    展开输入路径为模板文件列表
+
+    Args:
+        inputs: 文件或目录（目录递归查找 *.json，跳过 .raw.json / .graph.json 旁路文件）
+
+    Returns:
+        list: [(模板路径, 相对路径)]
+    """
+    found = []
+    for item in inputs:
+        item = Path(item)
+        if item.is_dir():
+            for path in sorted(item.rglob('*.json')):
+                if path.name == GEN_CODE_MANIFEST or path.name.endswith(SIDECAR_SUFFIXES):
+                    continue
+                found.append((path, path.relative_to(item)))
+        else:
+            found.append((item, Path(item.name)))
+    return found
+
+
+def _gen_code_one(task):
+    """
+    转换一个模板（在进程池中执行）
+
+    Returns:
+        tuple: (源路径, 状态, 内容哈希, 错误信息)，状态为 generated / skipped / ignored（不是
+               collect.py 模板）/ failed
+    """
+    src, dst, key, previous, options = task
+    try:
+        raw = Path(src).read_bytes()
+        digest = hashlib.sha256(raw + key.encode('utf-8')).hexdigest()
+        if digest == previous and Path(dst).exists():
+            return src, 'skipped', digest, None
+        if previous == 'ignored:' + digest:
+            return src, 'ignored', previous, None
+        data = json.loads(raw)
+        if not isinstance(data, dict) or 'objects' not in data:
+            # 记录哈希，下次不再解析
+            return src, 'ignored', 'ignored:' + digest, None
+        code = generate_env_code(data, **options)
+        Path(dst).parent.mkdir(parents=True, exist_ok=True)
+        with open(dst, 'w', encoding='utf-8') as f:
+            f.write(code)
+        return src, 'generated', digest, None
+    except Exception as e:
+        return src, 'failed', None, str(e)
+
+
+def gen_code(inputs, out_dir=None, jobs=None, force=False, options=None):
+    """
+    离线批量生成环境代码（不需要浏览器）
+
+    输入内容、生成选项和生成器本身都没有变化的模板直接跳过（按内容哈希判断，
+    清单保存在输出目录的 .gen-code.json 中）。
+
+    Args:
+        inputs: 模板文件或目录列表
+        out_dir: 输出目录（保持相对路径），默认写到模板旁边（同名 .js）
+        jobs: 进程数，默认 CPU 核数；1 表示在当前进程中执行
+        force: 忽略清单，全部重新生成
+        options: 传给 generate_env_code 的选项（见 codegen.codegen_options）
+
+    Returns:
+        dict: {generated, skipped, ignored, failed, errors, elapsed}
+    """
+    started = time.perf_counter()
+    options = options or {}
+    templates = find_templates(inputs)
+
+    manifest_path = Path(out_dir or '.') / GEN_CODE_MANIFEST
+    manifest = {}
+    if manifest_path.exists() and not force:
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        except ValueError:
+            manifest = {}
+    entries = manifest.get('entries', {})
+    key = generator_fingerprint() + json.dumps(options, sort_keys=True, ensure_ascii=False)
+
+    tasks = []
+    for src, relative in templates:
+        dst = Path(out_dir) / relative.with_suffix('.js') if out_dir else src.with_suffix('.js')
+        tasks.append((str(src), str(dst), key, entries.get(str(src)), options))
+
+    stats = {'generated': 0, 'skipped': 0, 'ignored': 0, 'failed': 0, 'errors': {}}
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) < 2:
+        results = map(_gen_code_one, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        results = executor.map(_gen_code_one, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+
+    try:
+        for src, status, digest, message in results:
+            stats[status] += 1
+            if digest:
+                entries[src] = digest
+            if message:
+                stats['errors'][src] = message
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if tasks:
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps({'entries': entries}, ensure_ascii=False, indent=1), encoding='utf-8')
+    stats['elapsed'] = time.perf_counter() - started
+    return stats
+
+
+def gen_code_main(argv):
+    """gen-code 子命令"""
+    parser = argparse.ArgumentParser(prog='collect.py gen-code', description='离线把采集模板批量生成为环境代码')
+    parser.add_argument('inputs', nargs='+', help='模板文件或目录（递归查找 *.json）')
+    parser.add_argument('--out-dir', help='输出目录（保持相对路径），默认写到模板旁边')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='进程数，默认 CPU 核数')
+    parser.add_argument('--force', action='store_true', help='忽略增量清单，全部重新生成')
+    add_codegen_arguments(parser)
+    args = parser.parse_args(argv)
+
+    stats = gen_code(args.inputs, args.out_dir, args.jobs, args.force, codegen_options(args))
+    print(f"生成 {stats['generated']}，跳过 {stats['skipped']}（未变化），"
+          f"非模板 {stats['ignored']}，失败 {stats['failed']}，耗时 {stats['elapsed']:.2f}s")
+    for src, message in stats['errors'].items():
+        print(f"  {src}: {message}")
+    return 1 if stats['failed'] else 0
+
+
+def make_cache(args):
+    """根据命令行参数创建分段缓存，未指定 --cache-dir 时返回 None"""
+    if not args.cache_dir:
+        return None
+    return SectionCache(args.cache_dir, ttl=args.cache_ttl * 3600, max_entries=args.cache_max)
+
+
+def run_batch_mode(args):
+    """批量模式：共享浏览器、多标签页并发采集 URL 列表"""
+    
+    cache = make_cache(args)
+    store = TemplateStore(args.store) if args.store else None
+    codegen = codegen_options(args)
+    metrics = MetricsCollector() if args.metrics_file else None
+    
+    def collect_one(page, url, timeout):
+        collector = BrowserEnvCollector(page=page, wait=args.wait, wait_timeout=args.wait_timeout,
+                                        cache=cache, raw_blobs=args.raw_blobs, sections=args.sections,
+                                        timings=args.timings, deep=deep_options_from_args(args))
+        return collector.collect_all(url, batch=args.batch, timeout=timeout)
+    
+    def write_one(data, path, url):
+        if store:
+            store.put(data)
+        timings = make_timings(metrics is not None)
+        if path is not None:
+            BrowserEnvCollector().save_to_file(data, path, quiet=True, timings=timings)
+            if args.gen_code:
+                with open(path.with_suffix('.js'), 'w', encoding='utf-8') as f:
+                    f.write(generate_env_code(data, **codegen))
+        if metrics:
+            collected = data.get(TIMINGS_KEY) or {}
+            metrics.add(url, {**collected, 'spans': list(collected.get('spans', [])) + list(timings.spans)})
+    
+    try:
+        return run_batch_cli(args, collect_one, write_one,
+                             browser=args.browser, headless=args.headless)
+    finally:
+        if metrics:
+            print(f"耗时指标已写入: {metrics.write(args.metrics_file)}")
+
+
 def main():
-    parser = argparse.ArgumentParser(description='DrissionPage 浏览器环境采集器')
+    if len(sys.argv) > 1 and sys.argv[1] == 'gen-code':
+        sys.exit(gen_code_main(sys.argv[2:]))
+    
+    parser = argparse.ArgumentParser(description='DrissionPage 浏览器环境采集器',
+                                     epilog='离线生成代码: python collect.py gen-code <模板目录> [--out-dir DIR]')
     parser.add_argument('url', nargs='?', default=None, help='要访问的URL')
     parser.add_argument('--output', '-o', default='templates/env_template.json', help='输出文件路径')
     parser.add_argument('--browser', '-b', choices=['chrome', 'edge'], default='chrome', help='浏览器类型')
     parser.add_argument('--headless', action='store_true', default=True, help='无头模式')
     parser.add_argument('--no-headless', dest='headless', action='store_false', help='有头模式')
     parser.add_argument('--gen-code', action='store_true', help='同时生成环境代码')
+    parser.add_argument('--no-batch', dest='batch', action='store_false', default=True,
+                        help='逐个探针采集（默认合并为一次 run_js）')
+    parser.add_argument('--raw-blobs', action='store_true',
+                        help='同时保存 canvas dataURL 和音频采样到 .raw.json 旁路文件（默认只保存摘要）')
+    parser.add_argument('--cache-dir', help='分段缓存目录（webgl/canvas/audio/plugins/screen），不指定则不缓存')
+    parser.add_argument('--cache-ttl', type=float, default=168, help='分段缓存过期时间（小时）')
+    parser.add_argument('--cache-max', type=int, default=256, help='分段缓存最多保留的条目数')
+    add_sections_arguments(parser, 'template')
+    add_codegen_arguments(parser)
+    add_timing_arguments(parser)
+    add_deep_arguments(parser)
+    add_launch_arguments(parser)
+    add_store_arguments(parser)
+    add_sink_arguments(parser)
+    add_wait_arguments(parser)
+    add_batch_arguments(parser)
     
     args = parser.parse_args()
+    args.timings = args.timings or bool(args.metrics_file)
+    
+    if args.list_sections:
+        print('\n'.join(describe_layout('template')))
+        return
+    
+    try:
+        probes = layout_probes('template', args.sections, args.raw_blobs)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    
+    if args.urls:
+        sys.exit(run_batch_mode(args))
     
     print(f"开始采集浏览器环境...")
     print(f"浏览器: {args.browser}")
     print(f"目标URL: {args.url or 'about:blank'}")
     print(f"无头模式: {args.headless}")
+    print(f"就绪策略: {args.wait}")
+    print(f"探针: {', '.join(probes)} (估计 ~{estimate_cost(probes)}ms)")
+    if args.deep:
+        print(f"对象图: {args.deep_roots} (深度 {args.deep_depth}，最多 {args.deep_max_nodes} 个节点)")
     
-    collector = BrowserEnvCollector(browser=args.browser, headless=args.headless)
+    collector = BrowserEnvCollector(browser=args.browser, headless=args.headless,
+                                    wait=args.wait, wait_timeout=args.wait_timeout,
+                                    cache=make_cache(args), raw_blobs=args.raw_blobs,
+                                    sections=args.sections, timings=args.timings,
+                                    deep=deep_options_from_args(args),
+                                    launch=launch_profile_from_args(args, args.browser, args.headless))
     
     try:
-        data = collector.collect_all(args.url)
-        collector.save_to_file(data, args.output)
+        data = collector.collect_all(args.url, batch=args.batch)
+        print(f"浏览器启动: {collector.launch.describe()}")
+        collector.save_to_file(data, args.output, timings=collector.timings)
+        if args.metrics_file:
+            metrics = MetricsCollector()
+            metrics.add(args.url or 'about:blank', collector.timings.to_dict())
+            print(f"耗时指标已写入: {metrics.write(args.metrics_file)}")
+        if args.store:
+            template_id = TemplateStore(args.store).put(data)
+            print(f"已写入模板仓库: {args.store} (ID: {template_id})")
+        if args.sink:
+            with open_sink(args) as sink:
+                path, _ = sink.write(data)
+            print(f"已追加到 JSONL 分片: {path}")
         
         # 打印摘要
         print("\n=== 采集摘要 ===")
@@ -523,7 +662,7 @@ def main():
         
         # 生成环境代码
         if args.gen_code:
-            code = generate_env_code(data)
+            code = generate_env_code(data, **codegen_options(args))
             code_path = Path(args.output).with_suffix('.js')
             with open(code_path, 'w', encoding='utf-8') as f:
                 f.write(code)
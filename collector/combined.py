@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+一次会话采集三种输出
+
+同一个 URL 要拿到 collect.py 模板、网站环境和指纹，原来要跑三个脚本，
+每个都启动一次浏览器、加载一次页面。这里只启动一次、导航一次，
+三种输出结构需要的探针合并去重后在一次 run_js 中执行，再分别组装：
+
+    template      collect.py 的模板结构（build_result），附 generate_env_code 生成的 .js
+    website       website-env-collector.py 的结构，附 generate_js_code 生成的 .js
+    fingerprint   fingerprint-collector.py 的结构
+
+输出文件（写到 --output-dir，默认 templates/combined；<name> 默认取 URL 的主机名）:
+    <name>.template.json / <name>.template.js
+    <name>.website.json / <name>.website.js
+    <name>.fingerprint.json
+
+导航期间的资源拦截（--block）对三种输出同时生效，拦截记录只写入 website 输出。
+
+用法:
+    python combined.py --url https://example.com --output-dir envs
+    python combined.py --url https://example.com --outputs template,fingerprint --compact
+    python combined.py --urls urls.txt --output-dir envs -c 4
+"""
+
+import sys
+import json
+import argparse
+import importlib.util
+from pathlib import Path
+from urllib.parse import urlparse
+
+from batch import add_batch_arguments, run_batch_cli
+from collect import generate_env_code
+from codegen import add_codegen_arguments, codegen_options
+from deep_walk import DeepWalker, GRAPH_KEY, graph_path, save_graph, add_deep_arguments, deep_options_from_args
+from launch_profile import LaunchProfile, add_launch_arguments, launch_profile_from_args
+from readiness import navigate as navigate_and_wait, add_wait_arguments
+from resource_blocking import ResourceBlocker, add_blocking_arguments, blocking_rules_from_args
+from probes import (
+    build_batch_script, unpack_batch_result, layout_probes, build_result, assemble_layout,
+    estimate_cost, raw_blobs_path, save_raw_blobs
+)
+
+
+COLLECTOR_DIR = Path(__file__).resolve().parent
+
+OUTPUTS = ('template', 'website', 'fingerprint')
+
+
+def load_script_module(name):
+    """按文件路径加载带连字符的采集器脚本（website-env-collector.py 等）"""
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), COLLECTOR_DIR / f'{name}.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def parse_outputs(value):
+    """解析 --outputs（逗号分隔）"""
+    outputs = [item.strip() for item in value.split(',') if item.strip()]
+    unknown = [item for item in outputs if item not in OUTPUTS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"未知的输出: {', '.join(unknown)}（可选: {', '.join(OUTPUTS)}）")
+    return list(dict.fromkeys(outputs))
+
+
+def combined_probes(outputs, raw_blobs=False):
+    """
+    多种输出结构需要的探针（合并去重，保持顺序）
+
+    Returns:
+        dict: {输出: 探针列表}，以及键 None 对应的合并列表
+    """
+    probes = {output: layout_probes(output, None, raw_blobs) for output in outputs}
+    probes[None] = list(dict.fromkeys(name for output in outputs for name in probes[output]))
+    return probes
+
+
+def collect_combined(url, outputs=OUTPUTS, headless=True, page=None, timeout=None, wait='networkidle',
+                     wait_timeout=10, raw_blobs=False, launch=None, blocking=None, deep=None):
+    """
+    一次导航采集多种输出
+
+    Args:
+        url: 要采集的网站URL
+        outputs: 需要的输出（OUTPUTS 的子集）
+        headless: 是否无头模式
+        page: 外部提供的页面/标签页（如 BrowserPool 借出的标签页），提供时不再启动和关闭浏览器
+        timeout: 页面加载超时时间（秒）
+        wait: 页面就绪策略（见 readiness.py）
+        wait_timeout: 就绪等待的硬性截止时间（秒）
+        raw_blobs: 同时回传 canvas dataURL 和音频采样
+        launch: LaunchProfile（见 launch_profile.py）
+        blocking: BlockRules（见 resource_blocking.py）
+        deep: DeepWalker 参数（见 deep_walk.py），提供时对象图写入 template 输出
+
+    Returns:
+        dict: {输出名: 结果}，另有 errors（{输出名.探针: 错误信息}，没有错误时不写入）
+    """
+    probes = combined_probes(outputs, raw_blobs)
+
+    owns_page = page is None
+    if owns_page:
+        launch = launch or LaunchProfile(headless=headless)
+        page = launch.launch()
+        print(f"浏览器启动: {launch.describe()}")
+
+    blocker = ResourceBlocker(page, blocking) if blocking else None
+    try:
+        if blocker:
+            blocker.start()
+        readiness = navigate_and_wait(page, url, wait, wait_timeout, timeout)
+        if blocker:
+            blocker.stop()
+        if readiness['timedOut']:
+            print(f"等待就绪超时 ({wait}, {wait_timeout}s)，继续采集")
+
+        names = probes[None]
+        values, errors = unpack_batch_result(page.run_js(build_batch_script(names)), names)
+        for name, error in errors.items():
+            print(f"探针 {name} 失败: {error}")
+
+        results = {}
+        combined_errors = {}
+        for output in outputs:
+            own_errors = {name: errors[name] for name in probes[output] if name in errors}
+            combined_errors.update({f'{output}.{name}': error for name, error in own_errors.items()})
+            if output == 'template':
+                result = build_result(values, url, own_errors)
+            else:
+                result = assemble_layout(output, values, own_errors)
+            result['readiness'] = readiness
+            results[output] = result
+
+        if blocker and 'website' in results:
+            results['website']['blocking'] = blocker.summary()
+        if deep is not None and 'template' in results:
+            try:
+                results['template'][GRAPH_KEY] = DeepWalker(page, **deep).walk()
+            except Exception as e:
+                print(f"对象图遍历失败: {e}")
+
+        if combined_errors:
+            results['errors'] = combined_errors
+        return results
+    finally:
+        if blocker:
+            blocker.stop()
+        if owns_page:
+            launch.quit(page)
+
+
+def output_paths(base):
+    """
+    一组输出文件的路径
+
+    Args:
+        base: 不带后缀的基础路径（如 envs/example）
+
+    Returns:
+        dict: {输出名: (json 路径, js 路径或 None)}
+    """
+    base = Path(base)
+    return {
+        'template': (base.with_name(base.name + '.template.json'), base.with_name(base.name + '.template.js')),
+        'website': (base.with_name(base.name + '.website.json'), base.with_name(base.name + '.website.js')),
+        'fingerprint': (base.with_name(base.name + '.fingerprint.json'), None),
+    }
+
+
+def write_combined(results, base, url, codegen=None, pretty=False, gen_code=True):
+    """
+    写出采集结果及代码产物
+
+    Args:
+        results: collect_combined 的结果
+        base: 不带后缀的基础路径
+        url: 来源URL
+        codegen: 代码生成选项（见 codegen.codegen_options）
+        pretty: 格式化 JSON
+        gen_code: 同时生成 template / website 的 .js
+
+    Returns:
+        list: 写出的文件路径
+    """
+    codegen = codegen or {}
+    paths = output_paths(base)
+    written = []
+    website = load_script_module('website-env-collector') if gen_code and 'website' in results else None
+
+    for output in OUTPUTS:
+        if output not in results:
+            continue
+        data = results[output]
+        json_path, js_path = paths[output]
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+
+        raw_path = save_raw_blobs(data, raw_blobs_path(json_path))
+        if raw_path:
+            written.append(raw_path)
+        if output == 'template':
+            deep_path = save_graph(data, graph_path(json_path))
+            if deep_path:
+                written.append(deep_path)
+
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2 if pretty else None, ensure_ascii=False)
+        written.append(json_path)
+
+        if not gen_code or js_path is None:
+            continue
+        if output == 'template':
+            code = generate_env_code(data, **codegen)
+        else:
+            code = website.generate_js_code(data, url, **codegen)
+        with open(js_path, 'w', encoding='utf-8') as f:
+            f.write(code)
+        written.append(js_path)
+
+    return written
+
+
+def default_name(url):
+    """输出文件名：URL 的主机名"""
+    return (urlparse(url).hostname or 'page').replace(':', '_')
+
+
+def run_batch_mode(args, outputs, blocking=None):
+    """
+    批量模式：每个 URL 一次导航，写出一组文件（<序号>_<url>.template.json 等）
+
+    不支持 --sink：JSONL 分片每条记录是一种结构，而这里一次采集产生多种结构，
+    并且旁路文件和 .js 代码产物都按结果文件名写出。
+    """
+    if getattr(args, 'sink', None):
+        print("combined.py 不支持 --sink，请使用 --output-dir（每种输出单独成文件）")
+        return 1
+
+    codegen = codegen_options(args)
+    deep = deep_options_from_args(args)
+
+    def collect_one(page, url, timeout):
+        return collect_combined(url, outputs, page=page, timeout=timeout, wait=args.wait,
+                                wait_timeout=args.wait_timeout, raw_blobs=args.raw_blobs,
+                                blocking=blocking, deep=deep)
+
+    def write_one(results, path, url):
+        write_combined(results, path.with_suffix(''), url, codegen, args.pretty, not args.no_code)
+
+    return run_batch_cli(args, collect_one, write_one, headless=args.headless)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='一次会话采集模板、网站环境和指纹')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='要采集的网站URL')
+    parser.add_argument('--outputs', type=parse_outputs, default=list(OUTPUTS),
+                        help=f"需要的输出，逗号分隔（默认全部: {','.join(OUTPUTS)}）")
+    parser.add_argument('--output', '-o', help='单 URL 时输出文件的基础路径（默认 <output-dir>/<主机名>）')
+    parser.add_argument('--no-code', action='store_true', help='不生成 .js 代码产物')
+    parser.add_argument('--headless', action='store_true', default=True, help='无头模式')
+    parser.add_argument('--no-headless', dest='headless', action='store_false', help='有头模式')
+    parser.add_argument('--pretty', action='store_true', help='格式化输出')
+    parser.add_argument('--raw-blobs', action='store_true',
+                        help='同时保存 canvas dataURL 和音频采样到 .raw.json 旁路文件（默认只保存摘要）')
+    add_codegen_arguments(parser)
+    add_deep_arguments(parser)
+    add_launch_arguments(parser)
+    add_blocking_arguments(parser)
+    add_wait_arguments(parser, default='networkidle')
+    add_batch_arguments(parser, urls_group=target)
+    parser.set_defaults(output_dir='templates/combined')
+
+    args = parser.parse_args()
+    if not args.url and not args.urls:
+        parser.error('需要 --url 或 --urls')
+
+    try:
+        blocking = blocking_rules_from_args(args)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    outputs = args.outputs
+    probes = combined_probes(outputs, args.raw_blobs)
+    separate = sum(len(probes[output]) for output in outputs)
+    print(f"输出: {', '.join(outputs)}")
+    print(f"探针: {len(probes[None])} 个（分别采集需 {separate} 个），估计 ~{estimate_cost(probes[None])}ms")
+
+    if args.urls:
+        return run_batch_mode(args, outputs, blocking)
+
+    try:
+        results = collect_combined(args.url, outputs, args.headless, wait=args.wait,
+                                   wait_timeout=args.wait_timeout, raw_blobs=args.raw_blobs,
+                                   launch=launch_profile_from_args(args, headless=args.headless),
+                                   blocking=blocking, deep=deep_options_from_args(args))
+    except KeyboardInterrupt:
+        print("\n用户中断")
+        return 130
+    except Exception as e:
+        print(f"采集失败: {e}")
+        return 1
+
+    base = args.output or Path(args.output_dir) / default_name(args.url)
+    for path in write_combined(results, base, args.url, codegen_options(args), args.pretty, not args.no_code):
+        print(f"已保存: {path}")
+    if results.get('errors'):
+        print(f"失败的探针: {', '.join(results['errors'])}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+指纹语料索引
+
+把采集器输出（JSON 文件、模板仓库、JSONL 分片）的关键属性写入嵌入式 SQLite，
+挑选沙箱运行用的环境时直接查索引，不再遍历成千上万个文件。
+
+索引字段:
+    UA（以及解析出的浏览器、主版本号、操作系统）、platform、屏幕尺寸、
+    设备像素比、WebGL unmasked renderer / vendor、时区、语言、来源URL、采集时间
+
+来源（location 列）:
+    <path>                     JSON 文件
+    store:<root>#<id>          模板仓库（template_store.py）中的模板
+    sink:<file>#<seq>          JSONL 分片（jsonl_sink.py）中的记录
+
+重复导入同一个文件时，文件大小和修改时间未变则跳过；
+相同内容（按 template_store.content_hash）只保留一条。
+三种采集器的输出和统一结构（schema.py）可以混在一起导入，layout 列记录来源结构。
+
+用法:
+    python corpus_index.py ingest templates/ envs/*.json templates/store corpus/ --db corpus.db
+    python corpus_index.py query --browser Chrome --major 120 --os Windows --screen 1920x1080 --db corpus.db
+    python corpus_index.py query --os Android --get -o env.json --db corpus.db
+    python corpus_index.py stats --db corpus.db
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+from schema import detect_layout, to_canonical
+from template_store import TemplateStore, content_hash
+from jsonl_sink import JsonlReader, COMPRESS_SUFFIXES, read_at
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS templates (
+    id             INTEGER PRIMARY KEY,
+    digest         TEXT NOT NULL UNIQUE,
+    location       TEXT NOT NULL,
+    layout         TEXT,
+    user_agent     TEXT,
+    browser        TEXT,
+    major          INTEGER,
+    os             TEXT,
+    platform       TEXT,
+    screen_width   INTEGER,
+    screen_height  INTEGER,
+    dpr            REAL,
+    webgl_renderer TEXT,
+    webgl_vendor   TEXT,
+    timezone       TEXT,
+    language       TEXT,
+    source_url     TEXT,
+    collected_at   TEXT,
+    indexed_at     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_browser ON templates (browser, major, os);
+CREATE INDEX IF NOT EXISTS idx_os ON templates (os, platform);
+CREATE INDEX IF NOT EXISTS idx_screen ON templates (screen_width, screen_height);
+CREATE INDEX IF NOT EXISTS idx_timezone ON templates (timezone);
+CREATE INDEX IF NOT EXISTS idx_language ON templates (language);
+CREATE INDEX IF NOT EXISTS idx_renderer ON templates (webgl_renderer);
+CREATE INDEX IF NOT EXISTS idx_collected ON templates (collected_at);
+
+CREATE TABLE IF NOT EXISTS sources (
+    path   TEXT PRIMARY KEY,
+    size   INTEGER,
+    mtime  REAL
+);
+'''
+
+COLUMNS = (
+    'digest', 'location', 'layout', 'user_agent', 'browser', 'major', 'os', 'platform',
+    'screen_width', 'screen_height', 'dpr', 'webgl_renderer', 'webgl_vendor', 'timezone',
+    'language', 'source_url', 'collected_at', 'indexed_at',
+)
+
+# UA 中浏览器的识别顺序（Edge / Opera 的 UA 同时带 Chrome/）
+_BROWSER_PATTERNS = (
+    ('Edge', re.compile(r'Edg(?:e|A|iOS)?/(\d+)')),
+    ('Opera', re.compile(r'OPR/(\d+)')),
+    ('Firefox', re.compile(r'(?:Firefox|FxiOS)/(\d+)')),
+    ('Chrome', re.compile(r'(?:Chrome|CriOS)/(\d+)')),
+    ('Safari', re.compile(r'Version/(\d+).*Safari/')),
+)
+
+_OS_PATTERNS = (
+    ('Android', re.compile(r'Android')),
+    ('iOS', re.compile(r'iPhone|iPad|iPod')),
+    ('Windows', re.compile(r'Windows')),
+    ('macOS', re.compile(r'Macintosh|Mac OS X')),
+    ('ChromeOS', re.compile(r'CrOS')),
+    ('Linux', re.compile(r'Linux|X11')),
+)
+
+
+def parse_user_agent(user_agent):
+    """
+    从 UA 中解析浏览器、主版本号和操作系统
+
+    Returns:
+        tuple: (browser, major, os)，无法识别的项为 None
+    """
+    user_agent = user_agent or ''
+    browser = major = os_name = None
+    for name, pattern in _BROWSER_PATTERNS:
+        match = pattern.search(user_agent)
+        if match:
+            browser, major = name, int(match.group(1))
+            break
+    for name, pattern in _OS_PATTERNS:
+        if pattern.search(user_agent):
+            os_name = name
+            break
+    return browser, major, os_name
+
+
+def _section(value):
+    return value if isinstance(value, dict) and 'error' not in value else {}
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_attributes(data):
+    """
+    取出需要索引的属性
+
+    Args:
+        data: 任意三种采集器的输出或统一结构（见 schema.py）
+
+    Returns:
+        dict: COLUMNS 中除 digest / location / indexed_at 外的字段
+    """
+    record = to_canonical(data)
+    meta = record['meta']
+    navigator = _section(record.get('navigator'))
+    screen = _section(record.get('screen'))
+    window = _section(record.get('window'))
+    webgl = _section(record.get('webgl'))
+    timezone = _section(record.get('timezone'))
+    location = _section(record.get('location'))
+
+    user_agent = navigator.get('userAgent')
+    browser, major, os_name = parse_user_agent(user_agent)
+    if meta.get('browser') not in (None, 'Unknown') and not browser:
+        browser, major = meta.get('browser'), _int(str(meta.get('version', '')).split('.')[0])
+
+    return {
+        'layout': record['source'],
+        'user_agent': user_agent,
+        'browser': browser,
+        'major': major,
+        'os': os_name,
+        'platform': navigator.get('platform'),
+        'screen_width': _int(screen.get('width')),
+        'screen_height': _int(screen.get('height')),
+        'dpr': _float(window.get('devicePixelRatio')),
+        'webgl_renderer': webgl.get('unmaskedRenderer') or webgl.get('renderer'),
+        'webgl_vendor': webgl.get('unmaskedVendor') or webgl.get('vendor'),
+        'timezone': timezone.get('timezone'),
+        'language': navigator.get('language') or timezone.get('locale'),
+        'source_url': meta.get('sourceUrl') or location.get('href'),
+        'collected_at': meta.get('collectedAt'),
+    }
+
+
+class CorpusIndex:
+    """SQLite 语料索引"""
+
+    def __init__(self, db_path='templates/corpus.db'):
+        """
+        Args:
+            db_path: 数据库文件路径（':memory:' 表示内存库）
+        """
+        if db_path != ':memory:':
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 导入 ----------
+
+    def _row(self, data, location, now):
+        row = extract_attributes(data)
+        row['digest'] = content_hash(data)
+        row['location'] = location
+        row['indexed_at'] = now
+        return tuple(row[column] for column in COLUMNS)
+
+    def add_many(self, items):
+        """
+        批量写入（一个事务）
+
+        Args:
+            items: 可迭代的 (data, location)
+
+        Returns:
+            int: 新增的条目数（内容重复的不计）
+        """
+        now = datetime.utcnow().isoformat() + 'Z'
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO templates ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                (self._row(data, location, now) for data, location in items if detect_layout(data)))
+        return self.conn.total_changes - before
+
+    def add(self, data, location):
+        return self.add_many([(data, location)])
+
+    def _changed(self, paths):
+        """
+        筛出自上次导入后大小或修改时间有变化的文件
+
+        Returns:
+            tuple: (changed_paths, source_rows)，source_rows 在导入完成后由 _mark 写入
+        """
+        changed, rows = [], []
+        for path in paths:
+            stat = os.stat(path)
+            row = self.conn.execute('SELECT size, mtime FROM sources WHERE path = ?', (str(path),)).fetchone()
+            if row and row['size'] == stat.st_size and row['mtime'] == stat.st_mtime:
+                continue
+            changed.append(path)
+            rows.append((str(path), stat.st_size, stat.st_mtime))
+        return changed, rows
+
+    def _mark(self, rows):
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO sources (path, size, mtime) VALUES (?, ?, ?)', rows)
+
+    def _iter_json_files(self, paths):
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(data, dict):
+                yield data, str(path)
+
+    def _iter_store(self, root):
+        store = TemplateStore(root)
+        known = {row['location'] for row in self.conn.execute(
+            'SELECT location FROM templates WHERE location LIKE ?', (f'store:{root}#%',))}
+        for item in store.list():
+            location = f"store:{root}#{item['id']}"
+            if location not in known:
+                yield store.get(item['id']), location
+
+    def _iter_sink(self, path):
+        for seq, record in enumerate(JsonlReader(path)):
+            if isinstance(record, dict):
+                yield record, f'sink:{path}#{seq}'
+
+    def ingest(self, paths):
+        """
+        导入文件或目录
+
+        目录按内容识别：含 manifests/ 的是模板仓库；其他目录递归导入其中的
+        JSON 文件（跳过 .raw.json / .graph.json 旁路文件和点文件）和 JSONL 分片，
+        无法判断结构的记录（schema.detect_layout 返回 None）不导入。
+
+        Args:
+            paths: 文件或目录路径列表
+
+        Returns:
+            dict: {scanned, added}
+        """
+        json_files, stores, sinks = [], [], []
+        sink_suffixes = tuple(COMPRESS_SUFFIXES.values())
+
+        def classify(path):
+            name = path.name
+            # 旁路文件和点文件（如 gen-code 的 .gen-code.json 清单）不是采集结果
+            if name.endswith(('.raw.json', '.graph.json')) or name.startswith('.'):
+                return
+            if name.endswith(sink_suffixes):
+                sinks.append(path)
+            elif name.endswith('.json'):
+                json_files.append(path)
+
+        for path in map(Path, paths):
+            if path.is_dir():
+                if (path / 'manifests').is_dir():
+                    stores.append(path)
+                    continue
+                for child in sorted(path.rglob('*')):
+                    if 'manifests' in child.parts or 'objects' in child.parts:
+                        continue
+                    if child.is_file():
+                        classify(child)
+            elif path.is_file():
+                classify(path)
+
+        scanned = len(json_files) + len(stores) + len(sinks)
+        json_files, json_rows = self._changed(json_files)
+        sinks, sink_rows = self._changed(sinks)
+
+        added = self.add_many(self._iter_json_files(json_files))
+        for root in stores:
+            added += self.add_many(self._iter_store(root))
+        for path in sinks:
+            added += self.add_many(self._iter_sink(path))
+        self._mark(json_rows + sink_rows)
+        return {'scanned': scanned, 'added': added}
+
+    def prune(self):
+        """删除来源文件已不存在的 JSON 条目"""
+        removed = 0
+        rows = self.conn.execute(
+            "SELECT id, location FROM templates WHERE location NOT LIKE 'store:%' "
+            "AND location NOT LIKE 'sink:%'").fetchall()
+        with self.conn:
+            for row in rows:
+                if not os.path.exists(row['location']):
+                    self.conn.execute('DELETE FROM templates WHERE id = ?', (row['id'],))
+                    self.conn.execute('DELETE FROM sources WHERE path = ?', (row['location'],))
+                    removed += 1
+        return removed
+
+    # ---------- 查询 ----------
+
+    def query(self, browser=None, major=None, os=None, platform=None, screen=None, dpr=None,
+              renderer=None, timezone=None, language=None, url=None, layout=None,
+              limit=20, newest_first=True):
+        """
+        按属性查询
+
+        Args:
+            browser: 浏览器名称（Chrome / Edge / Firefox / Safari / Opera）
+            major: 浏览器主版本号
+            os: 操作系统（Windows / macOS / Linux / Android / iOS / ChromeOS）
+            platform: navigator.platform
+            screen: 屏幕尺寸，'1920x1080' 或 (宽, 高)
+            dpr: 设备像素比
+            renderer: WebGL renderer 子串（不区分大小写）
+            timezone: 时区 ID
+            language: 语言，'zh' 同时匹配 'zh-CN' 等
+            url: 来源URL 子串
+            layout: template / website / fingerprint
+            limit: 最多返回条数
+            newest_first: 按采集时间倒序
+
+        Returns:
+            list: 行字典列表
+        """
+        where, params = [], []
+
+        def equal(column, value):
+            if value is not None:
+                where.append(f'{column} = ? COLLATE NOCASE' if isinstance(value, str) else f'{column} = ?')
+                params.append(value)
+
+        equal('browser', browser)
+        equal('major', major)
+        equal('os', os)
+        equal('platform', platform)
+        equal('dpr', dpr)
+        equal('timezone', timezone)
+        equal('layout', layout)
+
+        if screen:
+            width, height = parse_screen(screen) if isinstance(screen, str) else screen
+            equal('screen_width', width)
+            equal('screen_height', height)
+        if language:
+            where.append('(language = ? COLLATE NOCASE OR language LIKE ?)')
+            params.extend([language, f'{language}-%'])
+        if renderer:
+            where.append('webgl_renderer LIKE ?')
+            params.append(f'%{renderer}%')
+        if url:
+            where.append('source_url LIKE ?')
+            params.append(f'%{url}%')
+
+        sql = 'SELECT * FROM templates'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f" ORDER BY collected_at {'DESC' if newest_first else 'ASC'}, id DESC LIMIT ?"
+        params.append(int(limit))
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def best(self, **criteria):
+        """返回最新的一条匹配，没有时返回 None"""
+        rows = self.query(limit=1, **criteria)
+        return rows[0] if rows else None
+
+    def stats(self):
+        """按浏览器 / 操作系统 / 布局统计条目数"""
+        total = self.conn.execute('SELECT COUNT(*) FROM templates').fetchone()[0]
+        group = lambda column: {
+            (row[0] or 'unknown'): row[1] for row in self.conn.execute(
+                f'SELECT {column}, COUNT(*) FROM templates GROUP BY {column} ORDER BY COUNT(*) DESC')
+        }
+        return {'templates': total, 'browsers': group('browser'), 'os': group('os'), 'layouts': group('layout')}
+
+
+def parse_screen(text):
+    """'1920x1080' -> (1920, 1080)"""
+    match = re.fullmatch(r'\s*(\d+)\s*[xX*]\s*(\d+)\s*', text)
+    if not match:
+        raise ValueError(f'屏幕尺寸格式应为 宽x高: {text}')
+    return int(match.group(1)), int(match.group(2))
+
+
+def load_document(location):
+    """
+    按 location 列读取完整的采集结果
+
+    Args:
+        location: 文件路径、store:<root>#<id> 或 sink:<file>#<seq>
+    """
+    if location.startswith('store:'):
+        root, _, template_id = location[len('store:'):].rpartition('#')
+        return TemplateStore(root).get(template_id)
+    if location.startswith('sink:'):
+        path, _, seq = location[len('sink:'):].rpartition('#')
+        return read_at(path, int(seq))
+    with open(location, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='指纹语料索引')
+    parser.add_argument('--db', default='templates/corpus.db', help='索引数据库路径')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ingest = sub.add_parser('ingest', help='导入 JSON 文件 / 目录 / 模板仓库 / JSONL 分片')
+    ingest.add_argument('paths', nargs='+', help='文件或目录')
+    ingest.add_argument('--prune', action='store_true', help='同时删除来源文件已不存在的条目')
+
+    query = sub.add_parser('query', help='按属性查询')
+    query.add_argument('--browser', help='Chrome / Edge / Firefox / Safari / Opera')
+    query.add_argument('--major', type=int, help='浏览器主版本号')
+    query.add_argument('--os', help='Windows / macOS / Linux / Android / iOS')
+    query.add_argument('--platform', help='navigator.platform')
+    query.add_argument('--screen', help='屏幕尺寸，如 1920x1080')
+    query.add_argument('--dpr', type=float, help='设备像素比')
+    query.add_argument('--renderer', help='WebGL renderer 子串')
+    query.add_argument('--timezone', help='时区，如 Asia/Shanghai')
+    query.add_argument('--language', help='语言，如 zh 或 zh-CN')
+    query.add_argument('--url', help='来源URL 子串')
+    query.add_argument('--layout', choices=['template', 'website', 'fingerprint'], help='采集器类型')
+    query.add_argument('--limit', type=int, default=20, help='最多返回条数')
+    query.add_argument('--json', action='store_true', help='以 JSON 输出匹配的行')
+    query.add_argument('--get', action='store_true', help='输出最新一条匹配的完整模板')
+    query.add_argument('--output', '-o', help='--get 时的输出文件路径，默认打印')
+
+    sub.add_parser('stats', help='索引统计')
+
+    args = parser.parse_args()
+
+    with CorpusIndex(args.db) as index:
+        if args.command == 'ingest':
+            result = index.ingest(args.paths)
+            if args.prune:
+                result['pruned'] = index.prune()
+            print(json.dumps(result, ensure_ascii=False))
+        elif args.command == 'query':
+            try:
+                rows = index.query(args.browser, args.major, args.os, args.platform, args.screen,
+                                   args.dpr, args.renderer, args.timezone, args.language, args.url,
+                                   args.layout, 1 if args.get else args.limit)
+            except ValueError as e:
+                print(e)
+                return 1
+            if not rows:
+                print("没有匹配的模板")
+                return 1
+            if args.get:
+                data = load_document(rows[0]['location'])
+                if args.output:
+                    with open(args.output, 'w', encoding='utf-8') as f:
+                        json.dump(data, f, indent=2, ensure_ascii=False)
+                    print(f"模板已导出到: {args.output} (来源: {rows[0]['location']})")
+                else:
+                    print(json.dumps(data, indent=2, ensure_ascii=False))
+                return 0
+            if args.json:
+                print(json.dumps(rows, ensure_ascii=False))
+                return 0
+            for row in rows:
+                screen = f"{row['screen_width']}x{row['screen_height']}" if row['screen_width'] else '-'
+                print(f"{row['browser'] or '-'} {row['major'] or ''}  {row['os'] or '-'}  {screen}  "
+                      f"{row['timezone'] or '-'}  {row['language'] or '-'}  {row['location']}")
+        elif args.command == 'stats':
+            print(json.dumps(index.stats(), indent=2, ensure_ascii=False))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对象图深度采集
+
+probes.py 的探针只覆盖固定的一小组属性，反爬脚本（如 a_bogus119.js）探测的范围大得多。
+这里在页面内从 window / navigator / document 出发迭代遍历对象图（含原型链），
+记录每个对象的属性描述符、typeof、函数的 name / length / 源码（原生函数只记标记），
+以及原型的身份（同一个原型对象只出现一次，按 ID 引用）。
+
+对象图可能有数万个节点，不能作为一次 run_js 的返回值传回。遍历状态保存在页面中，
+Python 端反复调用 step()，每次只遍历并传回一页节点（按节点数和字符数限制），
+字符串（属性名、类名、函数源码）进入驻留表，每页只传回新增的部分。
+
+图结构（env-graph/1）:
+    strings  驻留字符串表
+    roots    {根名称: 节点 ID}
+    nodes    节点列表，节点 i 位于下标 i:
+        t  'o' 对象 / 'f' 函数
+        c  类名（Object.prototype.toString 的标签，字符串下标）
+        p  原型节点 ID（null 表示原型链末端）
+        n  原型的构造函数名（只有原型对象有，字符串下标）
+        f  函数信息 [name, length, native(0/1), 源码]（name / 源码为字符串下标，原生函数源码为 null）
+        k  自有属性 [[键, 标志, 值]]，访问器为 [[键, 标志, getter, setter]]
+        v  实例上访问器的读取结果 [[键, 值]]（含原型链上的 getter，以该实例为 this 读取）
+    标志位: 1 writable / 2 enumerable / 4 configurable / 8 访问器
+    值编码:
+        ['r', id]      对象引用        ['s', 下标]    字符串
+        ['p', 值]      数字/布尔/null   ['u']          undefined
+        ['n', 'NaN']   非有限数字       ['y', 描述]    symbol（bigint 为 ['b', 文本]）
+        ['x', 类名]    超出深度 / 节点上限未展开
+        ['e', 信息]    读取时抛出异常
+    Symbol 键写作 '@@描述'（如 '@@Symbol.toStringTag'）
+
+用法:
+    python deep_walk.py walk --url https://example.com -o graph.json
+    python deep_walk.py show graph.json navigator.webdriver
+    python collect.py https://example.com --deep --deep-max-nodes 80000
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+
+GRAPH_FORMAT = 'env-graph/1'
+
+# 采集结果中存放对象图的字段（写出时移到 .graph.json 旁路文件，只留引用）
+GRAPH_KEY = 'deepGraph'
+
+DEFAULT_ROOTS = ('window', 'navigator', 'document')
+
+# 页面中保存遍历状态的全局名（遍历时跳过）
+STATE_KEY = '__envDeepWalk__'
+
+FLAG_WRITABLE = 1
+FLAG_ENUMERABLE = 2
+FLAG_CONFIGURABLE = 4
+FLAG_ACCESSOR = 8
+
+# 页面内的遍历器，安装后通过 window[STATE_KEY].step() 分页取回
+WALKER_SCRIPT = r"""
+(function(key, rootNames, opts) {
+    var G = window;
+    var ids = new Map(), queue = [], head = 0, nodeCount = 0, truncated = false;
+    var strings = new Map(), pending = [], stringCount = 0, pendingChars = 0;
+    var toStr = Function.prototype.toString, tagOf = Object.prototype.toString;
+    var nativeRe = /\{\s*\[native code\]\s*\}\s*$/;
+
+    function S(s) {
+        s = String(s);
+        var i = strings.get(s);
+        if (i === undefined) {
+            i = stringCount++;
+            strings.set(s, i);
+            pending.push(s);
+            pendingChars += s.length;
+        }
+        return i;
+    }
+    function tag(o) {
+        try { return tagOf.call(o).slice(8, -1); } catch (e) { return 'Object'; }
+    }
+    function keyName(k) {
+        return typeof k === 'symbol' ? '@@' + (k.description || '') : k;
+    }
+    function ref(o, depth, force) {
+        var id = ids.get(o);
+        if (id !== undefined) return ['r', id];
+        if (!force && depth > opts.maxDepth) return ['x', S(tag(o))];
+        if (nodeCount >= opts.maxNodes) { truncated = true; return ['x', S(tag(o))]; }
+        id = nodeCount++;
+        ids.set(o, id);
+        queue.push([o, depth]);
+        return ['r', id];
+    }
+    function enc(v, depth) {
+        var t = typeof v;
+        if (v === null || t === 'boolean') return ['p', v];
+        if (t === 'number') return isFinite(v) ? ['p', v] : ['n', String(v)];
+        if (t === 'string') return ['s', S(v.length > opts.maxString ? v.slice(0, opts.maxString) : v)];
+        if (t === 'undefined') return ['u'];
+        if (t === 'symbol') return ['y', String(v.description || '')];
+        if (t === 'bigint') return ['b', String(v)];
+        return ref(v, depth, false);
+    }
+    function isPrototype(o) {
+        try {
+            var d = Object.getOwnPropertyDescriptor(o, 'constructor');
+            return !!(d && typeof d.value === 'function' && d.value.prototype === o);
+        } catch (e) { return false; }
+    }
+    function visit(o, depth) {
+        var node = { t: typeof o === 'function' ? 'f' : 'o', c: S(tag(o)), p: null, k: [] };
+        var proto = null;
+        try { proto = Object.getPrototypeOf(o); } catch (e) {}
+        // 原型链不受深度限制，保证原型身份完整
+        if (proto) node.p = ref(proto, depth, true)[1];
+        var isProto = isPrototype(o);
+        if (isProto) node.n = S(o.constructor.name || '');
+        if (node.t === 'f') {
+            var src = '';
+            try { src = toStr.call(o); } catch (e) {}
+            var native = nativeRe.test(src);
+            var name = '', length = 0;
+            try { name = String(o.name); length = o.length; } catch (e) {}
+            node.f = [S(name), length, native ? 1 : 0,
+                      native ? null : S(src.length > opts.maxSource ? src.slice(0, opts.maxSource) : src)];
+        }
+
+        var keys = [];
+        try { keys = Reflect.ownKeys(o); } catch (e) {}
+        var child = depth + 1;
+        for (var i = 0; i < keys.length; i++) {
+            var k = keys[i];
+            if (k === key && o === G) continue;
+            var d;
+            try { d = Object.getOwnPropertyDescriptor(o, k); } catch (e) { continue; }
+            if (!d) continue;
+            var flags = (d.enumerable ? 2 : 0) | (d.configurable ? 4 : 0);
+            if ('value' in d) {
+                node.k.push([S(keyName(k)), flags | (d.writable ? 1 : 0), enc(d.value, child)]);
+            } else {
+                node.k.push([S(keyName(k)), flags | 8,
+                             d.get ? ref(d.get, child, false) : null,
+                             d.set ? ref(d.set, child, false) : null]);
+            }
+        }
+
+        // 实例对象：以该对象为 this 读取自身及原型链上的 getter
+        if (opts.getters && node.t === 'o' && !isProto) {
+            var values = [], seen = new Set(), p = o;
+            for (var level = 0; p && level < 32; level++, p = Object.getPrototypeOf(p)) {
+                var pk;
+                try { pk = Reflect.ownKeys(p); } catch (e) { break; }
+                for (var j = 0; j < pk.length; j++) {
+                    var name2 = pk[j];
+                    if (seen.has(name2) || (name2 === key && o === G)) continue;
+                    seen.add(name2);
+                    var pd;
+                    try { pd = Object.getOwnPropertyDescriptor(p, name2); } catch (e) { continue; }
+                    if (!pd || !pd.get) continue;
+                    var value;
+                    try { value = enc(pd.get.call(o), child); }
+                    catch (e) { value = ['e', S(String(e && e.message || e))]; }
+                    values.push([S(keyName(name2)), value]);
+                }
+            }
+            if (values.length) node.v = values;
+        }
+        return node;
+    }
+
+    var roots = {};
+    for (var r = 0; r < rootNames.length; r++) {
+        var value;
+        try { value = G[rootNames[r]]; } catch (e) { continue; }
+        if (value !== null && (typeof value === 'object' || typeof value === 'function')) {
+            roots[rootNames[r]] = ref(value, 0, true)[1];
+        }
+    }
+
+    var state = {
+        roots: roots,
+        step: function(maxNodes, maxChars) {
+            var started = Date.now(), nodes = [], base = stringCount - pending.length;
+            while (head < queue.length && nodes.length < maxNodes && pendingChars < maxChars) {
+                var item = queue[head];
+                queue[head++] = null;
+                nodes.push(visit(item[0], item[1]));
+            }
+            var out = {
+                start: head - nodes.length, nodes: nodes,
+                stringBase: base, strings: pending,
+                done: head >= queue.length, truncated: truncated, ms: Date.now() - started
+            };
+            pending = [];
+            pendingChars = 0;
+            return out;
+        }
+    };
+    Object.defineProperty(G, key, { value: state, configurable: true, enumerable: false, writable: true });
+    return { roots: roots };
+})
+"""
+
+
+def decode_value(graph, value):
+    """
+    把值编码还原为 Python 值
+
+    Returns:
+        对象引用返回 {'$ref': id}，未展开的对象返回 {'$class': 类名}，异常返回 {'$error': 信息}
+    """
+    if value is None:
+        return None
+    kind = value[0]
+    strings = graph['strings']
+    if kind == 'p':
+        return value[1]
+    if kind == 's':
+        return strings[value[1]]
+    if kind == 'u':
+        return None
+    if kind == 'n':
+        return float(value[1].replace('Infinity', 'inf'))
+    if kind == 'r':
+        return {'$ref': value[1]}
+    if kind == 'x':
+        return {'$class': strings[value[1]]}
+    if kind == 'e':
+        return {'$error': strings[value[1]]}
+    return {'$' + {'y': 'symbol', 'b': 'bigint'}.get(kind, kind): value[1]}
+
+
+def node_properties(graph, node_id):
+    """
+    节点的自有属性
+
+    Returns:
+        dict: {键: {'flags', 'value'} 或 {'flags', 'get', 'set'}}
+    """
+    strings = graph['strings']
+    props = {}
+    for entry in graph['nodes'][node_id].get('k', []):
+        name = strings[entry[0]]
+        if entry[1] & FLAG_ACCESSOR:
+            props[name] = {'flags': entry[1],
+                           'get': entry[2] and entry[2][1], 'set': entry[3] and entry[3][1]}
+        else:
+            props[name] = {'flags': entry[1], 'value': entry[2]}
+    return props
+
+
+def lookup(graph, path):
+    """
+    按路径在图中查找值（沿原型链查找属性，getter 取实例上的读取结果）
+
+    Args:
+        graph: walk 返回的图
+        path: 'navigator.userAgent' 形式的路径，首段为根名称（不是根名称时从 window 开始）
+
+    Returns:
+        tuple: (found, value)，value 为 decode_value 的结果
+    """
+    tokens = [t for t in path.split('.') if t]
+    roots = graph['roots']
+    if tokens and tokens[0] in roots:
+        current = roots[tokens.pop(0)]
+    else:
+        current = roots.get('window')
+    if current is None:
+        return False, None
+    value = {'$ref': current}
+    strings = graph['strings']
+
+    for token in tokens:
+        if not isinstance(value, dict) or '$ref' not in value:
+            return False, None
+        node_id = value['$ref']
+        instance = graph['nodes'][node_id]
+        if instance is None:
+            return False, None
+        found = False
+        owner = node_id
+        while owner is not None and not found:
+            entry = node_properties(graph, owner).get(token)
+            if entry is not None:
+                found = True
+                if 'value' in entry:
+                    value = decode_value(graph, entry['value'])
+                else:
+                    getters = {strings[k]: v for k, v in instance.get('v', [])}
+                    value = decode_value(graph, getters.get(token)) if token in getters else {'$getter': entry['get']}
+            owner = graph['nodes'][owner].get('p')
+        if not found:
+            return False, None
+    return True, value
+
+
+class DeepWalker:
+    """在页面中分页遍历对象图"""
+
+    def __init__(self, page, roots=DEFAULT_ROOTS, max_nodes=50000, max_depth=6,
+                 chunk_nodes=2000, chunk_chars=2000000, getters=True, max_string=4096, max_source=2048):
+        """
+        Args:
+            page: DrissionPage 页面/标签页（已导航到目标页面）
+            roots: 遍历起点（全局名）
+            max_nodes: 节点总数上限，超出的对象记为未展开
+            max_depth: 从根出发的属性深度上限（原型链不计入深度）
+            chunk_nodes: 每页最多传回的节点数
+            chunk_chars: 每页新增字符串的字符数上限（控制单条 CDP 消息大小）
+            getters: 读取实例上的 getter（会执行页面中的 getter）
+            max_string: 字符串值的最大长度
+            max_source: 非原生函数源码的最大长度
+        """
+        self.page = page
+        self.roots = tuple(roots)
+        self.options = {
+            'maxNodes': max_nodes, 'maxDepth': max_depth, 'getters': getters,
+            'maxString': max_string, 'maxSource': max_source,
+        }
+        self.chunk_nodes = chunk_nodes
+        self.chunk_chars = chunk_chars
+
+    def walk(self):
+        """
+        遍历并取回完整的对象图
+
+        Returns:
+            dict: {format, roots, strings, nodes, stats}
+
+        Raises:
+            RuntimeError: 分页结果不连续（页面在遍历期间跳转）
+        """
+        started = time.perf_counter()
+        installed = self.page.run_js(
+            f'return ({WALKER_SCRIPT.strip()})({json.dumps(STATE_KEY)}, '
+            f'{json.dumps(list(self.roots))}, {json.dumps(self.options)})')
+        if not isinstance(installed, dict):
+            raise RuntimeError('遍历器安装失败')
+
+        graph = {'format': GRAPH_FORMAT, 'roots': installed.get('roots') or {}, 'strings': [], 'nodes': []}
+        chunks = 0
+        page_ms = 0
+        step = f'return window[{json.dumps(STATE_KEY)}].step({int(self.chunk_nodes)}, {int(self.chunk_chars)})'
+        try:
+            while True:
+                chunk = self.page.run_js(step)
+                if not isinstance(chunk, dict):
+                    raise RuntimeError('遍历状态丢失（页面可能已跳转）')
+                if chunk['start'] != len(graph['nodes']) or chunk['stringBase'] != len(graph['strings']):
+                    raise RuntimeError('分页结果不连续')
+                graph['nodes'].extend(chunk['nodes'])
+                graph['strings'].extend(chunk['strings'])
+                chunks += 1
+                page_ms += chunk.get('ms', 0)
+                if chunk['done']:
+                    break
+        finally:
+            try:
+                self.page.run_js(f'delete window[{json.dumps(STATE_KEY)}]')
+            except Exception:
+                pass
+
+        graph['stats'] = {
+            'nodes': len(graph['nodes']),
+            'strings': len(graph['strings']),
+            'chunks': chunks,
+            'truncated': bool(chunk.get('truncated')),
+            'pageMs': page_ms,
+            'totalMs': round((time.perf_counter() - started) * 1000, 1),
+        }
+        return graph
+
+
+def graph_path(output_path):
+    """结果文件对应的对象图旁路文件路径（xxx.json -> xxx.graph.json）"""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.stem + '.graph.json')
+
+
+def save_graph(data, path):
+    """
+    把采集结果中的对象图移到旁路文件
+
+    结果的 deepGraph 字段替换为 {file, nodes, strings, truncated}
+
+    Args:
+        data: 采集结果（会被原地修改）
+        path: 旁路文件路径
+
+    Returns:
+        Path | None: 写出的旁路文件路径，结果中没有对象图时返回 None
+    """
+    graph = data.get(GRAPH_KEY)
+    if not isinstance(graph, dict) or 'nodes' not in graph:
+        return None
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dict(graph, sourceUrl=data.get('sourceUrl')), f, ensure_ascii=False, separators=(',', ':'))
+
+    stats = graph.get('stats', {})
+    data[GRAPH_KEY] = {'file': path.name, 'nodes': stats.get('nodes'), 'strings': stats.get('strings'),
+                       'truncated': stats.get('truncated')}
+    return path
+
+
+def add_deep_arguments(parser):
+    """为采集器命令行添加对象图深度采集参数"""
+    group = parser.add_argument_group('对象图深度采集')
+    group.add_argument('--deep', action='store_true', help='同时遍历对象图（见 deep_walk.py），写到结果旁的 .graph.json 文件')
+    group.add_argument('--deep-roots', default=','.join(DEFAULT_ROOTS), help='遍历起点，逗号分隔')
+    group.add_argument('--deep-max-nodes', type=int, default=50000, help='节点总数上限')
+    group.add_argument('--deep-depth', type=int, default=6, help='从根出发的属性深度上限（原型链不计入）')
+    group.add_argument('--deep-chunk', type=int, default=2000, help='每次 CDP 往返传回的节点数')
+    group.add_argument('--deep-no-getters', dest='deep_getters', action='store_false', default=True,
+                       help='不读取实例上的 getter（不执行页面代码）')
+    return group
+
+
+def deep_options_from_args(args):
+    """
+    根据 add_deep_arguments 添加的参数构建 DeepWalker 参数
+
+    Returns:
+        dict，未指定 --deep 时返回 None
+    """
+    if not args.deep:
+        return None
+    return {
+        'roots': tuple(r.strip() for r in args.deep_roots.split(',') if r.strip()),
+        'max_nodes': args.deep_max_nodes,
+        'max_depth': args.deep_depth,
+        'chunk_nodes': args.deep_chunk,
+        'getters': args.deep_getters,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对象图深度采集')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    walk = sub.add_parser('walk', help='打开页面并遍历对象图')
+    walk.add_argument('--url', default='about:blank', help='要访问的URL')
+    walk.add_argument('--output', '-o', default='graph.json', help='输出文件路径')
+    walk.add_argument('--headless', action='store_true', help='无头模式运行')
+    add_deep_arguments(walk)
+
+    show = sub.add_parser('show', help='按路径查看图中的值')
+    show.add_argument('graph', help='walk 输出的图文件')
+    show.add_argument('paths', nargs='+', help="路径，如 navigator.webdriver")
+
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        with open(args.graph, 'r', encoding='utf-8') as f:
+            graph = json.load(f)
+        for path in args.paths:
+            found, value = lookup(graph, path)
+            print(f"{path} = {json.dumps(value, ensure_ascii=False) if found else '<不存在>'}")
+        return 0
+
+    from launch_profile import LaunchProfile
+    from readiness import navigate as navigate_and_wait
+
+    args.deep = True
+    launch = LaunchProfile(headless=args.headless)
+    page = launch.launch()
+    try:
+        navigate_and_wait(page, args.url, 'load', 10)
+        graph = DeepWalker(page, **deep_options_from_args(args)).walk()
+    finally:
+        launch.quit(page)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(graph, f, ensure_ascii=False, separators=(',', ':'))
+    stats = graph['stats']
+    print(f"节点: {stats['nodes']}，字符串: {stats['strings']}，分页: {stats['chunks']}，"
+          f"耗时: {stats['totalMs']}ms{'（已截断）' if stats['truncated'] else ''}")
+    print(f"已保存到: {output} ({output.stat().st_size} bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+环境模板的结构化差异与补丁
+
+同一网站的两次采集通常只差 cookie、时间戳和少数字段。这里对两份采集结果
+做结构化比较，生成紧凑补丁；沙箱已加载旧环境时，只需把补丁发给
+/api/sandbox/inject-env（{"patch": ...}），由 SimpleSandbox.applyEnvPatch 增量更新，
+不必重置沙箱再加载完整模板。
+
+补丁格式:
+    {
+        "format": "env-patch/1",
+        "base": "<旧文档 content_hash>",
+        "target": "<新文档 content_hash>",
+        "ignore": ["/collectedAt"],                  （可选）不比较的路径，base / target 不含这些路径
+        "ops": [
+            ["r", "/navigator/userAgent", "..."],    替换
+            ["a", "/cookies/session", "..."],        新增
+            ["d", "/document/referrer"]              删除
+        ]
+    }
+
+路径为 JSON Pointer（RFC 6901，~0 表示 ~，~1 表示 /）。
+对象逐键比较，长度相同的数组逐项比较，长度不同的数组整体替换；
+相等的子树用一次 == 比较跳过，不会逐层展开。
+
+用法:
+    python env_diff.py diff old.json new.json -o patch.json
+    python env_diff.py apply old.json patch.json -o new.json
+    python env_diff.py hash env.json
+"""
+
+import sys
+import json
+import copy
+import argparse
+
+from template_store import content_hash
+
+
+PATCH_FORMAT = 'env-patch/1'
+
+REPLACE, ADD, DELETE = 'r', 'a', 'd'
+
+
+class PatchError(ValueError):
+    """补丁无法应用（基线不匹配或路径不存在）"""
+
+
+def escape_token(key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def unescape_token(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def split_pointer(pointer):
+    """'/a/b~1c' -> ['a', 'b/c']"""
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise PatchError(f'无效的路径: {pointer}')
+    return [unescape_token(token) for token in pointer[1:].split('/')]
+
+
+def same_value(a, b):
+    """
+    类型严格的相等比较
+
+    Python 中 1 == True == 1.0，但它们序列化后不同（content_hash 也不同），
+    补丁必须把这类变化当作修改。
+    """
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same_value(value, b[key]) for key, value in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(same_value, a, b))
+    return a == b
+
+
+def diff_values(old, new, pointer='', ops=None, ignore=()):
+    """
+    生成把 old 变为 new 的操作列表
+
+    Args:
+        old: 旧值
+        new: 新值
+        pointer: 当前路径
+        ops: 追加到的列表
+        ignore: 忽略的路径集合（JSON Pointer）
+
+    Returns:
+        list: 操作列表
+    """
+    ops = [] if ops is None else ops
+    if pointer in ignore or (old == new and same_value(old, new)):
+        return ops
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in old.items():
+            path = f'{pointer}/{escape_token(key)}'
+            if key not in new:
+                if path not in ignore:
+                    ops.append([DELETE, path])
+            else:
+                diff_values(value, new[key], path, ops, ignore)
+        for key, value in new.items():
+            if key not in old:
+                path = f'{pointer}/{escape_token(key)}'
+                if path not in ignore:
+                    ops.append([ADD, path, value])
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for index, (a, b) in enumerate(zip(old, new)):
+            diff_values(a, b, f'{pointer}/{index}', ops, ignore)
+        return ops
+
+    ops.append([REPLACE, pointer, new])
+    return ops
+
+
+def strip_ignored(document, ignore):
+    """
+    去掉不比较的路径（返回副本，不存在的路径忽略）
+
+    Args:
+        document: 采集结果
+        ignore: JSON Pointer 列表
+    """
+    document = copy.deepcopy(document)
+    for pointer in ignore:
+        tokens = split_pointer(pointer)
+        if not tokens:
+            continue
+        try:
+            parent = _container(document, tokens, create=False)
+        except PatchError:
+            continue
+        key = tokens[-1]
+        if isinstance(parent, dict):
+            parent.pop(key, None)
+        elif isinstance(parent, list) and key.isdigit() and int(key) < len(parent):
+            del parent[int(key)]
+    return document
+
+
+def version_hash(document, ignore=()):
+    """
+    补丁中的版本哈希（base / target）
+
+    不比较的路径不进入补丁，也不计入哈希，否则应用补丁后的文档永远对不上 target，
+    连续的补丁会因 base 不一致而失败。
+    """
+    return content_hash(strip_ignored(document, ignore) if ignore else document)
+
+
+def diff(old, new, ignore=()):
+    """
+    生成补丁
+
+    Args:
+        old: 旧采集结果
+        new: 新采集结果
+        ignore: 不比较的路径（如 '/collectedAt'、'/__timings__'）
+
+    Returns:
+        dict: 补丁
+    """
+    ignore = sorted(set(ignore))
+    patch = {
+        'format': PATCH_FORMAT,
+        'base': version_hash(old, ignore),
+        'target': version_hash(new, ignore),
+        'ops': diff_values(old, new, ignore=set(ignore)),
+    }
+    if ignore:
+        patch['ignore'] = ignore
+    return patch
+
+
+def _container(document, tokens, create):
+    """定位路径的父容器"""
+    current = document
+    for token in tokens[:-1]:
+        if isinstance(current, list):
+            try:
+                current = current[int(token)]
+            except (ValueError, IndexError):
+                raise PatchError(f'数组下标无效: {token}')
+        elif isinstance(current, dict):
+            if token not in current:
+                if not create:
+                    raise PatchError(f'路径不存在: {token}')
+                current[token] = {}
+            current = current[token]
+        else:
+            raise PatchError(f'无法进入非容器值: {token}')
+    return current
+
+
+def apply_ops(document, ops):
+    """
+    在 document 上原地执行操作
+
+    Returns:
+        document（根路径被替换时返回新值）
+    """
+    for op in ops:
+        kind, pointer = op[0], op[1]
+        tokens = split_pointer(pointer)
+        if not tokens:
+            if kind == DELETE:
+                raise PatchError('不能删除根节点')
+            document = copy.deepcopy(op[2])
+            continue
+
+        key = tokens[-1]
+        # '-' 只表示在数组末尾追加，父数组不存在时不补建
+        parent = _container(document, tokens, create=kind != DELETE and key != '-')
+        if key == '-' and not isinstance(parent, list):
+            raise PatchError(f'数组不存在: {pointer}')
+        if isinstance(parent, list):
+            if key == '-' and kind == ADD:
+                parent.append(copy.deepcopy(op[2]))
+                continue
+            try:
+                index = int(key)
+            except ValueError:
+                raise PatchError(f'数组下标无效: {key}')
+            if kind == DELETE:
+                del parent[index]
+            elif kind == ADD:
+                parent.insert(index, copy.deepcopy(op[2]))
+            else:
+                parent[index] = copy.deepcopy(op[2])
+        elif kind == DELETE:
+            parent.pop(key, None)
+        else:
+            parent[key] = copy.deepcopy(op[2])
+    return document
+
+
+def apply(document, patch, check_base=True, in_place=False):
+    """
+    应用补丁
+
+    Args:
+        document: 旧采集结果
+        patch: diff 生成的补丁
+        check_base: 校验 document 的内容哈希（不含补丁的 ignore 路径）与补丁的 base 一致
+        in_place: 直接修改 document（默认先深拷贝）
+
+    Returns:
+        新的采集结果
+    """
+    if patch.get('format') != PATCH_FORMAT:
+        raise PatchError(f"不支持的补丁格式: {patch.get('format')}")
+    if check_base and patch.get('base') and version_hash(document, patch.get('ignore', ())) != patch['base']:
+        raise PatchError('补丁的 base 与当前文档不一致')
+    if not in_place:
+        document = copy.deepcopy(document)
+    return apply_ops(document, patch.get('ops', []))
+
+
+def patch_stats(patch):
+    """补丁统计：各类操作数和补丁大小"""
+    counts = {REPLACE: 0, ADD: 0, DELETE: 0}
+    for op in patch.get('ops', []):
+        counts[op[0]] = counts.get(op[0], 0) + 1
+    return {
+        'replace': counts[REPLACE],
+        'add': counts[ADD],
+        'delete': counts[DELETE],
+        'bytes': len(json.dumps(patch, ensure_ascii=False, separators=(',', ':')).encode('utf-8')),
+    }
+
+
+def _load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write(value, output):
+    text = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+def _split_ignore(value):
+    return [path.strip() for path in value.split(',') if path.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='环境模板的结构化差异与补丁')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    d = sub.add_parser('diff', help='生成补丁')
+    d.add_argument('old', help='旧模板')
+    d.add_argument('new', help='新模板')
+    d.add_argument('--ignore', default='', help='不比较的路径，逗号分隔（如 /collectedAt,/__timings__）')
+    d.add_argument('--output', '-o', help='补丁输出路径，默认打印')
+
+    a = sub.add_parser('apply', help='应用补丁')
+    a.add_argument('base', help='旧模板')
+    a.add_argument('patch', help='补丁文件')
+    a.add_argument('--no-check', dest='check', action='store_false', default=True, help='不校验 base 哈希')
+    a.add_argument('--output', '-o', help='结果输出路径，默认打印')
+
+    h = sub.add_parser('hash', help='输出模板的内容哈希（即补丁中的 base / target）')
+    h.add_argument('file', help='模板文件')
+    h.add_argument('--ignore', default='', help='不计入哈希的路径，逗号分隔（与 diff --ignore 一致）')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'diff':
+            old, new = _load(args.old), _load(args.new)
+            patch = diff(old, new, _split_ignore(args.ignore))
+            _write(patch, args.output)
+            if args.output:
+                stats = patch_stats(patch)
+                full = len(json.dumps(new, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                print(f"补丁已生成: {args.output} ({stats['replace']} 替换 / {stats['add']} 新增 / "
+                      f"{stats['delete']} 删除，{stats['bytes']} bytes，完整模板 {full} bytes)")
+        elif args.command == 'apply':
+            result = apply(_load(args.base), _load(args.patch), check_base=args.check)
+            _write(result, args.output)
+            if args.output:
+                print(f"补丁已应用: {args.output}")
+        elif args.command == 'hash':
+            print(version_hash(_load(args.file), _split_ignore(args.ignore)))
+    except PatchError as e:
+        print(f"补丁错误: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
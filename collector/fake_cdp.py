@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地假 CDP 端点
+
+模拟 Chrome 远程调试接口的最小子集，供 AsyncBrowserEnvCollector
+在没有浏览器的机器上联调：
+
+- GET /json/version 返回 webSocketDebuggerUrl
+- Target.createTarget / attachToTarget(flatten) / closeTarget
+- Page.enable / Page.navigate（随后推送 Page.loadEventFired）
+- Runtime.evaluate：探针脚本返回 fake_env.py 中的固定结果
+
+用法:
+    python fake_cdp.py --port 9222 --latency 0.05
+    python async_collect.py https://example.com --address 127.0.0.1:9222
+
+    async with FakeCDPServer() as server:
+        async with AsyncBrowserEnvCollector(server.address) as collector:
+            ...
+"""
+
+import sys
+import json
+import asyncio
+import argparse
+import itertools
+
+from fake_env import fake_evaluate
+
+try:
+    from websockets.asyncio.server import serve
+except ImportError:
+    print("请先安装 websockets: pip install websockets")
+    sys.exit(1)
+
+
+class FakeCDPServer:
+    """假 CDP 服务端"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, fail_urls=None):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口，0 表示随机端口
+            latency: 每条命令的模拟延迟（秒）
+            fail_urls: 导航时返回 errorText 的 URL 集合
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.fail_urls = set(fail_urls or [])
+        self.server = None
+        self.stats = {'messages': 0, 'targets': 0, 'max_open_targets': 0}
+        self._ids = itertools.count(1)
+        self._targets = {}
+
+    @property
+    def address(self):
+        return f'{self.host}:{self.port}'
+
+    async def start(self):
+        self.server = await serve(self._handler, self.host, self.port,
+                                  process_request=self._process_request, max_size=None)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def _process_request(self, connection, request):
+        if request.path.startswith('/json/version'):
+            body = json.dumps({
+                'Browser': 'FakeChrome/120.0.0.0',
+                'Protocol-Version': '1.3',
+                'webSocketDebuggerUrl': f'ws://{self.address}/devtools/browser/fake',
+            })
+            return connection.respond(200, body)
+        return None
+
+    async def _handler(self, ws):
+        async for raw in ws:
+            message = json.loads(raw)
+            self.stats['messages'] += 1
+            asyncio.create_task(self._reply(ws, message))
+
+    async def _reply(self, ws, message):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        method = message.get('method')
+        params = message.get('params', {})
+        session_id = message.get('sessionId')
+        result, events = self._handle(method, params, session_id)
+
+        reply = {'id': message['id']}
+        if session_id:
+            reply['sessionId'] = session_id
+        if isinstance(result, Exception):
+            reply['error'] = {'code': -32000, 'message': str(result)}
+        else:
+            reply['result'] = result
+        await ws.send(json.dumps(reply))
+
+        for event in events:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            await ws.send(json.dumps(event))
+
+    def _handle(self, method, params, session_id):
+        if method == 'Target.createTarget':
+            target_id = f'target-{next(self._ids)}'
+            self._targets[target_id] = None
+            self.stats['targets'] += 1
+            self.stats['max_open_targets'] = max(self.stats['max_open_targets'], len(self._targets))
+            return {'targetId': target_id}, []
+
+        if method == 'Target.attachToTarget':
+            target_id = params.get('targetId')
+            if target_id not in self._targets:
+                return ValueError('No target with given id found'), []
+            session_id = f'session-{target_id}'
+            self._targets[target_id] = session_id
+            return {'sessionId': session_id}, []
+
+        if method == 'Target.closeTarget':
+            self._targets.pop(params.get('targetId'), None)
+            return {'success': True}, []
+
+        if method == 'Page.navigate':
+            url = params.get('url')
+            if url in self.fail_urls:
+                return {'frameId': 'frame', 'errorText': 'net::ERR_NAME_NOT_RESOLVED'}, []
+            event = {'method': 'Page.loadEventFired', 'params': {'timestamp': 0}, 'sessionId': session_id}
+            return {'frameId': 'frame', 'loaderId': 'loader'}, [event]
+
+        if method == 'Runtime.evaluate':
+            value = fake_evaluate(params.get('expression', ''))
+            return {'result': {'type': 'object', 'value': value}}, []
+
+        return {}, []
+
+
+async def serve_forever(args):
+    async with FakeCDPServer(args.host, args.port, args.latency) as server:
+        print(f"假 CDP 端点已启动: {server.address}")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地假 CDP 端点')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=9222, help='监听端口')
+    parser.add_argument('--latency', type=float, default=0.0, help='每条命令的模拟延迟（秒）')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+固定的假浏览器环境
+
+为离线调试提供确定性的探针结果：fake_cdp.py（假 CDP 端点）、
+FakeChromiumPage（DrissionPage 页面替身，benchmark.py 使用）
+以及其他不启动真实浏览器的场景都从这里取数据。
+不依赖 DrissionPage / websockets。
+"""
+
+import copy
+import json
+import re
+import time
+
+from probes import PROBE_SCRIPTS
+from readiness import STALE_MARK
+
+
+FAKE_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+# 各探针的固定返回值
+FAKE_PROBE_VALUES = {
+    'browserInfo': {'browser': 'Chrome', 'version': '120.0.0.0'},
+    'navigator': {
+        'userAgent': FAKE_USER_AGENT,
+        'appCodeName': 'Mozilla',
+        'appName': 'Netscape',
+        'appVersion': FAKE_USER_AGENT[len('Mozilla/'):],
+        'platform': 'Win32',
+        'product': 'Gecko',
+        'productSub': '20030107',
+        'vendor': 'Google Inc.',
+        'vendorSub': '',
+        'language': 'zh-CN',
+        'languages': ['zh-CN', 'zh', 'en'],
+        'onLine': True,
+        'cookieEnabled': True,
+        'doNotTrack': None,
+        'hardwareConcurrency': 8,
+        'maxTouchPoints': 0,
+        'deviceMemory': 8,
+        'webdriver': False,
+        '__methods__': ['getBattery', 'getGamepads', 'javaEnabled', 'sendBeacon', 'vibrate'],
+        'connection': {'downlink': 10, 'effectiveType': '4g', 'rtt': 50, 'saveData': False},
+        'userAgentData': {
+            'brands': [{'brand': 'Chromium', 'version': '120'}, {'brand': 'Google Chrome', 'version': '120'}],
+            'mobile': False,
+            'platform': 'Windows'
+        }
+    },
+    'screen': {
+        'width': 1920, 'height': 1080, 'availWidth': 1920, 'availHeight': 1040,
+        'availLeft': 0, 'availTop': 0, 'colorDepth': 24, 'pixelDepth': 24,
+        'orientation': {'angle': 0, 'type': 'landscape-primary'}
+    },
+    'window': {
+        'innerWidth': 1920, 'innerHeight': 969, 'outerWidth': 1920, 'outerHeight': 1040,
+        'screenX': 0, 'screenY': 0, 'screenLeft': 0, 'screenTop': 0,
+        'pageXOffset': 0, 'pageYOffset': 0, 'devicePixelRatio': 1,
+        'isSecureContext': True, 'origin': 'https://example.com'
+    },
+    'document': {
+        'title': 'Example Domain', 'domain': 'example.com',
+        'URL': 'https://example.com/', 'documentURI': 'https://example.com/',
+        'baseURI': 'https://example.com/', 'referrer': '',
+        'characterSet': 'UTF-8', 'charset': 'UTF-8', 'inputEncoding': 'UTF-8',
+        'contentType': 'text/html', 'readyState': 'complete',
+        'hidden': False, 'visibilityState': 'visible',
+        '__methods__': ['createElement', 'createTextNode', 'getElementById',
+                        'getElementsByClassName', 'getElementsByTagName',
+                        'querySelector', 'querySelectorAll']
+    },
+    'location': {
+        'href': 'https://example.com/', 'protocol': 'https:', 'host': 'example.com',
+        'hostname': 'example.com', 'port': '', 'pathname': '/', 'search': '', 'hash': '',
+        'origin': 'https://example.com'
+    },
+    'performance': {
+        'timeOrigin': 1700000000000.5,
+        'timing': {
+            'navigationStart': 1700000000000, 'domLoading': 1700000000050,
+            'domInteractive': 1700000000120, 'domComplete': 1700000000300,
+            'loadEventEnd': 1700000000310
+        },
+        'memory': {'jsHeapSizeLimit': 4294705152, 'totalJSHeapSize': 2000000, 'usedJSHeapSize': 1500000}
+    },
+    'plugins': [
+        {'name': 'PDF Viewer', 'filename': 'internal-pdf-viewer', 'description': 'Portable Document Format'},
+        {'name': 'Chrome PDF Viewer', 'filename': 'internal-pdf-viewer', 'description': 'Portable Document Format'},
+        {'name': 'Chromium PDF Viewer', 'filename': 'internal-pdf-viewer', 'description': 'Portable Document Format'},
+    ],
+    'webgl': {
+        'vendor': 'WebKit', 'renderer': 'WebKit WebGL',
+        'unmaskedVendor': 'Google Inc. (NVIDIA)',
+        'unmaskedRenderer': 'ANGLE (NVIDIA, NVIDIA GeForce RTX 3060 Direct3D11 vs_5_0 ps_5_0, D3D11)',
+        'version': 'WebGL 1.0 (OpenGL ES 2.0 Chromium)',
+        'shadingLanguageVersion': 'WebGL GLSL ES 1.0 (OpenGL ES GLSL ES 1.0 Chromium)',
+        'maxTextureSize': 16384, 'maxViewportDims': {'0': 32767, '1': 32767}
+    },
+    'canvas': {
+        'algorithm': 'sha256(dataURL)',
+        'hash': 'a3f1c0de9b5e7d4c2f1a0b9c8d7e6f5a4b3c2d1e0f9a8b7c6d5e4f3a2b1c0d9e',
+        'patterns': {
+            'text': '5d41402abc4b2a76b9719d911017c5925d41402abc4b2a76b9719d911017c592',
+            'emoji': '7d793037a0760186574b0282f2f435e77d793037a0760186574b0282f2f435e7',
+            'geometry': '9e107d9d372bb6826bd81d3542a419d69e107d9d372bb6826bd81d3542a419d6',
+            'winding': 'e4d909c290d0fb1ca068ffaddf22cbd0e4d909c290d0fb1ca068ffaddf22cbd0'
+        }
+    },
+    'audioContext': {
+        'sampleRate': 48000, 'state': 'suspended', 'baseLatency': 0.01, 'outputLatency': 0,
+        'output': {
+            'algorithm': 'sha256(float32le)',
+            'hash': 'c3ab8ff13720e8ad9047dd39466b3c8974e592c2fa383d4a3960714caef0c4f2',
+            'sum': 124.04347527516074,
+            'length': 5000
+        }
+    },
+    'canvasRaw': {
+        name: 'data:image/png;base64,' + 'iVBORw0KGgoAAAANSUhEUgAAAMgAAAAyCAYAAAAZUZThAAAA' * 40
+        for name in ('text', 'emoji', 'geometry', 'winding')
+    },
+    'audioRaw': {'encoding': 'base64(float32le)', 'sampleRate': 44100, 'data': 'AAAAAA==' * 2500},
+    'timezone': {'offset': -480, 'timezone': 'Asia/Shanghai', 'locale': 'zh-CN'},
+    'performanceTiming': {
+        'timeOrigin': 1700000000000.5,
+        'timing': {'navigationStart': 1700000000000, 'loadEventEnd': 1700000000310,
+                   'domComplete': 1700000000300}
+    },
+    'features': {
+        'localStorage': True, 'sessionStorage': True, 'indexedDB': True, 'webWorker': True,
+        'serviceWorker': True, 'webRTC': True, 'webSocket': True, 'geolocation': True,
+        'notification': True, 'permissions': True, 'bluetooth': True, 'usb': True, 'credentials': True
+    },
+    'cookies': 'session=fake; theme=dark',
+}
+
+# 由上面的值派生的其他输出结构探针
+_navigator = FAKE_PROBE_VALUES['navigator']
+_plugins = FAKE_PROBE_VALUES['plugins']
+_NAVIGATOR_BASIC = ('userAgent', 'vendor', 'platform', 'language', 'languages', 'hardwareConcurrency',
+                    'deviceMemory', 'maxTouchPoints', 'webdriver', 'cookieEnabled', 'doNotTrack')
+FAKE_PROBE_VALUES['navigatorBasic'] = dict(
+    {key: _navigator[key] for key in _NAVIGATOR_BASIC},
+    plugins=[dict(p) for p in _plugins],
+)
+FAKE_PROBE_VALUES['navigatorFull'] = dict(
+    {key: value for key, value in _navigator.items() if key not in ('__methods__', 'connection', 'userAgentData')},
+    pdfViewerEnabled=True,
+    plugins=[dict(p, length=2) for p in _plugins],
+    mimeTypes=[{'type': 'application/pdf', 'description': 'Portable Document Format', 'suffixes': 'pdf'}],
+)
+FAKE_PROBE_VALUES['windowFull'] = dict(
+    {key: value for key, value in FAKE_PROBE_VALUES['window'].items()
+     if key not in ('pageXOffset', 'pageYOffset', 'origin')},
+    scrollX=0, scrollY=0, name='', closed=False,
+)
+FAKE_PROBE_VALUES['documentFull'] = dict(
+    {key: value for key, value in FAKE_PROBE_VALUES['document'].items()
+     if key not in ('baseURI', 'inputEncoding', '__methods__')},
+    cookie=FAKE_PROBE_VALUES['cookies'],
+)
+FAKE_PROBE_VALUES['webglFull'] = dict(
+    {key: value for key, value in FAKE_PROBE_VALUES['webgl'].items()
+     if key not in ('maxTextureSize', 'maxViewportDims')},
+    extensions=['ANGLE_instanced_arrays', 'EXT_blend_minmax', 'OES_texture_float', 'WEBGL_debug_renderer_info'],
+)
+FAKE_PROBE_VALUES['audio'] = dict(
+    {key: FAKE_PROBE_VALUES['audioContext'][key] for key in ('sampleRate', 'state', 'output')},
+    maxChannelCount=2, numberOfInputs=1, numberOfOutputs=0, channelCount=2,
+)
+
+_BATCH_NAME_RE = re.compile(r'\["(\w+)", \(\) =>')
+
+
+def probe_names_in(script):
+    """
+    识别脚本中包含的探针
+
+    Returns:
+        tuple: (names, batched)，batched 表示是否为 build_batch_* 生成的批量脚本
+    """
+    if '__probes__' in script:
+        return _BATCH_NAME_RE.findall(script), True
+
+    for name, probe in PROBE_SCRIPTS.items():
+        if probe.strip() in script:
+            return [name], False
+    return [], False
+
+
+def fake_evaluate(script):
+    """
+    模拟在假页面中执行探针脚本
+
+    Args:
+        script: probe_script / build_batch_script / build_batch_expression 生成的脚本
+
+    Returns:
+        批量脚本返回 {name: {ok, value}}，单个探针返回其值，
+        就绪判断脚本返回 True，无法识别时返回 None
+    """
+    if STALE_MARK in script:
+        # 假页面总是立即就绪
+        return True
+
+    names, batched = probe_names_in(script)
+    if batched:
+        return {name: {'ok': True, 'value': copy.deepcopy(FAKE_PROBE_VALUES.get(name))}
+                for name in names}
+    if names:
+        return copy.deepcopy(FAKE_PROBE_VALUES.get(names[0]))
+    return None
+
+
+class _FakeLoadMode:
+    def none(self):
+        pass
+
+    def normal(self):
+        pass
+
+    def eager(self):
+        pass
+
+
+class _FakeSetter:
+    def __init__(self):
+        self.load_mode = _FakeLoadMode()
+
+
+class _FakeBrowser:
+    version = FAKE_PROBE_VALUES['browserInfo']['version']
+    process_id = None
+
+
+class FakeChromiumPage:
+    """
+    DrissionPage ChromiumPage 的确定性替身
+
+    只实现采集器用到的接口（get / run_js / run_cdp / set.load_mode / browser / quit），
+    run_js 的结果来自 fake_evaluate，可选的固定延迟用于模拟 CDP 往返。
+    """
+
+    def __init__(self, addr_or_opts=None, latency=0.0, nav_latency=0.0):
+        """
+        Args:
+            addr_or_opts: 与 ChromiumPage 签名保持一致，忽略
+            latency: 每次 run_js 的模拟延迟（秒）
+            nav_latency: 每次导航的模拟延迟（秒）
+        """
+        self.latency = latency
+        self.nav_latency = nav_latency
+        self.url = 'about:blank'
+        self.set = _FakeSetter()
+        self.browser = _FakeBrowser()
+        self.stats = {'navigations': 0, 'scripts': 0}
+        # 按一问一答估算的 CDP 流量（timing.cdp_counter 读取）
+        self.cdp_stats = {'messages': 0, 'bytes': 0}
+        self.cdp_calls = []
+
+    def _exchange(self, request, response):
+        self.cdp_stats['messages'] += 2
+        self.cdp_stats['bytes'] += len(request) + len(json.dumps(response, ensure_ascii=False))
+        return response
+
+    def get(self, url, timeout=None, **kwargs):
+        if self.nav_latency:
+            time.sleep(self.nav_latency)
+        self.url = url
+        self.stats['navigations'] += 1
+        return self._exchange(url, True)
+
+    def run_js(self, script, *args, timeout=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        self.stats['scripts'] += 1
+        expression = script[len('return '):] if script.startswith('return ') else script
+        return self._exchange(script, fake_evaluate(expression))
+
+    def run_cdp(self, cmd, **cmd_args):
+        """记录 CDP 命令（self.cdp_calls），Browser.getVersion 返回固定 UA，其他返回空结果"""
+        self.cdp_calls.append((cmd, cmd_args))
+        if cmd == 'Browser.getVersion':
+            return self._exchange(cmd, {'product': f'Chrome/{self.browser.version}',
+                                        'userAgent': FAKE_USER_AGENT})
+        return self._exchange(cmd, {})
+
+    def quit(self, *args, **kwargs):
+        pass
@@ -7,163 +7,101 @@
 用法:
     python fingerprint-collector.py --url https://example.com
     python fingerprint-collector.py --url https://example.com --output env.json
+    cat urls.txt | python fingerprint-collector.py --urls - --output-dir fingerprints -c 4
 """
 
 import json
 import argparse
 from pathlib import Path
-try:
-    from DrissionPage import ChromiumPage, ChromiumOptions
-except ImportError:
-    print("❌ 请先安装 DrissionPage: pip install DrissionPage")
-    exit(1)
 
-def collect_fingerprint(url='about:blank', headless=False):
-    """采集浏览器指纹"""
+from batch import add_batch_arguments, run_batch_cli
+from template_store import TemplateStore, add_store_arguments
+from jsonl_sink import add_sink_arguments, open_sink
+from launch_profile import LaunchProfile, add_launch_arguments, launch_profile_from_args
+from readiness import navigate as navigate_and_wait, add_wait_arguments
+from probes import (
+    build_batch_script, unpack_batch_result, layout_probes, assemble_layout,
+    describe_layout, add_sections_arguments, raw_blobs_path, save_raw_blobs
+)
+
+def collect_fingerprint(url='about:blank', headless=False, page=None, timeout=None,
+                        wait='load', wait_timeout=10, raw_blobs=False,
+                        sections=None, launch=None):
+    """
+    采集浏览器指纹
     
-    print(f"🚀 启动浏览器...")
+    Args:
+        url: 要访问的URL
+        headless: 是否无头模式
+        page: 外部提供的页面/标签页（如 BrowserPool 借出的标签页），
+              提供时复用该页面，不再启动和关闭浏览器
+        timeout: 页面加载超时时间（秒），默认使用 DrissionPage 配置
+        wait: 页面就绪策略（见 readiness.py）
+        wait_timeout: 就绪等待的硬性截止时间（秒）
+        raw_blobs: 同时回传 canvas dataURL 和音频采样（由 save_raw_blobs 写到旁路文件），
+                   默认只回传页面内计算的摘要
+        sections: 只采集指定分段（见 probes.LAYOUTS['fingerprint']），None 表示全部
+        launch: LaunchProfile（见 launch_profile.py），默认按 headless 使用默认启动参数
+    """
     
-    # 配置浏览器
-    co = ChromiumOptions()
-    if headless:
-        co.headless()
+    owns_page = page is None
     
-    page = ChromiumPage(co)
+    if owns_page:
+        print(f"🚀 启动浏览器...")
+        
+        # 按启动配置启动浏览器
+        launch = launch or LaunchProfile(headless=headless)
+        page = launch.launch()
+        print(f"⏱️ 浏览器启动: {launch.describe()}")
     
     try:
-        # 访问页面
+        # 访问页面并按策略等待就绪
+        readiness = None
         if url != 'about:blank':
             print(f"📄 访问页面: {url}")
-            page.get(url)
+            readiness = navigate_and_wait(page, url, wait, wait_timeout, timeout)
+            if readiness['timedOut']:
+                print(f"⚠️ 等待就绪超时 ({wait}, {wait_timeout}s)，继续采集")
         
         print("🔍 采集环境指纹...")
         
-        # 采集脚本
-        collect_script = """
-        return {
-            // Navigator 信息
-            navigator: {
-                userAgent: navigator.userAgent,
-                vendor: navigator.vendor,
-                platform: navigator.platform,
-                language: navigator.language,
-                languages: Array.from(navigator.languages || []),
-                hardwareConcurrency: navigator.hardwareConcurrency,
-                deviceMemory: navigator.deviceMemory,
-                maxTouchPoints: navigator.maxTouchPoints,
-                webdriver: navigator.webdriver,
-                cookieEnabled: navigator.cookieEnabled,
-                doNotTrack: navigator.doNotTrack,
-                plugins: Array.from(navigator.plugins || []).map(p => ({
-                    name: p.name,
-                    description: p.description,
-                    filename: p.filename
-                }))
-            },
-            
-            // Screen 信息
-            screen: {
-                width: screen.width,
-                height: screen.height,
-                availWidth: screen.availWidth,
-                availHeight: screen.availHeight,
-                colorDepth: screen.colorDepth,
-                pixelDepth: screen.pixelDepth
-            },
-            
-            // Window 信息
-            window: {
-                innerWidth: window.innerWidth,
-                innerHeight: window.innerHeight,
-                outerWidth: window.outerWidth,
-                outerHeight: window.outerHeight,
-                devicePixelRatio: window.devicePixelRatio,
-                screenX: window.screenX,
-                screenY: window.screenY
-            },
-            
-            // Timezone
-            timezone: {
-                offset: new Date().getTimezoneOffset(),
-                timezone: Intl.DateTimeFormat().resolvedOptions().timeZone
-            },
-            
-            // WebGL 信息
-            webgl: (() => {
-                try {
-                    const canvas = document.createElement('canvas');
-                    const gl = canvas.getContext('webgl') || canvas.getContext('experimental-webgl');
-                    if (!gl) return null;
-                    
-                    const debugInfo = gl.getExtension('WEBGL_debug_renderer_info');
-                    return {
-                        vendor: gl.getParameter(gl.VENDOR),
-                        renderer: gl.getParameter(gl.RENDERER),
-                        version: gl.getParameter(gl.VERSION),
-                        shadingLanguageVersion: gl.getParameter(gl.SHADING_LANGUAGE_VERSION),
-                        unmaskedVendor: debugInfo ? gl.getParameter(debugInfo.UNMASKED_VENDOR_WEBGL) : null,
-                        unmaskedRenderer: debugInfo ? gl.getParameter(debugInfo.UNMASKED_RENDERER_WEBGL) : null
-                    };
-                } catch (e) {
-                    return { error: e.message };
-                }
-            })(),
-            
-            // Canvas 指纹
-            canvas: (() => {
-                try {
-                    const canvas = document.createElement('canvas');
-                    const ctx = canvas.getContext('2d');
-                    ctx.textBaseline = 'top';
-                    ctx.font = '14px Arial';
-                    ctx.fillText('Hello, World!', 2, 2);
-                    return canvas.toDataURL().substring(0, 100) + '...';
-                } catch (e) {
-                    return { error: e.message };
-                }
-            })(),
-            
-            // Audio 指纹
-            audio: (() => {
-                try {
-                    const AudioContext = window.AudioContext || window.webkitAudioContext;
-                    if (!AudioContext) return null;
-                    const context = new AudioContext();
-                    return {
-                        sampleRate: context.sampleRate,
-                        state: context.state,
-                        maxChannelCount: context.destination.maxChannelCount
-                    };
-                } catch (e) {
-                    return { error: e.message };
-                }
-            })(),
-            
-            // 特征检测
-            features: {
-                localStorage: typeof localStorage !== 'undefined',
-                sessionStorage: typeof sessionStorage !== 'undefined',
-                indexedDB: typeof indexedDB !== 'undefined',
-                webWorker: typeof Worker !== 'undefined',
-                serviceWorker: 'serviceWorker' in navigator,
-                webRTC: typeof RTCPeerConnection !== 'undefined',
-                webSocket: typeof WebSocket !== 'undefined',
-                geolocation: 'geolocation' in navigator,
-                notification: 'Notification' in window,
-                permissions: 'permissions' in navigator
-            }
-        };
-        """
-        
-        # 执行采集
-        fingerprint = page.run_js(collect_script)
+        # 按分段执行注册表中的探针（合并为一次 run_js）
+        names = layout_probes('fingerprint', sections, raw_blobs)
+        values, errors = unpack_batch_result(page.run_js(build_batch_script(names)), names)
+        for name, error in errors.items():
+            print(f"⚠️ 探针 {name} 失败: {error}")
+        fingerprint = assemble_layout('fingerprint', values, errors, sections)
+        if readiness:
+            fingerprint['readiness'] = readiness
         
         print("✅ 指纹采集完成!")
         return fingerprint
         
     finally:
-        page.quit()
-        print("🔚 浏览器已关闭")
+        if owns_page:
+            launch.quit(page)
+            print("🔚 浏览器已关闭")
+
+
+def run_batch_mode(args):
+    """批量模式：共享浏览器、多标签页并发采集 URL 列表"""
+    
+    def collect_one(page, url, timeout):
+        return collect_fingerprint(url, page=page, timeout=timeout,
+                                   wait=args.wait, wait_timeout=args.wait_timeout,
+                                   raw_blobs=args.raw_blobs, sections=args.sections)
+    
+    store = TemplateStore(args.store) if args.store else None
+    
+    def write_one(fingerprint, path, url):
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(fingerprint, f, indent=2 if args.pretty else None, ensure_ascii=False)
+        if store:
+            store.put(fingerprint)
+    
+    return run_batch_cli(args, collect_one, write_one, headless=args.headless,
+                         sink_prefix='fingerprint')
 
 
 def main():
@@ -172,12 +110,49 @@ def main():
     parser.add_argument('--output', '-o', help='输出文件路径 (JSON)')
     parser.add_argument('--headless', action='store_true', help='无头模式运行')
     parser.add_argument('--pretty', action='store_true', help='格式化JSON输出')
+    parser.add_argument('--raw-blobs', action='store_true',
+                        help='同时保存 canvas dataURL 和音频采样到 .raw.json 旁路文件（默认只保存摘要）')
+    add_sections_arguments(parser, 'fingerprint')
+    add_store_arguments(parser)
+    add_sink_arguments(parser)
+    add_launch_arguments(parser)
+    add_wait_arguments(parser)
+    add_batch_arguments(parser)
     
     args = parser.parse_args()
     
+    if args.list_sections:
+        print('\n'.join(describe_layout('fingerprint')))
+        return 0
+    
+    try:
+        layout_probes('fingerprint', args.sections)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    if args.urls:
+        return run_batch_mode(args)
+    
     try:
         # 采集指纹
-        fingerprint = collect_fingerprint(args.url, args.headless)
+        fingerprint = collect_fingerprint(args.url, args.headless,
+                                          wait=args.wait, wait_timeout=args.wait_timeout,
+                                          raw_blobs=args.raw_blobs, sections=args.sections,
+                                          launch=launch_profile_from_args(args, headless=args.headless))
+        
+        raw_path = save_raw_blobs(fingerprint, raw_blobs_path(args.output or 'fingerprint.json'))
+        if raw_path:
+            print(f"🧾 原始数据已保存到: {raw_path}")
+        
+        if args.store:
+            template_id = TemplateStore(args.store).put(fingerprint)
+            print(f"📦 已写入模板仓库: {args.store} (ID: {template_id})")
+        
+        if args.sink:
+            with open_sink(args, prefix='fingerprint') as sink:
+                path, _ = sink.write(fingerprint)
+            print(f"🗂️ 已追加到 JSONL 分片: {path}")
         
         # 输出结果
         if args.output:
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式 JSONL 输出
+
+每次采集写成一行紧凑 JSON，追加到按大小轮转的分片文件中，
+批量采集时只产生少量大的顺序文件，而不是成千上万个小文件。
+
+分片格式:
+    <dir>/<prefix>-00001.jsonl[.gz|.zst]   数据，按块压缩
+    <dir>/<prefix>-00001.jsonl[.gz|.zst].idx  偏移索引，每条记录 20 字节
+
+压缩时多条记录攒成一块（block_bytes），每块是一个独立的 gzip 成员
+或 zstd 帧，整个文件仍可以直接用 zcat / zstdcat 读取。索引记录每条
+记录所在块的 (偏移, 长度) 和块内 (位置, 长度)，随机读取一条记录只需
+读一个块。
+
+fsync 策略:
+    never   不主动 fsync
+    rotate  分片关闭时 fsync（默认）
+    block   每写出一块 fsync
+    record  每条记录单独成块并 fsync（最安全，压缩率最差）
+
+用法:
+    with JsonlSink('corpus', compress='gzip') as sink:
+        sink.write(data)
+
+    reader = JsonlReader('corpus')
+    for record in reader:        # 逐块流式读取
+        ...
+    record = reader[1234]        # 按索引随机读取
+
+    python jsonl_sink.py cat corpus
+    python jsonl_sink.py get corpus 1234
+    python jsonl_sink.py stats corpus
+"""
+
+import os
+import re
+import sys
+import json
+import gzip
+import zlib
+import struct
+import argparse
+import threading
+from pathlib import Path
+
+
+COMPRESS_SUFFIXES = {'none': '.jsonl', 'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+
+FSYNC_POLICIES = ('never', 'rotate', 'block', 'record')
+
+# 索引项: 块偏移, 块长度, 块内位置, 记录长度
+INDEX_ENTRY = struct.Struct('<QIII')
+
+READ_CHUNK = 1024 * 1024
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        print("请先安装 zstandard: pip install zstandard")
+        sys.exit(1)
+    return zstandard
+
+
+def compression_of(path):
+    """根据文件名判断压缩方式"""
+    name = str(path)
+    if name.endswith('.gz'):
+        return 'gzip'
+    if name.endswith('.zst'):
+        return 'zstd'
+    return 'none'
+
+
+def encode_record(record):
+    """一条记录编码为一行紧凑 JSON"""
+    return (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class JsonlSink:
+    """按大小轮转、可压缩的 JSONL 写入器（线程安全）"""
+
+    def __init__(self, directory, prefix='collect', compress='gzip', level=6,
+                 max_bytes=256 * 1024 * 1024, max_records=None,
+                 block_bytes=1024 * 1024, fsync='rotate'):
+        """
+        初始化写入器
+
+        Args:
+            directory: 输出目录
+            prefix: 分片文件名前缀
+            compress: none | gzip | zstd
+            level: 压缩级别
+            max_bytes: 单个分片的最大字节数（磁盘上的大小），超过后轮转
+            max_records: 单个分片的最大记录数，None 表示不限
+            block_bytes: 压缩块的未压缩大小上限
+            fsync: fsync 策略，见模块说明
+        """
+        if compress not in COMPRESS_SUFFIXES:
+            raise ValueError(f'未知的压缩方式: {compress}')
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f'未知的 fsync 策略: {fsync}')
+
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.compress = compress
+        self.level = level
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.block_bytes = block_bytes
+        self.fsync = fsync
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._compressor = _zstd().ZstdCompressor(level=level) if compress == 'zstd' else None
+        self._part = self._last_part()
+        self._file = None
+        self._index = None
+        self._path = None
+        self._offset = 0
+        self._records = 0
+        self._block = []
+        self._block_size = 0
+        self.stats = {'records': 0, 'files': 0, 'rawBytes': 0, 'writtenBytes': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def path(self):
+        """当前分片路径（尚未打开时为 None）"""
+        return self._path
+
+    def _last_part(self):
+        pattern = re.compile(re.escape(self.prefix) + r'-(\d+)\.jsonl')
+        parts = [int(m.group(1)) for m in map(pattern.match, os.listdir(self.directory)) if m]
+        return max(parts, default=0)
+
+    def _open(self):
+        # 已有分片从不追加，重新打开时接着编号
+        self._part += 1
+        self._path = self.directory / f'{self.prefix}-{self._part:05d}{COMPRESS_SUFFIXES[self.compress]}'
+        self._file = open(self._path, 'wb')
+        self._index = open(f'{self._path}.idx', 'wb')
+        self._offset = 0
+        self._records = 0
+        self.stats['files'] += 1
+
+    def _sync(self):
+        for f in (self._file, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _flush_block(self):
+        if not self._block:
+            return
+        raw = b''.join(self._block)
+        if self.compress == 'gzip':
+            data = gzip.compress(raw, compresslevel=self.level)
+        elif self.compress == 'zstd':
+            data = self._compressor.compress(raw)
+        else:
+            data = raw
+
+        entries = []
+        pos = 0
+        for line in self._block:
+            if self.compress == 'none':
+                entries.append(INDEX_ENTRY.pack(self._offset + pos, len(line), 0, len(line)))
+            else:
+                entries.append(INDEX_ENTRY.pack(self._offset, len(data), pos, len(line)))
+            pos += len(line)
+
+        self._file.write(data)
+        self._index.write(b''.join(entries))
+        self._offset += len(data)
+        self.stats['writtenBytes'] += len(data)
+        self._block = []
+        self._block_size = 0
+
+        if self.fsync in ('block', 'record'):
+            self._sync()
+        else:
+            self._file.flush()
+            self._index.flush()
+
+    def _close_file(self):
+        if not self._file:
+            return
+        self._flush_block()
+        if self.fsync != 'never':
+            self._sync()
+        self._file.close()
+        self._index.close()
+        self._file = self._index = None
+
+    def write(self, record):
+        """
+        追加一条记录
+
+        Returns:
+            tuple: (分片路径, 分片内序号)
+        """
+        line = encode_record(record)
+        with self._lock:
+            if self._file is None:
+                self._open()
+
+            self._block.append(line)
+            self._block_size += len(line)
+            position = (self._path, self._records)
+            self._records += 1
+            self.stats['records'] += 1
+            self.stats['rawBytes'] += len(line)
+
+            if self.fsync == 'record' or self._block_size >= self.block_bytes:
+                self._flush_block()
+
+            full = self.max_records and self._records >= self.max_records
+            if full or self._offset + self._block_size >= self.max_bytes:
+                self._close_file()
+
+        return position
+
+    def flush(self):
+        """把当前块写出到磁盘（按策略 fsync）"""
+        with self._lock:
+            if self._file:
+                self._flush_block()
+
+    def close(self):
+        with self._lock:
+            self._close_file()
+
+
+def _iter_gzip_blocks(f):
+    """逐个 gzip 成员读取，返回 (偏移, 长度, 解压数据)；末尾不完整的成员被忽略"""
+    offset = 0
+    pending = b''
+    while True:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        start = offset
+        out = []
+        data = pending
+        while True:
+            if not data:
+                data = f.read(READ_CHUNK)
+                if not data:
+                    return
+            out.append(decompressor.decompress(data))
+            if decompressor.eof:
+                pending = decompressor.unused_data
+                offset += len(data) - len(pending)
+                break
+            offset += len(data)
+            data = b''
+        yield start, offset - start, b''.join(out)
+
+
+def _iter_zstd_blocks(f):
+    """逐个 zstd 帧读取，返回 (偏移, 长度, 解压数据)；末尾不完整的帧被忽略"""
+    zstandard = _zstd()
+    offset = 0
+    pending = b''
+    while True:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        start = offset
+        out = []
+        data = pending
+        while True:
+            if not data:
+                data = f.read(READ_CHUNK)
+                if not data:
+                    return
+            out.append(decompressor.decompress(data))
+            if decompressor.eof:
+                pending = decompressor.unused_data
+                offset += len(data) - len(pending)
+                break
+            offset += len(data)
+            data = b''
+        yield start, offset - start, b''.join(out)
+
+
+def iter_blocks(path):
+    """
+    流式读取分片中的块
+
+    未压缩文件每行算一块。内存占用只与块大小有关，与文件大小无关。
+
+    Yields:
+        tuple: (偏移, 长度, 解压后的数据)
+    """
+    kind = compression_of(path)
+    with open(path, 'rb') as f:
+        if kind == 'gzip':
+            yield from _iter_gzip_blocks(f)
+        elif kind == 'zstd':
+            yield from _iter_zstd_blocks(f)
+        else:
+            offset = 0
+            for line in f:
+                if line.endswith(b'\n'):
+                    yield offset, len(line), line
+                offset += len(line)
+
+
+def iter_file(path):
+    """逐条读取一个分片"""
+    for _, _, data in iter_blocks(path):
+        for line in data.splitlines():
+            if line.strip():
+                yield json.loads(line)
+
+
+def rebuild_index(path):
+    """
+    从数据文件重建偏移索引（写入进程崩溃、索引缺失时使用）
+
+    Returns:
+        int: 记录数
+    """
+    count = 0
+    plain = compression_of(path) == 'none'
+    with open(f'{path}.idx', 'wb') as index:
+        for offset, length, data in iter_blocks(path):
+            pos = 0
+            for line in data.splitlines(keepends=True):
+                if plain:
+                    index.write(INDEX_ENTRY.pack(offset, length, 0, length))
+                else:
+                    index.write(INDEX_ENTRY.pack(offset, length, pos, len(line)))
+                pos += len(line)
+                count += 1
+    return count
+
+
+def read_at(path, seq):
+    """
+    按分片内序号随机读取一条记录（读取一个索引项和一个块）
+
+    Args:
+        path: 分片路径
+        seq: 分片内序号（从 0 开始）
+    """
+    with open(f'{path}.idx', 'rb') as index:
+        index.seek(seq * INDEX_ENTRY.size)
+        entry = index.read(INDEX_ENTRY.size)
+    if len(entry) < INDEX_ENTRY.size:
+        raise IndexError(f'{path} 中没有第 {seq} 条记录')
+    offset, length, pos, size = INDEX_ENTRY.unpack(entry)
+
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(length)
+
+    kind = compression_of(path)
+    if kind == 'gzip':
+        data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data)
+    elif kind == 'zstd':
+        data = _zstd().ZstdDecompressor().decompressobj().decompress(data)
+    return json.loads(data[pos:pos + size])
+
+
+def index_count(path):
+    """分片中的记录数（由索引大小得出，不读数据）"""
+    try:
+        return os.path.getsize(f'{path}.idx') // INDEX_ENTRY.size
+    except OSError:
+        return 0
+
+
+class JsonlReader:
+    """读取单个分片或整个输出目录"""
+
+    def __init__(self, path, prefix=None):
+        """
+        Args:
+            path: 分片文件或 JsonlSink 的输出目录
+            prefix: 只读取指定前缀的分片
+        """
+        path = Path(path)
+        if path.is_dir():
+            pattern = re.compile(re.escape(prefix or '') + r'.*-\d+\.jsonl(\.gz|\.zst)?$')
+            self.files = sorted(p for p in path.iterdir() if pattern.match(p.name))
+        else:
+            self.files = [path]
+
+    def __iter__(self):
+        for path in self.files:
+            yield from iter_file(path)
+
+    def __len__(self):
+        return sum(index_count(path) for path in self.files)
+
+    def __getitem__(self, seq):
+        if seq < 0:
+            seq += len(self)
+        for path in self.files:
+            count = index_count(path)
+            if seq < count:
+                return read_at(path, seq)
+            seq -= count
+        raise IndexError('记录序号超出范围')
+
+
+def add_sink_arguments(parser):
+    """为采集器命令行添加 JSONL 输出参数"""
+    group = parser.add_argument_group('JSONL 输出')
+    group.add_argument('--sink', help='把结果追加到该目录下的 JSONL 分片（批量模式下不再逐个写文件）')
+    group.add_argument('--sink-compress', choices=list(COMPRESS_SUFFIXES), default='gzip',
+                       help='分片压缩方式（默认 gzip）')
+    group.add_argument('--sink-rotate-mb', type=float, default=256, help='单个分片的大小上限（MB）')
+    group.add_argument('--sink-fsync', choices=FSYNC_POLICIES, default='rotate',
+                       help='fsync 策略（默认 rotate）')
+    return group
+
+
+def open_sink(args, prefix='collect'):
+    """根据命令行参数创建写入器，未指定 --sink 时返回 None"""
+    if not getattr(args, 'sink', None):
+        return None
+    return JsonlSink(args.sink, prefix=prefix, compress=args.sink_compress,
+                     max_bytes=int(args.sink_rotate_mb * 1024 * 1024), fsync=args.sink_fsync)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSONL 分片读取工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    cat = sub.add_parser('cat', help='逐行输出全部记录')
+    cat.add_argument('path', help='分片文件或目录')
+
+    get = sub.add_parser('get', help='按序号读取一条记录')
+    get.add_argument('path', help='分片文件或目录')
+    get.add_argument('seq', type=int, help='记录序号（目录时为全局序号）')
+
+    stats = sub.add_parser('stats', help='分片统计')
+    stats.add_argument('path', help='分片文件或目录')
+
+    reindex = sub.add_parser('reindex', help='从数据文件重建索引')
+    reindex.add_argument('files', nargs='+', help='分片文件')
+
+    args = parser.parse_args()
+
+    if args.command == 'cat':
+        for record in JsonlReader(args.path):
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+    elif args.command == 'get':
+        print(json.dumps(JsonlReader(args.path)[args.seq], indent=2, ensure_ascii=False))
+    elif args.command == 'stats':
+        reader = JsonlReader(args.path)
+        info = {
+            'files': len(reader.files),
+            'records': len(reader),
+            'bytes': sum(os.path.getsize(p) for p in reader.files),
+        }
+        print(json.dumps(info, indent=2))
+    elif args.command == 'reindex':
+        for path in args.files:
+            print(f"{path}: {rebuild_index(path)} 条记录")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
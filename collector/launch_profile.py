@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器快速启动配置
+
+每次采集都要付一次浏览器启动的固定成本，单次命令行采集时它往往是总耗时的大头。
+快速启动配置做两件事:
+
+    - 追加 FAST_START_ARGUMENTS：关闭扩展、组件更新、后台网络、同步、首次运行向导等
+      与环境采集无关的启动工作。会改变页面可见指纹的参数（如 --disable-gpu、
+      定时器节流相关参数）不在其中
+    - 从预热过的用户目录模板启动：prewarm 启动一次浏览器完成首次运行的初始化
+      （生成 Local State、Preferences、组件目录等）后关闭，去掉缓存和锁文件保存为模板；
+      每个实例启动前用硬链接复制一份（clone_profile），复制成本与模板大小基本无关
+
+冷启动（cold）指从空的用户目录启动，热启动（warm）指从模板副本启动，
+用 bench 子命令可以比较两者以及默认参数的启动耗时。
+
+硬链接与模板共享 inode，浏览器原地改写的文件（SQLite 数据库、LevelDB 日志、
+Preferences 等，见 COPY_PATTERNS）改为真实复制，其余文件只建链接；
+跨文件系统无法建硬链接时自动退回复制。
+
+用法:
+    python launch_profile.py prewarm
+    python launch_profile.py bench --runs 5
+    python collect.py https://example.com --fast-start
+    python website-env-collector.py --url https://example.com --fast-start --profile-template /tmp/tpl
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import statistics
+from fnmatch import fnmatch
+from pathlib import Path
+from time import perf_counter
+
+
+# 快速启动参数：只关闭与环境采集无关的启动期工作
+FAST_START_ARGUMENTS = [
+    '--disable-extensions',
+    '--disable-component-extensions-with-background-pages',
+    '--disable-component-update',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-client-side-phishing-detection',
+    '--disable-domain-reliability',
+    '--disable-breakpad',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--no-service-autorun',
+    '--metrics-recording-only',
+    '--password-store=basic',
+    '--use-mock-keychain',
+    '--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication,'
+    'CertificateTransparencyComponentUpdater',
+]
+
+# 克隆出的用户目录名前缀，release_profile 只删除带此前缀的目录
+CLONE_PREFIX = 'envcol-profile-'
+
+# 模板目录中的说明文件
+TEMPLATE_MARKER = 'prewarmed.json'
+
+# 浏览器会原地改写的文件，克隆时真实复制（其余建硬链接）
+COPY_PATTERNS = (
+    'Local State', 'Preferences', 'Secure Preferences', '*.json',
+    'Cookies', 'History', 'Web Data', 'Login Data', 'Login Data For Account', 'Favicons',
+    'Top Sites', 'Shortcuts', 'Visited Links', 'Network Action Predictor', 'Network Persistent State',
+    'TransportSecurity', 'Trust Tokens', 'Reporting and NEL', 'DIPS', 'heavy_ad_intervention_opt_out.db',
+    '*.db', '*-journal', '*-wal', '*-shm',
+    'LOG', 'LOG.old', 'LOCK', 'CURRENT', 'MANIFEST-*', '*.log',
+)
+
+# 生成模板时删除的缓存、崩溃报告和锁文件
+VOLATILE_NAMES = (
+    'Singleton*', 'lockfile', 'DevToolsActivePort', 'RunningChromeVersion',
+    'Cache', 'Code Cache', 'GPUCache', 'GrShaderCache', 'ShaderCache', 'GraphiteDawnCache',
+    'DawnCache', 'DawnGraphiteCache', 'DawnWebGPUCache', 'Crashpad', 'Crash Reports',
+    'BrowserMetrics*', 'component_crx_cache', 'Sessions', 'Session Storage',
+)
+
+
+def default_template_dir(browser='chrome'):
+    """默认模板目录：$XDG_CACHE_HOME（或 ~/.cache）/js-sandbox-env/profile-template-<browser>"""
+    root = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(root) / 'js-sandbox-env' / f'profile-template-{browser}'
+
+
+def free_port():
+    """取一个空闲的本地端口（指定用户目录时 DrissionPage 不再自动分配端口）"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def template_info(template_dir):
+    """
+    读取模板说明
+
+    Returns:
+        dict: {browser, version, createdAt, launchMs}，不是有效模板时返回 None
+    """
+    try:
+        with open(Path(template_dir) / TEMPLATE_MARKER, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _must_copy(name):
+    return any(fnmatch(name, pattern) for pattern in COPY_PATTERNS)
+
+
+def _strip_volatile(root):
+    """删除缓存、崩溃报告和锁文件"""
+    for path in sorted(Path(root).rglob('*'), key=lambda p: len(p.parts), reverse=True):
+        if not any(fnmatch(path.name, pattern) for pattern in VOLATILE_NAMES):
+            continue
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def clone_profile(template_dir=None, parent=None):
+    """
+    为一个浏览器实例准备用户目录
+
+    Args:
+        template_dir: 模板目录，None 时返回空目录（冷启动）
+        parent: 副本所在目录，默认系统临时目录
+
+    Returns:
+        tuple: (副本路径, {'linked': n, 'copied': n, 'ms': 耗时})
+    """
+    started = perf_counter()
+    dest = Path(tempfile.mkdtemp(prefix=CLONE_PREFIX, dir=parent))
+    stats = {'linked': 0, 'copied': 0}
+    if template_dir is not None:
+        template_dir = Path(template_dir)
+        for root, dirs, files in os.walk(template_dir):
+            target = dest / Path(root).relative_to(template_dir)
+            for name in dirs:
+                (target / name).mkdir(exist_ok=True)
+            for name in files:
+                if name == TEMPLATE_MARKER and Path(root) == template_dir:
+                    continue
+                src, dst = os.path.join(root, name), target / name
+                if not _must_copy(name):
+                    try:
+                        os.link(src, dst)
+                        stats['linked'] += 1
+                        continue
+                    except OSError:
+                        pass
+                shutil.copy2(src, dst)
+                stats['copied'] += 1
+    stats['ms'] = round((perf_counter() - started) * 1000, 3)
+    return dest, stats
+
+
+def release_profile(path):
+    """删除 clone_profile 创建的用户目录（其他路径不处理）"""
+    if path and Path(path).name.startswith(CLONE_PREFIX):
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def prewarm_template(template_dir=None, browser='chrome', headless=True):
+    """
+    启动一次浏览器生成用户目录模板（已存在时整体替换）
+
+    Args:
+        template_dir: 模板目录，默认 default_template_dir(browser)
+        browser: 浏览器类型 ('chrome' 或 'edge')
+        headless: 是否无头模式
+
+    Returns:
+        dict: 模板说明（见 template_info）
+    """
+    from browser_pool import build_options
+    from DrissionPage import ChromiumPage
+
+    template_dir = Path(template_dir or default_template_dir(browser))
+    template_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f'.{template_dir.name}-', dir=template_dir.parent))
+
+    try:
+        started = perf_counter()
+        page = ChromiumPage(addr_or_opts=build_options(browser, headless, fast_start=True,
+                                                       user_data_dir=staging))
+        launch_ms = (perf_counter() - started) * 1000
+        try:
+            page.get('about:blank')
+            page.run_js('return 1')
+            version = page.browser_version
+        finally:
+            page.quit()
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    _strip_volatile(staging)
+    info = {
+        'browser': browser,
+        'version': version,
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'launchMs': round(launch_ms, 3),
+    }
+    with open(staging / TEMPLATE_MARKER, 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2, ensure_ascii=False)
+
+    shutil.rmtree(template_dir, ignore_errors=True)
+    staging.replace(template_dir)
+    return info
+
+
+class LaunchProfile:
+    """采集器的浏览器启动方式：默认参数 / 快速启动参数 / 快速启动 + 模板"""
+
+    def __init__(self, browser='chrome', headless=True, fast_start=False, template=None, arguments=None):
+        """
+        Args:
+            browser: 浏览器类型 ('chrome' 或 'edge')
+            headless: 是否无头模式
+            fast_start: 追加 FAST_START_ARGUMENTS
+            template: 用户目录模板路径，提供时每个实例从模板副本启动（热启动），
+                      模板不存在时第一次启动前自动 prewarm
+            arguments: 启动参数列表，默认 browser_pool.DEFAULT_ARGUMENTS
+        """
+        self.browser = browser
+        self.headless = headless
+        self.fast_start = fast_start or template is not None
+        self.template = Path(template) if template is not None else None
+        self.arguments = arguments
+        self.last = None
+
+    @property
+    def mode(self):
+        return 'warm' if self.template is not None else 'cold'
+
+    def ensure_template(self):
+        """模板不存在时生成"""
+        if self.template is not None and template_info(self.template) is None:
+            print(f"生成用户目录模板: {self.template}")
+            info = prewarm_template(self.template, self.browser, self.headless)
+            print(f"模板已生成（{info['browser']} {info['version']}，首次启动 {info['launchMs']:.0f}ms）")
+
+    def options(self, auto_port=False):
+        """
+        构建启动配置，有模板时先克隆一份用户目录
+
+        Args:
+            auto_port: 没有模板时是否由 DrissionPage 自动分配端口和用户目录
+
+        Returns:
+            ChromiumOptions: 启动配置
+        """
+        from browser_pool import build_options
+
+        user_data_dir = None
+        clone = None
+        if self.template is not None:
+            self.ensure_template()
+            user_data_dir, clone = clone_profile(self.template)
+        self.last = {'mode': self.mode, 'fastStart': self.fast_start, 'clone': clone}
+        return build_options(self.browser, self.headless, self.arguments, auto_port,
+                             fast_start=self.fast_start, user_data_dir=user_data_dir)
+
+    def launch(self, options=None):
+        """
+        启动浏览器
+
+        Args:
+            options: 已由 self.options() 构建的启动配置，默认新建
+
+        Returns:
+            ChromiumPage: 页面；启动信息保存在 self.last（mode、fastStart、clone、launchMs）
+        """
+        from DrissionPage import ChromiumPage
+
+        options = options or self.options()
+        started = perf_counter()
+        try:
+            page = ChromiumPage(addr_or_opts=options)
+        except Exception:
+            release_profile(options.user_data_path)
+            raise
+        self.last['launchMs'] = round((perf_counter() - started) * 1000, 3)
+        return page
+
+    def quit(self, page):
+        """关闭浏览器并删除克隆的用户目录"""
+        try:
+            path = page.browser.user_data_path
+        except Exception:
+            path = None
+        page.quit()
+        release_profile(path)
+
+    def describe(self):
+        """启动信息的一行说明"""
+        if not self.last or 'launchMs' not in self.last:
+            return ''
+        text = f"{self.last['mode']}{' fast' if self.fast_start else ''} 启动 {self.last['launchMs']:.0f}ms"
+        if self.last.get('clone'):
+            clone = self.last['clone']
+            text += f"（复制模板 {clone['ms']:.0f}ms，链接 {clone['linked']} / 复制 {clone['copied']} 个文件）"
+        return text
+
+
+def add_launch_arguments(parser):
+    """为采集器命令行添加启动配置参数"""
+    group = parser.add_argument_group('启动配置')
+    group.add_argument('--fast-start', action='store_true',
+                       help='快速启动：关闭扩展/组件更新/后台网络/首次运行，并从预热的用户目录模板启动')
+    group.add_argument('--profile-template',
+                       help=f'用户目录模板路径（隐含 --fast-start，默认 {default_template_dir()}，不存在时自动生成）')
+    group.add_argument('--no-profile-template', dest='use_template', action='store_false', default=True,
+                       help='--fast-start 时只追加启动参数，不使用模板')
+    return group
+
+
+def launch_profile_from_args(args, browser='chrome', headless=True):
+    """根据 add_launch_arguments 添加的参数构建 LaunchProfile（参数缺失时为默认启动方式）"""
+    fast_start = getattr(args, 'fast_start', False)
+    template = getattr(args, 'profile_template', None)
+    if fast_start and template is None and getattr(args, 'use_template', True):
+        template = default_template_dir(browser)
+    if not getattr(args, 'use_template', True):
+        template = None
+    return LaunchProfile(browser, headless, fast_start=fast_start, template=template)
+
+
+def _timed_launch(browser, headless, fast_start, template, runs):
+    """启动 runs 次并返回每次的 (启动耗时, 首次 JS 往返耗时)，单位 ms"""
+    from browser_pool import DEFAULT_ARGUMENTS, build_options
+    from DrissionPage import ChromiumPage
+
+    samples = []
+    for _ in range(runs):
+        # 冷启动每次都用新的空目录，避免 DrissionPage 默认用户目录被上一次启动预热
+        user_data_dir, clone = clone_profile(template)
+        options = build_options(browser, headless, DEFAULT_ARGUMENTS, fast_start=fast_start,
+                                user_data_dir=user_data_dir)
+        try:
+            started = perf_counter()
+            page = ChromiumPage(addr_or_opts=options)
+            launched = perf_counter()
+            page.run_js('return 1')
+            ready = perf_counter()
+            page.quit()
+        finally:
+            release_profile(user_data_dir)
+        samples.append({
+            'cloneMs': clone['ms'],
+            'launchMs': round((launched - started) * 1000, 3),
+            'firstJsMs': round((ready - launched) * 1000, 3),
+        })
+    return samples
+
+
+def _summary(samples):
+    totals = [s['cloneMs'] + s['launchMs'] + s['firstJsMs'] for s in samples]
+    return {
+        'runs': len(samples),
+        'medianMs': round(statistics.median(totals), 3),
+        'minMs': round(min(totals), 3),
+        'maxMs': round(max(totals), 3),
+        'medianLaunchMs': round(statistics.median(s['launchMs'] for s in samples), 3),
+        'medianCloneMs': round(statistics.median(s['cloneMs'] for s in samples), 3),
+        'samples': samples,
+    }
+
+
+def bench(browser='chrome', headless=True, runs=5, template=None):
+    """
+    比较三种启动方式的耗时（clone + 启动 + 首次 JS 往返）
+
+    Args:
+        browser: 浏览器类型
+        headless: 是否无头模式
+        runs: 每种方式的启动次数
+        template: 模板目录，默认 default_template_dir(browser)，不存在时先生成
+
+    Returns:
+        dict: {'default-cold': 汇总, 'fast-cold': 汇总, 'fast-warm': 汇总}
+    """
+    template = Path(template or default_template_dir(browser))
+    if template_info(template) is None:
+        prewarm_template(template, browser, headless)
+    return {
+        'default-cold': _summary(_timed_launch(browser, headless, False, None, runs)),
+        'fast-cold': _summary(_timed_launch(browser, headless, True, None, runs)),
+        'fast-warm': _summary(_timed_launch(browser, headless, True, template, runs)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='浏览器快速启动配置')
+    parser.add_argument('--browser', '-b', choices=['chrome', 'edge'], default='chrome', help='浏览器类型')
+    parser.add_argument('--headless', action='store_true', default=True, help='无头模式')
+    parser.add_argument('--no-headless', dest='headless', action='store_false', help='有头模式')
+    parser.add_argument('--template', help='模板目录，默认 ~/.cache/js-sandbox-env/profile-template-<browser>')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('prewarm', help='生成（或刷新）用户目录模板')
+    sub.add_parser('info', help='查看模板信息')
+    sub.add_parser('args', help='打印快速启动参数')
+    b = sub.add_parser('bench', help='比较冷启动和热启动耗时')
+    b.add_argument('--runs', type=int, default=5, help='每种方式的启动次数')
+    b.add_argument('--json', action='store_true', help='输出 JSON')
+
+    args = parser.parse_args()
+    template = Path(args.template) if args.template else default_template_dir(args.browser)
+
+    if args.command == 'args':
+        print('\n'.join(FAST_START_ARGUMENTS))
+    elif args.command == 'info':
+        info = template_info(template)
+        if info is None:
+            print(f"模板不存在: {template}")
+            return 1
+        size = sum(p.stat().st_size for p in template.rglob('*') if p.is_file())
+        print(f"模板: {template}")
+        print(f"浏览器: {info['browser']} {info['version']}")
+        print(f"生成时间: {info['createdAt']}")
+        print(f"大小: {size / 1024:.0f} KB")
+    elif args.command == 'prewarm':
+        info = prewarm_template(template, args.browser, args.headless)
+        print(f"模板已生成: {template} ({info['browser']} {info['version']}，首次启动 {info['launchMs']:.0f}ms)")
+    elif args.command == 'bench':
+        result = bench(args.browser, args.headless, args.runs, template)
+        if args.json:
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+            return 0
+        baseline = result['default-cold']['medianMs']
+        print(f"{'方式':<14}{'中位数':>10}{'最小':>10}{'最大':>10}{'启动':>10}{'复制':>8}")
+        for name, summary in result.items():
+            print(f"{name:<14}{summary['medianMs']:>8.0f}ms{summary['minMs']:>8.0f}ms{summary['maxMs']:>8.0f}ms"
+                  f"{summary['medianLaunchMs']:>8.0f}ms{summary['medianCloneMs']:>6.0f}ms")
+        warm = result['fast-warm']['medianMs']
+        if warm:
+            print(f"\n热启动比默认冷启动快 {baseline / warm:.2f}x（{baseline - warm:.0f}ms）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
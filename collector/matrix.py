@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+设备画像矩阵采集
+
+在同一个预热的标签页上，通过 DevTools Emulation.* 覆盖依次切换设备画像
+（UA、视口、DPR、触屏、语言、时区），每个画像采集一份模板。
+N 个设备类型只需要一次浏览器启动，之后每个变体只是几条 CDP 命令。
+
+画像字段（均可省略，省略的项保持浏览器默认值）:
+    name                 变体名称（输出文件名）
+    userAgent            UA 字符串
+    platform             navigator.platform
+    acceptLanguage       Accept-Language / navigator.languages
+    userAgentMetadata    Client Hints 元数据（Emulation.setUserAgentOverride 同名参数）
+    viewport             {width, height}
+    screen               {width, height}，默认与 viewport 相同
+    deviceScaleFactor    设备像素比
+    mobile               是否按移动端布局
+    touch                最大触点数，0 或省略表示关闭触屏
+    locale               ICU 语言区域，如 zh-CN
+    timezone             时区 ID，如 Asia/Shanghai
+    hardwareConcurrency  navigator.hardwareConcurrency
+
+说明:
+    - 覆盖只对当前标签页生效，切换画像后重新导航，保证页面脚本看到的是新画像
+    - 分段缓存按浏览器区分，不区分画像，矩阵模式不使用分段缓存
+
+用法:
+    python matrix.py https://example.com --profiles desktop-1080p,iphone-14 --output-dir templates/matrix
+    python matrix.py https://example.com --profiles-file profiles.json --output-dir templates/matrix
+    python matrix.py --list-profiles
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+from collect import BrowserEnvCollector, generate_env_code
+from launch_profile import add_launch_arguments, launch_profile_from_args
+from readiness import add_wait_arguments
+from probes import add_sections_arguments, layout_probes
+from template_store import TemplateStore, add_store_arguments
+from timing import TIMINGS_KEY, MetricsCollector, add_timing_arguments
+
+
+_CHROME_WIN = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+               '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+_CHROME_MAC = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+               '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+_CHROME_ANDROID = ('Mozilla/5.0 (Linux; Android 13; Pixel 7) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36')
+_SAFARI_IOS = ('Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 '
+               '(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1')
+_SAFARI_IPAD = ('Mozilla/5.0 (iPad; CPU OS 17_0 like Mac OS X) AppleWebKit/605.1.15 '
+                '(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1')
+
+# 内置画像
+BUILTIN_PROFILES = {
+    'desktop-1080p': {
+        'userAgent': _CHROME_WIN, 'platform': 'Win32', 'acceptLanguage': 'zh-CN,zh',
+        'viewport': {'width': 1920, 'height': 969}, 'screen': {'width': 1920, 'height': 1080},
+        'deviceScaleFactor': 1, 'mobile': False, 'touch': 0,
+        'locale': 'zh-CN', 'timezone': 'Asia/Shanghai', 'hardwareConcurrency': 8,
+    },
+    'laptop-retina': {
+        'userAgent': _CHROME_MAC, 'platform': 'MacIntel', 'acceptLanguage': 'en-US,en',
+        'viewport': {'width': 1440, 'height': 789}, 'screen': {'width': 1440, 'height': 900},
+        'deviceScaleFactor': 2, 'mobile': False, 'touch': 0,
+        'locale': 'en-US', 'timezone': 'America/Los_Angeles', 'hardwareConcurrency': 10,
+    },
+    'pixel-7': {
+        'userAgent': _CHROME_ANDROID, 'platform': 'Linux armv81', 'acceptLanguage': 'zh-CN,zh',
+        'viewport': {'width': 412, 'height': 839}, 'screen': {'width': 412, 'height': 915},
+        'deviceScaleFactor': 2.625, 'mobile': True, 'touch': 5,
+        'locale': 'zh-CN', 'timezone': 'Asia/Shanghai', 'hardwareConcurrency': 8,
+    },
+    'iphone-14': {
+        'userAgent': _SAFARI_IOS, 'platform': 'iPhone', 'acceptLanguage': 'zh-CN,zh-Hans',
+        'viewport': {'width': 390, 'height': 664}, 'screen': {'width': 390, 'height': 844},
+        'deviceScaleFactor': 3, 'mobile': True, 'touch': 5,
+        'locale': 'zh-CN', 'timezone': 'Asia/Shanghai',
+    },
+    'ipad': {
+        'userAgent': _SAFARI_IPAD, 'platform': 'iPad', 'acceptLanguage': 'zh-CN,zh-Hans',
+        'viewport': {'width': 820, 'height': 1106}, 'screen': {'width': 820, 'height': 1180},
+        'deviceScaleFactor': 2, 'mobile': True, 'touch': 5,
+        'locale': 'zh-CN', 'timezone': 'Asia/Shanghai',
+    },
+}
+
+PROFILE_FIELDS = {
+    'name', 'userAgent', 'platform', 'acceptLanguage', 'userAgentMetadata', 'viewport', 'screen',
+    'deviceScaleFactor', 'mobile', 'touch', 'locale', 'timezone', 'hardwareConcurrency',
+}
+
+
+def load_profiles(names=None, profiles_file=None):
+    """
+    加载画像列表
+
+    Args:
+        names: 逗号分隔的内置画像名称（或列表）
+        profiles_file: JSON 文件，内容为画像列表或 {name: 画像}
+
+    Returns:
+        list: 画像字典列表（都带 name）
+    """
+    profiles = []
+
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(',') if name.strip()]
+    for name in names or []:
+        if name not in BUILTIN_PROFILES:
+            raise ValueError(f"未知画像: {name}（可选: {', '.join(BUILTIN_PROFILES)}）")
+        profiles.append({'name': name, **BUILTIN_PROFILES[name]})
+
+    if profiles_file:
+        with open(profiles_file, 'r', encoding='utf-8') as f:
+            loaded = json.load(f)
+        if isinstance(loaded, dict):
+            loaded = [{'name': name, **profile} for name, profile in loaded.items()]
+        for index, profile in enumerate(loaded):
+            profiles.append({'name': f'profile-{index + 1}', **profile})
+
+    seen = set()
+    for profile in profiles:
+        unknown = set(profile) - PROFILE_FIELDS
+        if unknown:
+            raise ValueError(f"画像 {profile['name']} 含未知字段: {', '.join(sorted(unknown))}")
+        if profile['name'] in seen:
+            raise ValueError(f"画像名称重复: {profile['name']}")
+        seen.add(profile['name'])
+
+    return profiles
+
+
+def _try_cdp(page, method, **params):
+    """执行 CDP 命令，失败时返回错误信息（部分命令在旧版本浏览器上不存在）"""
+    try:
+        page.run_cdp(method, **params)
+        return None
+    except Exception as e:
+        return f'{method}: {e}'
+
+
+def clear_overrides(page, defaults=None):
+    """
+    清除矩阵模式设置的全部覆盖
+
+    Args:
+        page: DrissionPage 页面/标签页
+        defaults: capture_defaults 的结果（UA 和 CPU 核数覆盖没有清除命令，只能设回原值）
+    """
+    defaults = defaults or {}
+    _try_cdp(page, 'Emulation.clearDeviceMetricsOverride')
+    _try_cdp(page, 'Emulation.setTouchEmulationEnabled', enabled=False)
+    # 不带参数 / 空字符串表示取消覆盖；同一标签页上重复设置语言区域会报错，必须先取消
+    _try_cdp(page, 'Emulation.setLocaleOverride')
+    _try_cdp(page, 'Emulation.setTimezoneOverride', timezoneId='')
+    if defaults.get('userAgent'):
+        _try_cdp(page, 'Emulation.setUserAgentOverride', userAgent=defaults['userAgent'])
+    if defaults.get('hardwareConcurrency'):
+        _try_cdp(page, 'Emulation.setHardwareConcurrencyOverride',
+                 hardwareConcurrency=defaults['hardwareConcurrency'])
+
+
+def apply_profile(page, profile, default_user_agent=None):
+    """
+    在标签页上应用画像
+
+    Args:
+        page: DrissionPage 页面/标签页
+        profile: 画像字典
+        default_user_agent: 画像没有指定 UA 但需要设置 platform / 语言时使用的 UA
+
+    Returns:
+        list: 失败的命令（不支持的覆盖不会中断采集）
+    """
+    errors = []
+
+    def run(method, **params):
+        error = _try_cdp(page, method, **params)
+        if error:
+            errors.append(error)
+
+    user_agent = profile.get('userAgent') or default_user_agent
+    if user_agent and (profile.get('userAgent') or profile.get('platform') or profile.get('acceptLanguage')):
+        params = {'userAgent': user_agent}
+        for field in ('platform', 'acceptLanguage', 'userAgentMetadata'):
+            if profile.get(field):
+                params[field] = profile[field]
+        run('Emulation.setUserAgentOverride', **params)
+
+    viewport = profile.get('viewport')
+    if viewport or profile.get('deviceScaleFactor') or profile.get('mobile'):
+        viewport = viewport or {}
+        screen = profile.get('screen') or viewport
+        run('Emulation.setDeviceMetricsOverride',
+            width=viewport.get('width', 0), height=viewport.get('height', 0),
+            deviceScaleFactor=profile.get('deviceScaleFactor', 0),
+            mobile=bool(profile.get('mobile')),
+            screenWidth=screen.get('width', 0), screenHeight=screen.get('height', 0))
+
+    if profile.get('touch'):
+        run('Emulation.setTouchEmulationEnabled', enabled=True, maxTouchPoints=int(profile['touch']))
+
+    if profile.get('locale'):
+        run('Emulation.setLocaleOverride', locale=profile['locale'])
+
+    if profile.get('timezone'):
+        run('Emulation.setTimezoneOverride', timezoneId=profile['timezone'])
+
+    if profile.get('hardwareConcurrency'):
+        run('Emulation.setHardwareConcurrencyOverride',
+            hardwareConcurrency=int(profile['hardwareConcurrency']))
+
+    return errors
+
+
+def capture_defaults(page):
+    """
+    记录覆盖前的浏览器默认值
+
+    Returns:
+        dict: {userAgent, hardwareConcurrency}，取不到的为 None
+    """
+    defaults = {'userAgent': None, 'hardwareConcurrency': None}
+    try:
+        # Browser.getVersion 不受标签页覆盖影响
+        defaults['userAgent'] = page.run_cdp('Browser.getVersion').get('userAgent')
+    except Exception:
+        pass
+    try:
+        defaults['hardwareConcurrency'] = page.run_js('return navigator.hardwareConcurrency')
+    except Exception:
+        pass
+    return defaults
+
+
+def collect_matrix(page, url, profiles, wait='load', wait_timeout=10, batch=True,
+                   raw_blobs=False, sections=None, timings=False, on_variant=None):
+    """
+    在同一个标签页上按画像依次采集
+
+    Args:
+        page: 已启动的 DrissionPage 页面/标签页（调用方负责关闭）
+        url: 采集的URL（None 表示 about:blank）
+        profiles: load_profiles 的结果
+        wait / wait_timeout / batch / raw_blobs / sections / timings: 同 BrowserEnvCollector
+        on_variant: 回调 on_variant(profile, data, error)，每个变体完成后调用
+
+    Returns:
+        dict: {画像名称: 采集结果}，失败的变体不出现
+    """
+    defaults = capture_defaults(page)
+    results = {}
+
+    try:
+        for profile in profiles:
+            started = time.perf_counter()
+            clear_overrides(page, defaults)
+            errors = apply_profile(page, profile, defaults['userAgent'])
+            apply_ms = round((time.perf_counter() - started) * 1000, 1)
+
+            collector = BrowserEnvCollector(page=page, wait=wait, wait_timeout=wait_timeout,
+                                            raw_blobs=raw_blobs, sections=sections, timings=timings)
+            try:
+                data = collector.collect_all(url, batch=batch)
+            except Exception as e:
+                if on_variant:
+                    on_variant(profile, None, e)
+                continue
+
+            data['profile'] = {'name': profile['name'], 'applyMs': apply_ms, 'overrides': profile}
+            if errors:
+                data['profile']['errors'] = errors
+            results[profile['name']] = data
+            if on_variant:
+                on_variant(profile, data, None)
+    finally:
+        clear_overrides(page, defaults)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='设备画像矩阵采集（单标签页 CDP 模拟）')
+    parser.add_argument('url', nargs='?', default=None, help='要访问的URL')
+    parser.add_argument('--profiles', default='', help='内置画像名称，逗号分隔')
+    parser.add_argument('--profiles-file', help='画像 JSON 文件（列表或 {name: 画像}）')
+    parser.add_argument('--list-profiles', action='store_true', help='列出内置画像')
+    parser.add_argument('--output-dir', default='templates/matrix', help='输出目录，每个画像一个模板')
+    parser.add_argument('--browser', '-b', choices=['chrome', 'edge'], default='chrome', help='浏览器类型')
+    parser.add_argument('--headless', action='store_true', default=True, help='无头模式')
+    parser.add_argument('--no-headless', dest='headless', action='store_false', help='有头模式')
+    parser.add_argument('--gen-code', action='store_true', help='同时生成环境代码')
+    parser.add_argument('--no-batch', dest='batch', action='store_false', default=True,
+                        help='逐个探针采集（默认合并为一次 run_js）')
+    parser.add_argument('--raw-blobs', action='store_true',
+                        help='同时保存 canvas dataURL 和音频采样到 .raw.json 旁路文件（默认只保存摘要）')
+    add_sections_arguments(parser, 'template')
+    add_timing_arguments(parser)
+    add_launch_arguments(parser)
+    add_store_arguments(parser)
+    add_wait_arguments(parser)
+
+    args = parser.parse_args()
+
+    if args.list_profiles:
+        for name, profile in BUILTIN_PROFILES.items():
+            viewport = profile['viewport']
+            print(f"{name:<16}{viewport['width']}x{viewport['height']}@{profile['deviceScaleFactor']}  "
+                  f"{'mobile' if profile['mobile'] else 'desktop'}  {profile['locale']}  {profile['timezone']}")
+        return 0
+
+    try:
+        profiles = load_profiles(args.profiles, args.profiles_file)
+        layout_probes('template', args.sections, args.raw_blobs)
+    except (ValueError, OSError) as e:
+        print(e)
+        return 1
+    if not profiles:
+        print("需要 --profiles 或 --profiles-file")
+        return 1
+
+    output_dir = Path(args.output_dir)
+    store = TemplateStore(args.store) if args.store else None
+    metrics = MetricsCollector() if args.metrics_file else None
+    failed = []
+
+    def on_variant(profile, data, error):
+        if error is not None:
+            failed.append(profile['name'])
+            print(f"[{profile['name']}] 采集失败: {error}")
+            return
+        path = output_dir / f"{profile['name']}.json"
+        BrowserEnvCollector().save_to_file(data, path, quiet=True)
+        if args.gen_code:
+            with open(path.with_suffix('.js'), 'w', encoding='utf-8') as f:
+                f.write(generate_env_code(data))
+        if store:
+            store.put(data)
+        if metrics:
+            metrics.add(f"{args.url or 'about:blank'}#{profile['name']}", data.get(TIMINGS_KEY))
+        print(f"[{profile['name']}] 已保存: {path} (切换画像 {data['profile']['applyMs']}ms)")
+        for message in data['profile'].get('errors', []):
+            print(f"[{profile['name']}] 覆盖未生效: {message}")
+
+    print(f"启动浏览器，{len(profiles)} 个画像共用一个标签页...")
+    started = time.perf_counter()
+    launch = launch_profile_from_args(args, args.browser, args.headless)
+    page = launch.launch()
+    print(f"浏览器启动: {launch.describe()}")
+    try:
+        collect_matrix(page, args.url, profiles, wait=args.wait, wait_timeout=args.wait_timeout,
+                       batch=args.batch, raw_blobs=args.raw_blobs, sections=args.sections,
+                       timings=args.timings or bool(args.metrics_file), on_variant=on_variant)
+    finally:
+        launch.quit(page)
+        if metrics:
+            print(f"耗时指标已写入: {metrics.write(args.metrics_file)}")
+
+    print(f"\n完成: {len(profiles) - len(failed)}/{len(profiles)} 个画像，"
+          f"耗时 {time.perf_counter() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按路径定向采集
+
+沙箱运行脚本时会记录访问到但环境中不存在的路径（SandboxManager._getUndefinedPaths，
+GET /api/log/undefined）。补齐这些缺口不需要重新采集整个环境：这里把路径列表
+交给真实浏览器，在一次 run_js 中逐个解析，生成只包含这些值的最小补丁模板。
+
+每个路径解析为一个带类型的描述:
+    {"type": "value", "value": ...}                       JSON 可表示的原始值
+    {"type": "number", "value": "NaN"}                    NaN / Infinity
+    {"type": "undefined"}                                 属性存在但值为 undefined
+    {"type": "function", "name", "length", "native"}      函数（native 为原生函数）
+    {"type": "object", "className", "value", "length"?}   对象，value 为浅层原始值快照
+    {"type": "getter", "owner", "setter", "result"}       访问器属性，result 为读取结果的描述
+    {"type": "missing", "at"}                             真实浏览器中也不存在（at 为断开的段）
+    {"type": "error", "message"}                          读取时抛出异常
+
+路径格式与沙箱日志一致（'navigator.webdriver'、'window.screen.width'），
+也支持下标（'navigator.plugins[0].name'）。开头的 window / self / globalThis 会被去掉。
+
+用法:
+    python path_resolver.py --url https://example.com --paths undefined.log -o patch.json
+    python path_resolver.py --url https://example.com --log-url http://localhost:3000/api/log/undefined \\
+        --format js -o patch.js
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from contextlib import redirect_stdout
+from datetime import datetime
+from urllib.request import urlopen
+
+from launch_profile import LaunchProfile, add_launch_arguments, launch_profile_from_args
+from readiness import navigate as navigate_and_wait, add_wait_arguments
+from resource_blocking import ResourceBlocker, add_blocking_arguments, blocking_rules_from_args
+
+
+TEMPLATE_FORMAT = 'env-paths/1'
+
+DEFAULT_LOG_URL = 'http://localhost:3000/api/log/undefined'
+
+# 路径开头表示全局对象的名称
+GLOBAL_ALIASES = ('window', 'self', 'globalThis', 'top', 'parent', 'frames')
+
+# 对象快照最多保留的键数
+MAX_SNAPSHOT_KEYS = 64
+
+_TOKEN_RE = re.compile(r"""\[\s*(?:(\d+)|'([^']*)'|"([^"]*)")\s*\]|([^.\[\]]+)""")
+
+# undefined.log 的行格式: [时间] 路径 (fixed by xxx)
+_LOG_LINE_RE = re.compile(r'^\[(.*?)\]\s+(\S+)(?:\s+\((.*?)\))?\s*$')
+
+
+def parse_path(path):
+    """
+    把路径拆成属性名列表
+
+    Args:
+        path: 'window.navigator.plugins[0].name' 形式的路径
+
+    Returns:
+        list: 属性名列表（已去掉开头的全局对象名），无效路径返回空列表
+    """
+    tokens = []
+    for index, single, double, name in _TOKEN_RE.findall(path.strip()):
+        token = index or single or double or name
+        tokens.append(token.strip())
+    while len(tokens) > 1 and tokens[0] in GLOBAL_ALIASES:
+        tokens.pop(0)
+    return [t for t in tokens if t]
+
+
+def normalize_path(path):
+    """规范化为点分路径（去掉全局对象名，下标写成 .0）"""
+    return '.'.join(parse_path(path))
+
+
+def parse_path_source(text):
+    """
+    从日志内容中提取路径
+
+    支持 GET /api/log/undefined 的 JSON 响应、JSON 数组、
+    SandboxManager.execute 结果（undefinedPaths 字段）和 undefined.log 文本（每行一个）
+
+    Returns:
+        list: [{path, status}]
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    data = None
+    if text[0] in '[{':
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            # undefined.log 的行也以 [时间] 开头
+            data = None
+    if data is not None:
+        if isinstance(data, dict):
+            data = data.get('data') or data.get('undefinedPaths') or data.get('paths') or []
+        entries = []
+        for item in data:
+            if isinstance(item, str):
+                entries.append({'path': item, 'status': 'unfixed'})
+            elif isinstance(item, dict) and item.get('path'):
+                entries.append({'path': item['path'], 'status': item.get('status') or 'unfixed'})
+        return entries
+
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        match = _LOG_LINE_RE.match(line)
+        if match:
+            entries.append({'path': match.group(2), 'status': match.group(3) or 'unfixed'})
+        else:
+            entries.append({'path': line, 'status': 'unfixed'})
+    return entries
+
+
+def load_paths(source, include_fixed=False):
+    """
+    读取并去重待解析的路径
+
+    Args:
+        source: 文件路径、'-'（stdin）或 http(s) 地址（如 GET /api/log/undefined）
+        include_fixed: 包含日志中已标记为修复的路径
+
+    Returns:
+        list: 规范化后的路径（保持首次出现的顺序）
+    """
+    if source == '-':
+        text = sys.stdin.read()
+    elif re.match(r'https?://', source):
+        with urlopen(source, timeout=10) as response:
+            text = response.read().decode('utf-8')
+    else:
+        text = Path(source).read_text(encoding='utf-8')
+
+    paths = []
+    for entry in parse_path_source(text):
+        if not include_fixed and entry['status'] != 'unfixed':
+            continue
+        path = normalize_path(entry['path'])
+        if path:
+            paths.append(path)
+    return list(dict.fromkeys(paths))
+
+
+# 页面内的解析函数: R(路径列表) -> {路径: 描述}
+RESOLVE_FUNCTION = r"""
+function(paths, maxKeys) {
+    var nativeRe = /\{\s*\[native code\]\s*\}\s*$/;
+    var toStr = Function.prototype.toString;
+
+    function primitive(v) {
+        var t = typeof v;
+        if (v === null || t === 'string' || t === 'boolean') return { type: 'value', value: v };
+        if (t === 'number') return isFinite(v) ? { type: 'value', value: v } : { type: 'number', value: String(v) };
+        if (t === 'undefined') return { type: 'undefined' };
+        if (t === 'bigint' || t === 'symbol') return { type: t, value: String(v) };
+        return null;
+    }
+
+    function describe(v) {
+        var p = primitive(v);
+        if (p) return p;
+        if (typeof v === 'function') {
+            var source = '';
+            try { source = toStr.call(v); } catch (e) {}
+            return { type: 'function', name: v.name, length: v.length, native: nativeRe.test(source) };
+        }
+        var d = { type: 'object', className: Object.prototype.toString.call(v).slice(8, -1), value: {} };
+        try {
+            if (typeof v.length === 'number') d.length = v.length;
+            var count = 0;
+            for (var k in v) {
+                if (count >= maxKeys) { d.truncated = true; break; }
+                var item;
+                try { item = v[k]; } catch (e) { continue; }
+                var ip = primitive(item);
+                if (ip && ip.type === 'value') { d.value[k] = item; count++; }
+            }
+        } catch (e) {}
+        return d;
+    }
+
+    function resolve(tokens) {
+        var parent = window;
+        for (var i = 0; i < tokens.length - 1; i++) {
+            try { parent = parent[tokens[i]]; } catch (e) { return { type: 'error', message: String(e && e.message || e) }; }
+            if (parent === null || parent === undefined) return { type: 'missing', at: tokens.slice(0, i + 1).join('.') };
+        }
+        var key = tokens[tokens.length - 1];
+        var self = Object(parent), owner = self, desc = null;
+        while (owner && !(desc = Object.getOwnPropertyDescriptor(owner, key))) owner = Object.getPrototypeOf(owner);
+        if (!desc) return { type: 'missing', at: tokens.join('.') };
+
+        var ownerName = owner === self ? null
+            : (owner.constructor && owner.constructor.name ? owner.constructor.name + '.prototype' : null);
+        if (desc.get || desc.set) {
+            var result;
+            try { result = describe(parent[key]); } catch (e) { result = { type: 'error', message: String(e && e.message || e) }; }
+            return { type: 'getter', owner: ownerName, setter: !!desc.set, enumerable: !!desc.enumerable, result: result };
+        }
+        var d = describe(desc.value);
+        if (ownerName) d.owner = ownerName;
+        return d;
+    }
+
+    var out = {};
+    for (var i = 0; i < paths.length; i++) {
+        try { out[paths[i]] = resolve(paths[i].split('.')); }
+        catch (e) { out[paths[i]] = { type: 'error', message: String(e && e.message || e) }; }
+    }
+    return out;
+}
+"""
+
+
+def build_resolve_script(paths):
+    """
+    构建一次解析全部路径的 run_js 脚本
+
+    Args:
+        paths: 规范化后的点分路径列表
+
+    Returns:
+        str: 可直接传给 page.run_js 的脚本
+    """
+    return f'return ({RESOLVE_FUNCTION.strip()})({json.dumps(paths, ensure_ascii=False)}, {MAX_SNAPSHOT_KEYS})'
+
+
+def resolve_paths(page, paths):
+    """
+    在页面中解析路径（一次 CDP 往返）
+
+    Returns:
+        dict: {路径: 描述}，页面没有返回的路径记为 error
+    """
+    if not paths:
+        return {}
+    raw = page.run_js(build_resolve_script(paths))
+    raw = raw if isinstance(raw, dict) else {}
+    return {path: raw.get(path) or {'type': 'error', 'message': 'missing result'} for path in paths}
+
+
+def build_template(url, resolved, readiness=None, elapsed=None):
+    """
+    组装补丁模板
+
+    Returns:
+        dict: {format, sourceUrl, collectedAt, paths, missing, stats, readiness?}
+    """
+    missing = [path for path, desc in resolved.items() if desc.get('type') == 'missing']
+    counts = {}
+    for desc in resolved.values():
+        counts[desc.get('type')] = counts.get(desc.get('type'), 0) + 1
+
+    template = {
+        'format': TEMPLATE_FORMAT,
+        'sourceUrl': url,
+        'collectedAt': datetime.now().isoformat(),
+        'paths': resolved,
+        'missing': missing,
+        'stats': {'requested': len(resolved), 'byType': counts},
+    }
+    if elapsed is not None:
+        template['stats']['resolveMs'] = round(elapsed * 1000, 1)
+    if readiness is not None:
+        template['readiness'] = readiness
+    return template
+
+
+def collect_paths(url, paths, headless=False, page=None, timeout=None, wait='load', wait_timeout=10,
+                  launch=None, blocking=None):
+    """
+    打开页面并解析指定路径
+
+    Args:
+        url: 要采集的网站URL
+        paths: 规范化后的路径列表（见 load_paths）
+        headless: 是否无头模式
+        page: 外部提供的页面/标签页，提供时不再启动和关闭浏览器
+        timeout: 页面加载超时时间（秒）
+        wait: 页面就绪策略（见 readiness.py）
+        wait_timeout: 就绪等待的硬性截止时间（秒）
+        launch: LaunchProfile（见 launch_profile.py）
+        blocking: BlockRules（见 resource_blocking.py）
+
+    Returns:
+        dict: 补丁模板（见 build_template）
+    """
+    owns_page = page is None
+    if owns_page:
+        launch = launch or LaunchProfile(headless=headless)
+        page = launch.launch()
+        print(f"浏览器启动: {launch.describe()}")
+
+    blocker = ResourceBlocker(page, blocking) if blocking else None
+    try:
+        if blocker:
+            blocker.start()
+        readiness = navigate_and_wait(page, url, wait, wait_timeout, timeout)
+        if blocker:
+            blocker.stop()
+        if readiness['timedOut']:
+            print(f"等待就绪超时 ({wait}, {wait_timeout}s)，继续解析")
+
+        started = time.perf_counter()
+        resolved = resolve_paths(page, paths)
+        return build_template(url, resolved, readiness, time.perf_counter() - started)
+    finally:
+        if blocker:
+            blocker.stop()
+        if owns_page:
+            launch.quit(page)
+
+
+# 安装补丁模板的运行时:
+#   F(d)        按描述生成函数桩（原生函数的 toString 返回 [native code]）
+#   V(d)        按描述生成值（对象为浅层快照，带 Symbol.toStringTag）
+#   O(t)        取路径的父对象，中间缺失的对象补为 {}
+INSTALL_RUNTIME = (
+    "var W=typeof window!=='undefined'?window:globalThis;"
+    "function F(d){var n=d.name||'',f=function(){};"
+    "try{Object.defineProperty(f,'name',{value:n,configurable:!0});Object.defineProperty(f,'length',{value:d.length||0,configurable:!0})}catch(e){}"
+    "if(d.native){var s='function '+n+'() { [native code] }';Object.defineProperty(f,'toString',{value:function(){return s},configurable:!0,writable:!0})}"
+    "return f}"
+    "function V(d){switch(d.type){case'value':return d.value;case'number':return Number(d.value);"
+    "case'function':return F(d);case'object':var o=Object.assign({},d.value);"
+    "if(typeof d.length==='number'&&!('length'in o))o.length=d.length;"
+    "if(d.className&&d.className!=='Object'&&typeof Symbol!=='undefined')"
+    "try{Object.defineProperty(o,Symbol.toStringTag,{value:d.className,configurable:!0})}catch(e){}return o;"
+    "default:return void 0}}"
+    "function O(t){var o=W;for(var i=0;i<t.length-1;i++){if(o[t[i]]===null||typeof o[t[i]]!=='object'&&typeof o[t[i]]!=='function')o[t[i]]={};o=o[t[i]]}return o}"
+    "Object.keys(P).forEach(function(p){var d=P[p],t=p.split('.'),k=t[t.length-1];"
+    "if(d.type==='missing'||d.type==='error')return;"
+    "try{var o=O(t),v=V(d.type==='getter'?d.result:d);"
+    "if(d.type==='getter')Object.defineProperty(o,k,{get:function(){return v},set:d.setter?function(x){v=x}:void 0,configurable:!0,enumerable:!!d.enumerable});"
+    "else if(d.type==='object'&&o[k]&&typeof o[k]==='object')Object.keys(v).forEach(function(x){if(!(x in o[k]))o[k][x]=v[x]});"
+    "else Object.defineProperty(o,k,{value:v,writable:!0,configurable:!0,enumerable:!0})}catch(e){}})"
+)
+
+
+def generate_installer(template):
+    """
+    生成安装补丁模板的 JS 代码（可在完整环境之后加载，只补齐缺失的路径）
+
+    getter 安装在父对象上（不依赖沙箱中是否存在对应的原型），
+    已存在的对象只补齐缺少的键，不替换对象本身。
+    """
+    header = (f"/* 定向补丁 - {len(template['paths'])} 个路径，"
+              f"来源: {template.get('sourceUrl')}，生成时间: {template.get('collectedAt')} */\n")
+    paths = json.dumps(template['paths'], ensure_ascii=False, separators=(',', ':'))
+    return f"{header}(function(){{var P={paths};{INSTALL_RUNTIME}}})();\n"
+
+
+def write_template(template, output_path, fmt='json', pretty=False):
+    """按指定格式写出补丁模板"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == 'js':
+        output_path.write_text(generate_installer(template), encoding='utf-8')
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(template, f, indent=2 if pretty else None, ensure_ascii=False)
+
+
+def run(args):
+    """
+    读取路径并在页面中解析
+
+    Returns:
+        tuple: (退出码, 补丁模板)，失败时模板为 None
+    """
+    try:
+        blocking = blocking_rules_from_args(args)
+        paths = load_paths(args.paths or args.log_url, args.include_fixed)
+    except (OSError, ValueError) as e:
+        print(f"读取路径失败: {e}")
+        return 1, None
+    if not paths:
+        print("没有需要解析的路径")
+        return 1, None
+    print(f"待解析路径: {len(paths)} 个")
+
+    try:
+        template = collect_paths(args.url, paths, args.headless,
+                                 wait=args.wait, wait_timeout=args.wait_timeout,
+                                 launch=launch_profile_from_args(args, headless=args.headless),
+                                 blocking=blocking)
+    except KeyboardInterrupt:
+        print("\n用户中断")
+        return 130, None
+    except Exception as e:
+        print(f"采集失败: {e}")
+        return 1, None
+
+    stats = template['stats']
+    print(f"解析完成: {stats['byType']}（{stats.get('resolveMs', 0)}ms）")
+    if template['missing']:
+        print(f"真实浏览器中也不存在: {', '.join(template['missing'][:10])}"
+              f"{' ...' if len(template['missing']) > 10 else ''}")
+
+    return 0, template
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按沙箱记录的 undefined 路径定向采集')
+    parser.add_argument('--url', required=True, help='要采集的网站URL')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--paths', help="路径文件（undefined.log、/api/log/undefined 的 JSON 或每行一个路径），'-' 为 stdin")
+    source.add_argument('--log-url', nargs='?', const=DEFAULT_LOG_URL,
+                        help=f'从服务读取 undefined 日志（默认 {DEFAULT_LOG_URL}）')
+    parser.add_argument('--include-fixed', action='store_true', help='包含已标记为修复的路径')
+    parser.add_argument('--output', '-o', help='输出文件路径（默认打印到控制台）')
+    parser.add_argument('--format', choices=['json', 'js'], default='json',
+                        help='json 为补丁模板，js 为可直接加载的安装代码')
+    parser.add_argument('--headless', action='store_true', help='无头模式运行')
+    parser.add_argument('--pretty', action='store_true', help='格式化输出')
+    add_launch_arguments(parser)
+    add_blocking_arguments(parser)
+    add_wait_arguments(parser, default='load')
+    args = parser.parse_args()
+
+    # 结果打印到 stdout 时，进度信息写到 stderr，重定向得到的文件只有结果（--format js > patch.js）
+    with redirect_stdout(sys.stdout if args.output else sys.stderr):
+        code, template = run(args)
+    if template is None:
+        return code
+
+    if args.output:
+        write_template(template, args.output, args.format, args.pretty)
+        print(f"已保存到: {args.output}")
+    elif args.format == 'js':
+        print(generate_installer(template))
+    else:
+        print(json.dumps(template, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
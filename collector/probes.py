@@ -0,0 +1,1145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+环境探针注册表
+
+集中存放三个采集器使用的全部采集探针（JS 表达式）。每个探针在
+PROBE_META 中声明依赖和成本估计，三个采集器的输出结构在 LAYOUTS 中
+声明为 分段名 -> 探针名，--sections 只执行被选中分段的探针（及其依赖）。
+
+多个探针可以合并为一次 run_js 调用（批量采集），减少 CDP 往返次数。
+每个探针在页面内独立 try/catch，单个探针失败不会影响其他探针。
+
+canvas / 音频这类大块数据在页面内计算 SHA-256 摘要后只回传摘要；
+原始数据（dataURL、音频采样）只有显式请求 RAW_PROBES 时才会返回，
+由 save_raw_blobs 写到单独的旁路文件。
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+
+# 页面内工具函数（不单独产生结果），被依赖时自动带上，批量脚本中每个只带一次
+#   __sha256__(bytes)       SHA-256 十六进制摘要，优先 crypto.subtle，
+#                           非安全上下文（http 页面）中退化为纯 JS 实现
+#   __canvasPatterns__()    绘制多个 canvas 测试图案，返回 {图案: dataURL}
+#   __audioSamples__()      OfflineAudioContext 渲染固定信号，返回 Float32Array
+#   __canvasDigest__()      各图案 dataURL 的摘要及组合摘要
+#   __audioDigest__()       音频渲染结果的摘要
+#   __audioBase64__()       音频渲染结果（base64 编码的 float32 采样）
+HELPER_SCRIPTS = {
+    'sha256': """
+    const __sha256__ = async (bytes) => {
+        const subtle = globalThis.crypto && globalThis.crypto.subtle;
+        if (subtle) {
+            try {
+                const digest = await subtle.digest('SHA-256', bytes);
+                return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+            } catch (e) {}
+        }
+        const K = [
+            0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+            0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+            0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+            0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+            0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+            0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+            0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+            0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+        ];
+        const H = [0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19];
+        const length = bytes.length;
+        const size = ((length + 72) >> 6) << 6;
+        const data = new Uint8Array(size);
+        data.set(bytes);
+        data[length] = 0x80;
+        const view = new DataView(data.buffer);
+        view.setUint32(size - 8, Math.floor(length / 0x20000000));
+        view.setUint32(size - 4, (length << 3) >>> 0);
+        const w = new Uint32Array(64);
+        const rotr = (x, n) => (x >>> n) | (x << (32 - n));
+        for (let offset = 0; offset < size; offset += 64) {
+            for (let t = 0; t < 16; t++) w[t] = view.getUint32(offset + t * 4);
+            for (let t = 16; t < 64; t++) {
+                const s0 = rotr(w[t - 15], 7) ^ rotr(w[t - 15], 18) ^ (w[t - 15] >>> 3);
+                const s1 = rotr(w[t - 2], 17) ^ rotr(w[t - 2], 19) ^ (w[t - 2] >>> 10);
+                w[t] = (w[t - 16] + s0 + w[t - 7] + s1) | 0;
+            }
+            let [a, b, c, d, e, f, g, h] = H;
+            for (let t = 0; t < 64; t++) {
+                const t1 = (h + (rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25)) + ((e & f) ^ (~e & g)) + K[t] + w[t]) | 0;
+                const t2 = ((rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22)) + ((a & b) ^ (a & c) ^ (b & c))) | 0;
+                h = g; g = f; f = e; e = (d + t1) | 0;
+                d = c; c = b; b = a; a = (t1 + t2) | 0;
+            }
+            [a, b, c, d, e, f, g, h].forEach((v, i) => { H[i] = (H[i] + v) | 0; });
+        }
+        return H.map(v => (v >>> 0).toString(16).padStart(8, '0')).join('');
+    };
+    """,
+
+    'canvasPatterns': """
+    const __canvasPatterns__ = () => {
+        const draw = {
+            text: (ctx) => {
+                ctx.textBaseline = 'top';
+                ctx.font = '14px Arial';
+                ctx.fillStyle = '#f60';
+                ctx.fillRect(0, 0, 100, 50);
+                ctx.fillStyle = '#069';
+                ctx.fillText('Canvas Fingerprint', 2, 15);
+                ctx.fillStyle = 'rgba(102, 204, 0, 0.7)';
+                ctx.fillText('Canvas Fingerprint', 4, 17);
+            },
+            emoji: (ctx) => {
+                ctx.textBaseline = 'alphabetic';
+                ctx.font = '18px sans-serif';
+                ctx.fillStyle = '#000';
+                ctx.fillText('Hello, World! \\u4f60\\u597d \\ud83d\\ude03\\u2764\\ufe0f', 2, 30);
+            },
+            geometry: (ctx) => {
+                const gradient = ctx.createLinearGradient(0, 0, 200, 50);
+                gradient.addColorStop(0, '#f00');
+                gradient.addColorStop(0.5, '#0f0');
+                gradient.addColorStop(1, '#00f');
+                ctx.fillStyle = gradient;
+                ctx.beginPath();
+                ctx.arc(40, 25, 20, 0, Math.PI * 2);
+                ctx.fill();
+                ctx.globalCompositeOperation = 'multiply';
+                ctx.fillStyle = 'rgba(255, 0, 255, 0.6)';
+                ctx.fillRect(30, 5, 120, 40);
+                ctx.shadowBlur = 6;
+                ctx.shadowColor = '#333';
+                ctx.strokeStyle = '#096';
+                ctx.lineWidth = 3;
+                ctx.beginPath();
+                ctx.moveTo(100, 45);
+                ctx.bezierCurveTo(130, 0, 160, 50, 195, 5);
+                ctx.stroke();
+            },
+            winding: (ctx) => {
+                ctx.fillStyle = '#c39';
+                ctx.beginPath();
+                ctx.rect(10, 5, 80, 40);
+                ctx.rect(30, 15, 40, 20);
+                ctx.fill('evenodd');
+                ctx.beginPath();
+                ctx.arc(140, 25, 20, 0, Math.PI * 2, true);
+                ctx.arc(140, 25, 10, 0, Math.PI * 2, true);
+                ctx.fill('evenodd');
+            }
+        };
+        const out = {};
+        for (const [name, fn] of Object.entries(draw)) {
+            const canvas = document.createElement('canvas');
+            canvas.width = 200;
+            canvas.height = 50;
+            fn(canvas.getContext('2d'));
+            out[name] = canvas.toDataURL();
+        }
+        return out;
+    };
+    """,
+
+    'audioSamples': """
+    const __audioSamples__ = async () => {
+        const Offline = window.OfflineAudioContext || window.webkitOfflineAudioContext;
+        if (!Offline) return null;
+        const ctx = new Offline(1, 5000, 44100);
+        const oscillator = ctx.createOscillator();
+        oscillator.type = 'triangle';
+        oscillator.frequency.value = 10000;
+        const compressor = ctx.createDynamicsCompressor();
+        compressor.threshold.value = -50;
+        compressor.knee.value = 40;
+        compressor.ratio.value = 12;
+        compressor.attack.value = 0;
+        compressor.release.value = 0.25;
+        oscillator.connect(compressor);
+        compressor.connect(ctx.destination);
+        oscillator.start(0);
+        const buffer = await ctx.startRendering();
+        return buffer.getChannelData(0);
+    };
+    """,
+
+    'canvasDigest': """
+    const __canvasDigest__ = async () => {
+        const encoder = new TextEncoder();
+        const patterns = {};
+        for (const [name, dataURL] of Object.entries(__canvasPatterns__())) {
+            patterns[name] = await __sha256__(encoder.encode(dataURL));
+        }
+        return {
+            algorithm: 'sha256(dataURL)',
+            hash: await __sha256__(encoder.encode(Object.values(patterns).join(':'))),
+            patterns: patterns
+        };
+    };
+    """,
+
+    'audioDigest': """
+    const __audioDigest__ = async () => {
+        const samples = await __audioSamples__();
+        if (!samples) return null;
+        let sum = 0;
+        for (let i = 4500; i < samples.length; i++) sum += Math.abs(samples[i]);
+        return {
+            algorithm: 'sha256(float32le)',
+            hash: await __sha256__(new Uint8Array(samples.buffer, samples.byteOffset, samples.byteLength)),
+            sum: sum,
+            length: samples.length
+        };
+    };
+    """,
+
+    'audioBase64': """
+    const __audioBase64__ = async () => {
+        const samples = await __audioSamples__();
+        if (!samples) return null;
+        const bytes = new Uint8Array(samples.buffer, samples.byteOffset, samples.byteLength);
+        let binary = '';
+        for (let i = 0; i < bytes.length; i += 0x8000) {
+            binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+        }
+        return { encoding: 'base64(float32le)', sampleRate: 44100, data: btoa(binary) };
+    };
+    """,
+}
+
+# 工具函数之间的依赖
+HELPER_DEPS = {
+    'canvasDigest': ('sha256', 'canvasPatterns'),
+    'audioDigest': ('sha256', 'audioSamples'),
+    'audioBase64': ('audioSamples',),
+}
+
+
+# 探针表达式（不带 return，可直接拼接或交给 CDP Runtime.evaluate）
+PROBE_SCRIPTS = {
+    'browserInfo': """
+        (function() {
+            const ua = navigator.userAgent;
+            let browser = 'Unknown';
+            let version = '';
+
+            if (ua.includes('Chrome')) {
+                browser = 'Chrome';
+                version = ua.match(/Chrome\\/(\\d+\\.\\d+\\.\\d+\\.\\d+)/)?.[1] || '';
+            } else if (ua.includes('Firefox')) {
+                browser = 'Firefox';
+                version = ua.match(/Firefox\\/(\\d+\\.\\d+)/)?.[1] || '';
+            } else if (ua.includes('Edge')) {
+                browser = 'Edge';
+                version = ua.match(/Edge\\/(\\d+\\.\\d+)/)?.[1] || '';
+            }
+
+            return { browser: browser, version: version };
+        })()
+    """,
+
+    'navigator': """
+        (function() {
+            const nav = {};
+            const props = [
+                'userAgent', 'appCodeName', 'appName', 'appVersion',
+                'platform', 'product', 'productSub', 'vendor', 'vendorSub',
+                'language', 'languages', 'onLine', 'cookieEnabled',
+                'doNotTrack', 'hardwareConcurrency', 'maxTouchPoints',
+                'deviceMemory', 'webdriver'
+            ];
+
+            props.forEach(prop => {
+                try {
+                    const value = navigator[prop];
+                    if (value !== undefined) {
+                        if (Array.isArray(value)) {
+                            nav[prop] = Array.from(value);
+                        } else {
+                            nav[prop] = value;
+                        }
+                    }
+                } catch(e) {}
+            });
+
+            // 采集方法列表
+            nav.__methods__ = [];
+            for (let key in navigator) {
+                if (typeof navigator[key] === 'function') {
+                    nav.__methods__.push(key);
+                }
+            }
+
+            // 采集 connection
+            if (navigator.connection) {
+                nav.connection = {
+                    downlink: navigator.connection.downlink,
+                    effectiveType: navigator.connection.effectiveType,
+                    rtt: navigator.connection.rtt,
+                    saveData: navigator.connection.saveData
+                };
+            }
+
+            // 采集 userAgentData
+            if (navigator.userAgentData) {
+                nav.userAgentData = {
+                    brands: navigator.userAgentData.brands,
+                    mobile: navigator.userAgentData.mobile,
+                    platform: navigator.userAgentData.platform
+                };
+            }
+
+            return nav;
+        })()
+    """,
+
+    'screen': """
+        (function() {
+            return {
+                width: screen.width,
+                height: screen.height,
+                availWidth: screen.availWidth,
+                availHeight: screen.availHeight,
+                availLeft: screen.availLeft || 0,
+                availTop: screen.availTop || 0,
+                colorDepth: screen.colorDepth,
+                pixelDepth: screen.pixelDepth,
+                orientation: screen.orientation ? {
+                    angle: screen.orientation.angle,
+                    type: screen.orientation.type
+                } : null
+            };
+        })()
+    """,
+
+    'window': """
+        (function() {
+            return {
+                innerWidth: window.innerWidth,
+                innerHeight: window.innerHeight,
+                outerWidth: window.outerWidth,
+                outerHeight: window.outerHeight,
+                screenX: window.screenX,
+                screenY: window.screenY,
+                screenLeft: window.screenLeft,
+                screenTop: window.screenTop,
+                pageXOffset: window.pageXOffset,
+                pageYOffset: window.pageYOffset,
+                devicePixelRatio: window.devicePixelRatio,
+                isSecureContext: window.isSecureContext,
+                origin: window.origin
+            };
+        })()
+    """,
+
+    'document': """
+        (function() {
+            return {
+                title: document.title,
+                domain: document.domain,
+                URL: document.URL,
+                documentURI: document.documentURI,
+                baseURI: document.baseURI,
+                referrer: document.referrer,
+                characterSet: document.characterSet,
+                charset: document.charset,
+                inputEncoding: document.inputEncoding,
+                contentType: document.contentType,
+                readyState: document.readyState,
+                hidden: document.hidden,
+                visibilityState: document.visibilityState,
+                __methods__: ['createElement', 'createTextNode', 'getElementById',
+                             'getElementsByClassName', 'getElementsByTagName',
+                             'querySelector', 'querySelectorAll']
+            };
+        })()
+    """,
+
+    'location': """
+        (function() {
+            return {
+                href: location.href,
+                protocol: location.protocol,
+                host: location.host,
+                hostname: location.hostname,
+                port: location.port,
+                pathname: location.pathname,
+                search: location.search,
+                hash: location.hash,
+                origin: location.origin
+            };
+        })()
+    """,
+
+    'performance': """
+        (function() {
+            const timing = performance.timing;
+            return {
+                timeOrigin: performance.timeOrigin,
+                timing: timing ? {
+                    navigationStart: timing.navigationStart,
+                    domLoading: timing.domLoading,
+                    domInteractive: timing.domInteractive,
+                    domComplete: timing.domComplete,
+                    loadEventEnd: timing.loadEventEnd
+                } : null,
+                memory: performance.memory ? {
+                    jsHeapSizeLimit: performance.memory.jsHeapSizeLimit,
+                    totalJSHeapSize: performance.memory.totalJSHeapSize,
+                    usedJSHeapSize: performance.memory.usedJSHeapSize
+                } : null
+            };
+        })()
+    """,
+
+    'plugins': """
+        (function() {
+            const plugins = [];
+            for (let i = 0; i < navigator.plugins.length; i++) {
+                const plugin = navigator.plugins[i];
+                plugins.push({
+                    name: plugin.name,
+                    filename: plugin.filename,
+                    description: plugin.description
+                });
+            }
+            return plugins;
+        })()
+    """,
+
+    'webgl': """
+        (function() {
+            try {
+                const canvas = document.createElement('canvas');
+                const gl = canvas.getContext('webgl') || canvas.getContext('experimental-webgl');
+                if (!gl) return null;
+
+                const debugInfo = gl.getExtension('WEBGL_debug_renderer_info');
+                return {
+                    vendor: gl.getParameter(gl.VENDOR),
+                    renderer: gl.getParameter(gl.RENDERER),
+                    unmaskedVendor: debugInfo ? gl.getParameter(debugInfo.UNMASKED_VENDOR_WEBGL) : null,
+                    unmaskedRenderer: debugInfo ? gl.getParameter(debugInfo.UNMASKED_RENDERER_WEBGL) : null,
+                    version: gl.getParameter(gl.VERSION),
+                    shadingLanguageVersion: gl.getParameter(gl.SHADING_LANGUAGE_VERSION),
+                    maxTextureSize: gl.getParameter(gl.MAX_TEXTURE_SIZE),
+                    maxViewportDims: gl.getParameter(gl.MAX_VIEWPORT_DIMS)
+                };
+            } catch(e) {
+                return null;
+            }
+        })()
+    """,
+
+    'canvas': """
+        (async function() {
+            try {
+                return await __canvasDigest__();
+            } catch(e) {
+                return null;
+            }
+        })()
+    """,
+
+    'audioContext': """
+        (async function() {
+            try {
+                const AudioContext = window.AudioContext || window.webkitAudioContext;
+                if (!AudioContext) return null;
+
+                const ctx = new AudioContext();
+                const info = {
+                    sampleRate: ctx.sampleRate,
+                    state: ctx.state,
+                    baseLatency: ctx.baseLatency,
+                    outputLatency: ctx.outputLatency
+                };
+
+                try {
+                    info.output = await __audioDigest__();
+                } catch(e) {
+                    info.output = null;
+                }
+                return info;
+            } catch(e) {
+                return null;
+            }
+        })()
+    """,
+
+    # 以下为 website-env-collector.py / fingerprint-collector.py 输出结构使用的探针
+    'navigatorFull': """
+        (function() {
+            return {
+                userAgent: navigator.userAgent,
+                vendor: navigator.vendor,
+                vendorSub: navigator.vendorSub,
+                platform: navigator.platform,
+                language: navigator.language,
+                languages: Array.from(navigator.languages || []),
+                hardwareConcurrency: navigator.hardwareConcurrency,
+                deviceMemory: navigator.deviceMemory,
+                maxTouchPoints: navigator.maxTouchPoints,
+                webdriver: navigator.webdriver,
+                cookieEnabled: navigator.cookieEnabled,
+                doNotTrack: navigator.doNotTrack,
+                appCodeName: navigator.appCodeName,
+                appName: navigator.appName,
+                appVersion: navigator.appVersion,
+                product: navigator.product,
+                productSub: navigator.productSub,
+                onLine: navigator.onLine,
+                pdfViewerEnabled: navigator.pdfViewerEnabled,
+                plugins: Array.from(navigator.plugins || []).map(p => ({
+                    name: p.name,
+                    description: p.description,
+                    filename: p.filename,
+                    length: p.length
+                })),
+                mimeTypes: Array.from(navigator.mimeTypes || []).map(m => ({
+                    type: m.type,
+                    description: m.description,
+                    suffixes: m.suffixes
+                }))
+            };
+        })()
+    """,
+
+    'navigatorBasic': """
+        (function() {
+            return {
+                userAgent: navigator.userAgent,
+                vendor: navigator.vendor,
+                platform: navigator.platform,
+                language: navigator.language,
+                languages: Array.from(navigator.languages || []),
+                hardwareConcurrency: navigator.hardwareConcurrency,
+                deviceMemory: navigator.deviceMemory,
+                maxTouchPoints: navigator.maxTouchPoints,
+                webdriver: navigator.webdriver,
+                cookieEnabled: navigator.cookieEnabled,
+                doNotTrack: navigator.doNotTrack,
+                plugins: Array.from(navigator.plugins || []).map(p => ({
+                    name: p.name,
+                    description: p.description,
+                    filename: p.filename
+                }))
+            };
+        })()
+    """,
+
+    'windowFull': """
+        (function() {
+            return {
+                innerWidth: window.innerWidth,
+                innerHeight: window.innerHeight,
+                outerWidth: window.outerWidth,
+                outerHeight: window.outerHeight,
+                devicePixelRatio: window.devicePixelRatio,
+                screenX: window.screenX,
+                screenY: window.screenY,
+                screenLeft: window.screenLeft,
+                screenTop: window.screenTop,
+                scrollX: window.scrollX,
+                scrollY: window.scrollY,
+                name: window.name,
+                closed: window.closed,
+                isSecureContext: window.isSecureContext
+            };
+        })()
+    """,
+
+    'documentFull': """
+        (function() {
+            return {
+                URL: document.URL,
+                documentURI: document.documentURI,
+                domain: document.domain,
+                referrer: document.referrer,
+                title: document.title,
+                characterSet: document.characterSet,
+                charset: document.charset,
+                contentType: document.contentType,
+                readyState: document.readyState,
+                hidden: document.hidden,
+                visibilityState: document.visibilityState,
+                cookie: document.cookie
+            };
+        })()
+    """,
+
+    'timezone': """
+        (function() {
+            const options = Intl.DateTimeFormat().resolvedOptions();
+            return {
+                offset: new Date().getTimezoneOffset(),
+                timezone: options.timeZone,
+                locale: options.locale
+            };
+        })()
+    """,
+
+    'performanceTiming': """
+        (function() {
+            return {
+                timeOrigin: performance.timeOrigin,
+                timing: {
+                    navigationStart: performance.timing.navigationStart,
+                    loadEventEnd: performance.timing.loadEventEnd,
+                    domComplete: performance.timing.domComplete
+                }
+            };
+        })()
+    """,
+
+    'webglFull': """
+        (function() {
+            try {
+                const canvas = document.createElement('canvas');
+                const gl = canvas.getContext('webgl') || canvas.getContext('experimental-webgl');
+                if (!gl) return null;
+
+                const debugInfo = gl.getExtension('WEBGL_debug_renderer_info');
+                return {
+                    vendor: gl.getParameter(gl.VENDOR),
+                    renderer: gl.getParameter(gl.RENDERER),
+                    version: gl.getParameter(gl.VERSION),
+                    shadingLanguageVersion: gl.getParameter(gl.SHADING_LANGUAGE_VERSION),
+                    unmaskedVendor: debugInfo ? gl.getParameter(debugInfo.UNMASKED_VENDOR_WEBGL) : null,
+                    unmaskedRenderer: debugInfo ? gl.getParameter(debugInfo.UNMASKED_RENDERER_WEBGL) : null,
+                    extensions: gl.getSupportedExtensions()
+                };
+            } catch (e) {
+                return { error: e.message };
+            }
+        })()
+    """,
+
+    'audio': """
+        (async function() {
+            try {
+                const AudioContext = window.AudioContext || window.webkitAudioContext;
+                if (!AudioContext) return null;
+                const context = new AudioContext();
+                return {
+                    sampleRate: context.sampleRate,
+                    state: context.state,
+                    maxChannelCount: context.destination.maxChannelCount,
+                    numberOfInputs: context.destination.numberOfInputs,
+                    numberOfOutputs: context.destination.numberOfOutputs,
+                    channelCount: context.destination.channelCount,
+                    output: await __audioDigest__().catch(() => null)
+                };
+            } catch (e) {
+                return { error: e.message };
+            }
+        })()
+    """,
+
+    'features': """
+        (function() {
+            return {
+                localStorage: typeof localStorage !== 'undefined',
+                sessionStorage: typeof sessionStorage !== 'undefined',
+                indexedDB: typeof indexedDB !== 'undefined',
+                webWorker: typeof Worker !== 'undefined',
+                serviceWorker: 'serviceWorker' in navigator,
+                webRTC: typeof RTCPeerConnection !== 'undefined' || typeof webkitRTCPeerConnection !== 'undefined',
+                webSocket: typeof WebSocket !== 'undefined',
+                geolocation: 'geolocation' in navigator,
+                notification: 'Notification' in window,
+                permissions: 'permissions' in navigator,
+                bluetooth: 'bluetooth' in navigator,
+                usb: 'usb' in navigator,
+                credentials: 'credentials' in navigator
+            };
+        })()
+    """,
+
+    'cookies': """
+        (function() {
+            return document.cookie;
+        })()
+    """,
+
+    # 以下为原始数据探针，只在显式请求时执行
+    'canvasRaw': """
+        (function() {
+            return __canvasPatterns__();
+        })()
+    """,
+
+    'audioRaw': """
+        (function() {
+            return __audioBase64__();
+        })()
+    """,
+}
+
+# 探针元数据: 名称 -> (依赖, 成本估计, 说明)
+# 依赖可以是工具函数（HELPER_SCRIPTS）或其他探针；成本为粗略的页面内耗时估计（毫秒）
+PROBE_META = {
+    'browserInfo': ((), 1, '浏览器名称与版本'),
+    'navigator': ((), 2, 'navigator 属性、方法列表、connection、userAgentData'),
+    'navigatorFull': ((), 3, 'navigator 属性及 plugins / mimeTypes'),
+    'navigatorBasic': ((), 2, 'navigator 常用属性及 plugins'),
+    'screen': ((), 1, 'screen 对象'),
+    'window': ((), 1, 'window 尺寸与位置'),
+    'windowFull': ((), 1, 'window 尺寸、位置、滚动与名称'),
+    'document': ((), 1, 'document 属性'),
+    'documentFull': ((), 1, 'document 属性及 cookie'),
+    'location': ((), 1, 'location 对象'),
+    'performance': ((), 1, 'performance.timing 与内存'),
+    'performanceTiming': ((), 1, 'performance.timing 关键时间点'),
+    'plugins': ((), 1, 'navigator.plugins 列表'),
+    'webgl': ((), 15, 'WebGL 参数'),
+    'webglFull': ((), 20, 'WebGL 参数及扩展列表'),
+    'canvas': (('canvasDigest',), 25, 'canvas 多图案摘要'),
+    'audioContext': (('audioDigest',), 40, 'AudioContext 信息及音频输出摘要'),
+    'audio': (('audioDigest',), 40, 'AudioContext 信息及音频输出摘要（含 destination）'),
+    'timezone': ((), 1, '时区与区域设置'),
+    'features': ((), 1, 'Web API 特征检测'),
+    'cookies': ((), 1, 'document.cookie'),
+    'canvasRaw': (('canvasPatterns',), 20, 'canvas 各图案原始 dataURL'),
+    'audioRaw': (('audioBase64',), 40, '音频原始采样'),
+}
+
+
+class Probe:
+    """注册表中的一个探针"""
+
+    def __init__(self, name, script, deps=(), cost=1, description=''):
+        self.name = name
+        self.script = script
+        self.deps = tuple(deps)
+        self.cost = cost
+        self.description = description
+
+    def __repr__(self):
+        return f'Probe({self.name!r}, deps={self.deps!r}, cost={self.cost})'
+
+
+# 探针注册表
+REGISTRY = {
+    name: Probe(name, script, *PROBE_META[name])
+    for name, script in PROBE_SCRIPTS.items()
+}
+
+# 三种输出结构：分段名 -> 探针名（顺序即输出顺序）
+#   template     collect.py / async_collect.py 的环境模板
+#   website      website-env-collector.py
+#   fingerprint  fingerprint-collector.py
+LAYOUTS = {
+    'template': {
+        'navigator': 'navigator',
+        'screen': 'screen',
+        'window': 'window',
+        'document': 'document',
+        'location': 'location',
+        'performance': 'performance',
+        'plugins': 'plugins',
+        'webgl': 'webgl',
+        'canvas': 'canvas',
+        'audioContext': 'audioContext',
+    },
+    'website': {
+        'location': 'location',
+        'navigator': 'navigatorFull',
+        'screen': 'screen',
+        'window': 'windowFull',
+        'document': 'documentFull',
+        'timezone': 'timezone',
+        'performance': 'performanceTiming',
+        'webgl': 'webglFull',
+        'canvas': 'canvas',
+        'audio': 'audio',
+        'features': 'features',
+        'cookies': 'cookies',
+    },
+    'fingerprint': {
+        'navigator': 'navigatorBasic',
+        'screen': 'screen',
+        'window': 'windowFull',
+        'timezone': 'timezone',
+        'webgl': 'webgl',
+        'canvas': 'canvas',
+        'audio': 'audio',
+        'features': 'features',
+    },
+}
+
+# 输出结构总是需要、但不属于任何分段的探针
+LAYOUT_REQUIRED = {
+    'template': ('browserInfo',),
+}
+
+# collect_all 默认采集的探针（顺序即输出顺序）
+DEFAULT_PROBES = list(LAYOUT_REQUIRED['template']) + list(LAYOUTS['template'].values())
+
+# 原始数据探针 -> 旁路文件中的字段名
+RAW_PROBES = {'canvasRaw': 'canvas', 'audioRaw': 'audio'}
+
+# 扁平结构（website / fingerprint）中记录结构名的键：只采集部分分段时
+# 无法从键名判断来源（如 --sections navigator,screen 的网站结果）
+LAYOUT_KEY = 'layout'
+
+# 采集结果中暂存原始数据的键，写出前由 save_raw_blobs 移到旁路文件
+RAW_BLOBS_KEY = '__rawBlobs__'
+
+# 模板结构中位于 objects 下的分段
+TEMPLATE_OBJECTS = ('navigator', 'screen', 'window', 'document', 'location', 'performance')
+
+
+def resolve(names):
+    """
+    展开探针依赖
+
+    Args:
+        names: 探针名称列表
+
+    Returns:
+        tuple: (helpers, probes)，均为依赖在前的名称列表，probes 包含被依赖的探针
+    """
+    helpers = []
+    probes = []
+    done = set()
+
+    def visit(name, path):
+        if name in done:
+            return
+        if name in path:
+            raise ValueError(f"探针依赖存在循环: {' -> '.join(path + (name,))}")
+        if name in HELPER_SCRIPTS:
+            deps = HELPER_DEPS.get(name, ())
+        elif name in REGISTRY:
+            deps = REGISTRY[name].deps
+        else:
+            raise ValueError(f'未知的探针: {name}')
+
+        for dep in deps:
+            visit(dep, path + (name,))
+        done.add(name)
+        (helpers if name in HELPER_SCRIPTS else probes).append(name)
+
+    for name in names:
+        visit(name, ())
+    return helpers, probes
+
+
+def expand(names):
+    """展开依赖后实际要执行的探针列表"""
+    return resolve(names)[1]
+
+
+def estimate_cost(names):
+    """探针（含依赖）的成本估计之和"""
+    return sum(REGISTRY[name].cost for name in expand(names))
+
+
+def _helpers_script(helpers):
+    return ''.join(HELPER_SCRIPTS[name] for name in helpers)
+
+
+def parse_sections(spec):
+    """
+    解析 --sections 参数
+
+    Args:
+        spec: 逗号分隔的分段名，如 'navigator,screen,webgl'；空或 'all' 表示全部
+
+    Returns:
+        list | None: 分段列表，None 表示全部
+    """
+    if not spec or spec.strip().lower() == 'all':
+        return None
+    return [part.strip() for part in spec.split(',') if part.strip()]
+
+
+def layout_probes(layout, sections=None, raw_blobs=False):
+    """
+    计算一种输出结构需要执行的探针
+
+    Args:
+        layout: 输出结构名（LAYOUTS 的键）
+        sections: 需要的分段，None 表示全部
+        raw_blobs: 是否同时采集原始数据
+
+    Returns:
+        list: 探针名称列表（已展开依赖）
+    """
+    mapping = LAYOUTS[layout]
+    if sections is None:
+        sections = list(mapping)
+    unknown = [name for name in sections if name not in mapping]
+    if unknown:
+        raise ValueError(f"未知的分段: {', '.join(unknown)}（可选: {', '.join(mapping)}）")
+
+    names = list(LAYOUT_REQUIRED.get(layout, ()))
+    names.extend(mapping[name] for name in sections)
+    if raw_blobs:
+        names.extend(RAW_PROBES)
+    return expand(names)
+
+
+def describe_layout(layout):
+    """
+    列出一种输出结构的分段（--list-sections）
+
+    Returns:
+        list: 每行一个分段的说明文本
+    """
+    lines = []
+    for section, name in LAYOUTS[layout].items():
+        probe = REGISTRY[name]
+        helpers, _ = resolve([name])
+        deps = f"  依赖: {', '.join(helpers)}" if helpers else ''
+        lines.append(f"{section:<14} {name:<18} ~{probe.cost:>3}ms  {probe.description}{deps}")
+    return lines
+
+
+def add_sections_arguments(parser, layout):
+    """为采集器命令行添加分段选择参数"""
+    parser.add_argument('--sections', type=parse_sections, default=None,
+                        help=f"只采集指定分段，逗号分隔（可选: {', '.join(LAYOUTS[layout])}）")
+    parser.add_argument('--list-sections', action='store_true', help='列出可选分段及成本估计后退出')
+
+
+def probe_script(name):
+    """
+    获取单个探针的 run_js 脚本
+
+    Args:
+        name: 探针名称
+
+    Returns:
+        str: 以 return 开头、可直接传给 page.run_js 的脚本
+    """
+    helpers, _ = resolve([name])
+    if helpers:
+        return ('return (async () => {' + _helpers_script(helpers) +
+                '    return await ' + PROBE_SCRIPTS[name].strip() + ';\n})()')
+    return 'return ' + PROBE_SCRIPTS[name].strip()
+
+
+def build_batch_expression(names):
+    """
+    把多个探针合并为一个 JS 表达式
+
+    依赖的工具函数只定义一次，依赖的探针自动加入并排在前面。
+    每个探针在页面内单独 try/catch 并计时，返回结构为
+    { name: { ok: true, value: ..., ms } | { ok: false, error: '...', ms } }
+    表达式的值是 Promise（异步探针逐个 await），执行时需要 awaitPromise。
+
+    Args:
+        names: 探针名称列表
+
+    Returns:
+        str: JS 表达式（不带 return）
+    """
+    helpers, probes = resolve(names)
+    entries = []
+    for name in probes:
+        entries.append(f"[{json.dumps(name)}, () => {PROBE_SCRIPTS[name].strip()}]")
+
+    return (
+        "(async function() {\n" + _helpers_script(helpers) +
+        "    const __out__ = {};\n"
+        "    const __probes__ = [\n        " + ",\n        ".join(entries) + "\n    ];\n"
+        "    for (const [name, fn] of __probes__) {\n"
+        "        const __t__ = performance.now();\n"
+        "        try {\n"
+        "            __out__[name] = { ok: true, value: await fn() };\n"
+        "        } catch (e) {\n"
+        "            __out__[name] = { ok: false, error: String(e && e.message || e) };\n"
+        "        }\n"
+        "        __out__[name].ms = performance.now() - __t__;\n"
+        "    }\n"
+        "    return __out__;\n"
+        "})()"
+    )
+
+
+def build_batch_script(names):
+    """
+    构建批量采集的 run_js 脚本（一次 CDP 往返完成全部探针）
+
+    Args:
+        names: 探针名称列表
+
+    Returns:
+        str: 可直接传给 page.run_js 的脚本
+    """
+    return 'return ' + build_batch_expression(names)
+
+
+def unpack_batch_result(raw, names):
+    """
+    拆解批量采集结果
+
+    Args:
+        raw: build_batch_script 执行后的返回值
+        names: 期望的探针名称列表
+
+    Returns:
+        tuple: (values, errors)，values 为 {name: value}，errors 为 {name: 错误信息}
+    """
+    values = {}
+    errors = {}
+    raw = raw if isinstance(raw, dict) else {}
+
+    for name in names:
+        entry = raw.get(name)
+        if not isinstance(entry, dict):
+            errors[name] = 'missing result'
+        elif entry.get('ok'):
+            values[name] = entry.get('value')
+        else:
+            errors[name] = entry.get('error') or 'unknown error'
+
+    return values, errors
+
+
+def batch_probe_timings(raw, names):
+    """
+    取出批量脚本在页面内记录的各探针耗时
+
+    Returns:
+        dict: {name: 毫秒}，没有记录的探针不出现
+    """
+    raw = raw if isinstance(raw, dict) else {}
+    timings = {}
+    for name in names:
+        entry = raw.get(name)
+        if isinstance(entry, dict) and isinstance(entry.get('ms'), (int, float)):
+            timings[name] = entry['ms']
+    return timings
+
+
+def _raw_blobs(values):
+    return {field: values[name] for name, field in RAW_PROBES.items() if values.get(name) is not None}
+
+
+def build_result(values, url=None, errors=None, sections=None):
+    """
+    把探针结果组装为标准模板结构
+
+    Args:
+        values: {探针名称: 结果}
+        url: 来源URL
+        errors: {探针名称: 错误信息}，仅在非空时写入结果
+        sections: 只采集了部分分段时传入分段列表，未采集的分段不写入结果
+
+    Returns:
+        dict: 环境模板
+    """
+    # 确保 browser_info 不为 None
+    browser_info = values.get('browserInfo') or {'browser': 'Unknown', 'version': ''}
+    wanted = set(LAYOUTS['template'] if sections is None else sections)
+
+    result = {
+        "browser": browser_info.get('browser', 'Unknown'),
+        "version": browser_info.get('version', ''),
+        "collectedAt": datetime.utcnow().isoformat() + 'Z',
+        "sourceUrl": url or 'about:blank',
+        "objects": {
+            name: values.get(name) or {} for name in TEMPLATE_OBJECTS if name in wanted
+        },
+    }
+    if 'plugins' in wanted:
+        result["plugins"] = values.get('plugins') or []
+    for name in ('webgl', 'canvas', 'audioContext'):
+        if name in wanted:
+            result[name] = values.get(name)
+
+    if sections is not None:
+        result["sections"] = list(sections)
+
+    raw = _raw_blobs(values)
+    if raw:
+        result[RAW_BLOBS_KEY] = raw
+
+    if errors:
+        result["errors"] = errors
+
+    return result
+
+
+def assemble_layout(layout, values, errors=None, sections=None):
+    """
+    按输出结构组装探针结果（website / fingerprint）
+
+    Args:
+        layout: 输出结构名
+        values: {探针名称: 结果}
+        errors: {探针名称: 错误信息}，失败的分段写为 {"error": 信息}
+        sections: 需要的分段，None 表示全部
+
+    Returns:
+        dict: {分段名: 结果}，另有 layout 字段记录结构名
+    """
+    errors = errors or {}
+    mapping = LAYOUTS[layout]
+    result = {LAYOUT_KEY: layout}
+    for section in (mapping if sections is None else sections):
+        name = mapping[section]
+        result[section] = {'error': errors[name]} if name in errors else values.get(name)
+
+    raw = _raw_blobs(values)
+    if raw:
+        result[RAW_BLOBS_KEY] = raw
+    return result
+
+
+def result_errors(result):
+    """
+    取出采集结果中失败的探针
+
+    Args:
+        result: build_result（errors 字段）或 assemble_layout（{"error": 信息} 分段）的结果
+
+    Returns:
+        dict: {探针或分段名: 错误信息}，全部成功时为空
+    """
+    if not isinstance(result, dict):
+        return {}
+    errors = dict(result.get('errors') or {})
+    for section, value in result.items():
+        if isinstance(value, dict) and len(value) == 1 and 'error' in value:
+            errors[section] = value['error']
+    return errors
+
+
+def raw_blobs_path(output_path):
+    """结果文件对应的原始数据旁路文件路径（xxx.json -> xxx.raw.json）"""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.stem + '.raw.json')
+
+
+def save_raw_blobs(data, raw_path):
+    """
+    把采集结果中暂存的原始数据移到旁路文件
+
+    结果中只留下旁路文件名（rawBlobs 字段），摘要保留在原位置，
+    可以用旁路文件中的 dataURL / 采样重新计算并核对摘要。
+
+    Args:
+        data: 采集结果（会被原地修改）
+        raw_path: 旁路文件路径
+
+    Returns:
+        Path | None: 写出的旁路文件路径，结果中没有原始数据时返回 None
+    """
+    raw = data.pop(RAW_BLOBS_KEY, None)
+    if not raw:
+        return None
+
+    raw_path = Path(raw_path)
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    raw = dict(raw, sourceUrl=data.get('sourceUrl') or data.get('url'))
+    with open(raw_path, 'w', encoding='utf-8') as f:
+        json.dump(raw, f, ensure_ascii=False)
+
+    data['rawBlobs'] = raw_path.name
+    return raw_path
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面就绪等待策略
+
+替代固定的 time.sleep，按策略轮询页面状态，
+每种策略都有硬性截止时间，实际等待时间写入采集结果。
+
+支持的策略:
+    none                不等待
+    domcontentloaded    DOM 解析完成（readyState 不是 loading）
+    load                页面完全加载（readyState 为 complete）
+    networkidle[:毫秒]  load 之后 N 毫秒内没有新的资源请求完成（默认 500）
+    selector:<css>      指定选择器的元素出现
+    js:<表达式>         JS 表达式结果为真
+
+说明:
+    networkidle 基于 performance 资源条目判断，尚未结束的请求不会出现在条目中，
+    属于近似判断；需要精确控制时请配合 selector / js 策略。
+"""
+
+import json
+import time
+import asyncio
+
+from timing import NULL_TIMINGS
+
+
+DEFAULT_NETWORK_IDLE_MS = 500
+
+# 导航前在旧文档上设置的标记，新文档中不存在，用于避免把旧页面误判为就绪
+STALE_MARK = '__envCollectorStale__'
+
+
+def parse_strategy(spec):
+    """
+    解析策略字符串
+
+    Args:
+        spec: 策略字符串，如 'load'、'networkidle:800'、'selector:#app'
+
+    Returns:
+        tuple: (kind, arg)
+    """
+    spec = (spec or 'none').strip()
+    kind, _, arg = spec.partition(':')
+    kind = kind.lower()
+
+    if kind in ('none', 'domcontentloaded', 'load'):
+        return kind, None
+    if kind == 'networkidle':
+        return kind, int(arg) if arg else DEFAULT_NETWORK_IDLE_MS
+    if kind in ('selector', 'js'):
+        if not arg:
+            raise ValueError(f'策略 {kind} 缺少参数，例如 {kind}:...')
+        return kind, arg
+
+    raise ValueError(f'未知的就绪策略: {spec}')
+
+
+def predicate_expression(spec):
+    """
+    把策略转换为 JS 判断表达式（不带 return）
+
+    Returns:
+        str: 结果为 true 表示就绪；策略为 none 时返回 None
+    """
+    kind, arg = parse_strategy(spec)
+
+    if kind == 'none':
+        return None
+
+    if kind == 'domcontentloaded':
+        check = "document.readyState !== 'loading'"
+    elif kind == 'load':
+        check = "document.readyState === 'complete'"
+    elif kind == 'networkidle':
+        check = (
+            "document.readyState === 'complete' && (function() {"
+            " let last = 0;"
+            " for (const e of performance.getEntriesByType('resource')) {"
+            "  last = Math.max(last, e.responseEnd || e.startTime);"
+            " }"
+            f" return performance.now() - last >= {arg};"
+            " })()"
+        )
+    elif kind == 'selector':
+        check = f"!!document.querySelector({json.dumps(arg)})"
+    else:
+        check = f"!!({arg})"
+
+    return (
+        "(function() {"
+        f" if (window.{STALE_MARK}) return false;"
+        f" try {{ return !!({check}); }} catch (e) {{ return false; }}"
+        " })()"
+    )
+
+
+def mark_stale_script():
+    """导航前在当前文档上执行的标记脚本"""
+    return f"window.{STALE_MARK} = true; return true;"
+
+
+def _result(spec, started, ready):
+    return {
+        'strategy': spec or 'none',
+        'ready': ready,
+        'timedOut': not ready,
+        'waitedMs': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def wait_ready(page, spec='load', timeout=10, interval=0.1):
+    """
+    轮询等待页面就绪
+
+    Args:
+        page: DrissionPage 页面/标签页
+        spec: 策略字符串
+        timeout: 硬性截止时间（秒），超过后不再等待
+        interval: 轮询间隔（秒）
+
+    Returns:
+        dict: {strategy, ready, timedOut, waitedMs}
+    """
+    started = time.perf_counter()
+    expression = predicate_expression(spec)
+    if expression is None:
+        return _result(spec, started, True)
+
+    script = 'return ' + expression
+    deadline = started + timeout
+    while True:
+        try:
+            if page.run_js(script, timeout=max(deadline - time.perf_counter(), 0.1)):
+                return _result(spec, started, True)
+        except Exception:
+            # 导航过程中执行上下文可能被销毁，继续轮询
+            pass
+        if time.perf_counter() >= deadline:
+            return _result(spec, started, False)
+        time.sleep(interval)
+
+
+def navigate(page, url, spec='load', timeout=10, nav_timeout=None, timings=NULL_TIMINGS):
+    """
+    导航并按策略等待就绪
+
+    DrissionPage 的页面加载模式会被设置为 none，由本模块的策略接管等待，
+    这样 domcontentloaded 等较早的策略才能真正提前返回。
+
+    Args:
+        page: DrissionPage 页面/标签页
+        url: 目标URL
+        spec: 策略字符串
+        timeout: 就绪等待的硬性截止时间（秒）
+        nav_timeout: 建立连接的超时时间（秒）
+        timings: Timings 实例，记录 navigate / readiness 两个 span
+
+    Returns:
+        dict: {strategy, ready, timedOut, waitedMs, navigateMs}
+    """
+    parse_strategy(spec)
+
+    try:
+        page.run_js(mark_stale_script())
+    except Exception:
+        pass
+
+    try:
+        page.set.load_mode.none()
+    except AttributeError:
+        pass
+
+    started = time.perf_counter()
+    with timings.span('navigate'):
+        page.get(url, timeout=nav_timeout)
+    navigate_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    with timings.span('readiness'):
+        info = wait_ready(page, spec, timeout)
+    info['navigateMs'] = navigate_ms
+    return info
+
+
+async def async_wait_ready(evaluate, spec='load', timeout=10, interval=0.1):
+    """
+    asyncio 版本的轮询等待
+
+    Args:
+        evaluate: 协程函数 evaluate(expression) -> value
+        spec: 策略字符串
+        timeout: 硬性截止时间（秒）
+        interval: 轮询间隔（秒）
+    """
+    started = time.perf_counter()
+    expression = predicate_expression(spec)
+    if expression is None:
+        return _result(spec, started, True)
+
+    deadline = started + timeout
+    while True:
+        try:
+            remaining = max(deadline - time.perf_counter(), 0.1)
+            if await asyncio.wait_for(evaluate(expression), remaining):
+                return _result(spec, started, True)
+        except Exception:
+            pass
+        if time.perf_counter() >= deadline:
+            return _result(spec, started, False)
+        await asyncio.sleep(interval)
+
+
+def add_wait_arguments(parser, default='load', default_timeout=10):
+    """为采集器命令行添加就绪等待参数"""
+    parser.add_argument('--wait', default=default,
+                        help='页面就绪策略: none | domcontentloaded | load | networkidle[:毫秒] '
+                             f'| selector:<css> | js:<表达式>（默认 {default}）')
+    parser.add_argument('--wait-timeout', type=float, default=default_timeout,
+                        help=f'就绪等待的硬性截止时间（秒，默认 {default_timeout}）')
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导航期间的资源拦截
+
+网站环境采集只需要 JS 可见的环境和 cookie，图片、字体、音视频和第三方统计脚本
+却占了重型页面的大部分加载时间。这里通过 CDP Fetch 域在请求发出前拦截，
+按资源类型和域名的允许/拒绝列表决定放行还是以 BlockedByClient 失败，
+并记录拦截了什么，便于检查采集结果的保真度。
+
+规则优先级（从高到低）:
+    1. 主文档（当前标签页主 frame 的 Document 请求）总是放行
+    2. allow_domains 命中的域名放行
+    3. deny_domains 命中的域名拦截
+    4. 指定了 allow_types 时，类型不在其中的拦截
+    5. deny_types 命中的类型拦截
+    6. 其余放行
+
+域名规则匹配域名本身及其子域名（example.com 匹配 a.example.com）。
+只有类型拒绝规则时，Fetch 只暂停这些类型的请求，其余请求不产生额外的 CDP 往返。
+
+保真度说明:
+    - 拦截样式表、脚本会改变页面的 JS 环境，预设中不包含这两类
+    - 拦截统计脚本后，它们写入的 cookie 和全局变量不会出现在结果中
+    - 拦截记录写入结果的 blocking 字段（见 ResourceBlocker.summary）
+
+资源类型（CDP Network.ResourceType）:
+    Document Stylesheet Image Media Font Script TextTrack XHR Fetch Prefetch
+    EventSource WebSocket Manifest SignedExchange Ping CSPViolationReport Preflight Other
+
+用法:
+    rules = BlockRules.from_preset('heavy', allow_domains=['cdn.example.com'])
+    with ResourceBlocker(page, rules) as blocker:
+        page.get(url)
+    env_data['blocking'] = blocker.summary()
+"""
+
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+RESOURCE_TYPES = (
+    'Document', 'Stylesheet', 'Image', 'Media', 'Font', 'Script', 'TextTrack', 'XHR', 'Fetch',
+    'Prefetch', 'EventSource', 'WebSocket', 'Manifest', 'SignedExchange', 'Ping',
+    'CSPViolationReport', 'Preflight', 'Other',
+)
+
+# 常见的第三方统计 / 广告域名
+TRACKER_DOMAINS = (
+    'google-analytics.com', 'googletagmanager.com', 'googlesyndication.com', 'googleadservices.com',
+    'doubleclick.net', 'facebook.net', 'hotjar.com', 'clarity.ms', 'segment.io', 'mixpanel.com',
+    'scorecardresearch.com', 'hm.baidu.com', 'cnzz.com', 'umeng.com',
+)
+
+MEDIA_TYPES = ('Image', 'Media', 'Font')
+
+BLOCK_PRESETS = {
+    'none': {},
+    'media': {'deny_types': MEDIA_TYPES},
+    'trackers': {'deny_domains': TRACKER_DOMAINS},
+    'heavy': {'deny_types': MEDIA_TYPES + ('TextTrack', 'Prefetch', 'Ping'), 'deny_domains': TRACKER_DOMAINS},
+}
+
+# 拦截时返回给页面的错误原因
+BLOCK_REASON = 'BlockedByClient'
+
+MAX_LOGGED_URL = 300
+
+
+def normalize_types(types):
+    """
+    规范化资源类型名（大小写不敏感）
+
+    Raises:
+        ValueError: 未知的资源类型
+    """
+    lookup = {name.lower(): name for name in RESOURCE_TYPES}
+    result = []
+    for name in types or ():
+        name = name.strip()
+        if not name:
+            continue
+        if name.lower() not in lookup:
+            raise ValueError(f"未知的资源类型: {name}（可用: {', '.join(RESOURCE_TYPES)}）")
+        result.append(lookup[name.lower()])
+    return tuple(dict.fromkeys(result))
+
+
+def normalize_domains(domains):
+    return tuple(dict.fromkeys(d.strip().lower().lstrip('.') for d in domains or () if d.strip()))
+
+
+def match_domain(host, domains):
+    """host 等于某个域名或是其子域名时返回该域名"""
+    for domain in domains:
+        if host == domain or host.endswith('.' + domain):
+            return domain
+    return None
+
+
+class BlockRules:
+    """资源拦截规则"""
+
+    def __init__(self, deny_types=(), allow_types=(), deny_domains=(), allow_domains=()):
+        """
+        Args:
+            deny_types: 拦截的资源类型
+            allow_types: 只放行的资源类型（为空表示不限制）
+            deny_domains: 拦截的域名
+            allow_domains: 总是放行的域名（优先于其他规则）
+        """
+        self.deny_types = normalize_types(deny_types)
+        self.allow_types = normalize_types(allow_types)
+        self.deny_domains = normalize_domains(deny_domains)
+        self.allow_domains = normalize_domains(allow_domains)
+
+    @classmethod
+    def from_preset(cls, name, deny_types=(), allow_types=(), deny_domains=(), allow_domains=()):
+        """在预设（见 BLOCK_PRESETS）的基础上追加规则"""
+        if name not in BLOCK_PRESETS:
+            raise ValueError(f"未知的拦截预设: {name}（可用: {', '.join(BLOCK_PRESETS)}）")
+        preset = BLOCK_PRESETS[name]
+        return cls(
+            tuple(preset.get('deny_types', ())) + tuple(deny_types),
+            tuple(preset.get('allow_types', ())) + tuple(allow_types),
+            tuple(preset.get('deny_domains', ())) + tuple(deny_domains),
+            tuple(preset.get('allow_domains', ())) + tuple(allow_domains),
+        )
+
+    @property
+    def empty(self):
+        return not (self.deny_types or self.allow_types or self.deny_domains)
+
+    def decide(self, url, resource_type, main_document=False):
+        """
+        判断一个请求是否拦截
+
+        Args:
+            url: 请求 URL
+            resource_type: 资源类型
+            main_document: 是否为主 frame 的文档请求
+
+        Returns:
+            str: 命中的拦截规则（如 'type:Image'、'domain:doubleclick.net'），放行时返回 None
+        """
+        if main_document:
+            return None
+        host = (urlsplit(url).hostname or '').lower()
+        if host and match_domain(host, self.allow_domains):
+            return None
+        domain = match_domain(host, self.deny_domains) if host else None
+        if domain:
+            return f'domain:{domain}'
+        if self.allow_types and resource_type not in self.allow_types:
+            return f'type:{resource_type}'
+        if resource_type in self.deny_types:
+            return f'type:{resource_type}'
+        return None
+
+    def patterns(self):
+        """Fetch.enable 的请求模式：只有类型拒绝规则时只暂停这些类型"""
+        if self.allow_types or self.deny_domains:
+            return [{'urlPattern': '*', 'requestStage': 'Request'}]
+        return [{'urlPattern': '*', 'resourceType': t, 'requestStage': 'Request'} for t in self.deny_types]
+
+    def to_dict(self):
+        return {
+            'denyTypes': list(self.deny_types),
+            'allowTypes': list(self.allow_types),
+            'denyDomains': list(self.deny_domains),
+            'allowDomains': list(self.allow_domains),
+        }
+
+
+class ResourceBlocker:
+    """在一个页面/标签页上按规则拦截请求"""
+
+    EVENT = 'Fetch.requestPaused'
+
+    def __init__(self, page, rules, max_log=200):
+        """
+        Args:
+            page: DrissionPage 页面/标签页
+            rules: BlockRules
+            max_log: summary 中最多保留的拦截明细条数
+        """
+        self.page = page
+        self.rules = rules
+        self.max_log = max_log
+        self.main_frame = None
+        self.blocked = []
+        self.blocked_count = 0
+        self.allowed_count = 0
+        self.by_type = Counter()
+        self.by_domain = Counter()
+        self.errors = 0
+        self.active = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """开始拦截（规则为空时不做任何事）"""
+        if self.rules.empty or self.active:
+            return self
+        self.main_frame = getattr(self.page, 'tab_id', None)
+        self.page.driver.set_callback(self.EVENT, self._on_paused, immediate=True)
+        self.page.run_cdp('Fetch.enable', patterns=self.rules.patterns())
+        self.active = True
+        return self
+
+    def stop(self):
+        """停止拦截，标签页恢复正常（池中的标签页会被复用）"""
+        if not self.active:
+            return
+        self.active = False
+        try:
+            self.page.run_cdp('Fetch.disable')
+        except Exception:
+            pass
+        try:
+            self.page.driver.set_callback(self.EVENT, None, immediate=True)
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _on_paused(self, **params):
+        request_id = params.get('requestId')
+        url = params.get('request', {}).get('url', '')
+        resource_type = params.get('resourceType', 'Other')
+        main_document = resource_type == 'Document' and (
+            self.main_frame is None or params.get('frameId') == self.main_frame)
+        rule = self.rules.decide(url, resource_type, main_document)
+
+        try:
+            if rule:
+                self.page.run_cdp('Fetch.failRequest', requestId=request_id, errorReason=BLOCK_REASON)
+            else:
+                self.page.run_cdp('Fetch.continueRequest', requestId=request_id)
+        except Exception:
+            # 页面已跳转或关闭时请求 ID 失效
+            with self._lock:
+                self.errors += 1
+            return
+
+        with self._lock:
+            if not rule:
+                self.allowed_count += 1
+                return
+            self.blocked_count += 1
+            self.by_type[resource_type] += 1
+            self.by_domain[(urlsplit(url).hostname or '')] += 1
+            if len(self.blocked) < self.max_log:
+                self.blocked.append({'url': url[:MAX_LOGGED_URL], 'type': resource_type, 'rule': rule})
+
+    def summary(self):
+        """
+        Returns:
+            dict: {rules, blocked, allowed, errors, byType, byDomain, requests, truncated}
+        """
+        with self._lock:
+            return {
+                'rules': self.rules.to_dict(),
+                'blocked': self.blocked_count,
+                'allowed': self.allowed_count,
+                'errors': self.errors,
+                'byType': dict(self.by_type.most_common()),
+                'byDomain': dict(self.by_domain.most_common(20)),
+                'requests': list(self.blocked),
+                'truncated': self.blocked_count > len(self.blocked),
+            }
+
+
+def _split(value):
+    return [item for item in (value or '').split(',') if item.strip()]
+
+
+def add_blocking_arguments(parser):
+    """为采集器命令行添加资源拦截参数"""
+    group = parser.add_argument_group('资源拦截')
+    group.add_argument('--block', choices=list(BLOCK_PRESETS), default='none',
+                       help='拦截预设：media（图片/音视频/字体）、trackers（第三方统计）、heavy（两者都拦截）')
+    group.add_argument('--block-types', help='额外拦截的资源类型，逗号分隔（如 Image,Font）')
+    group.add_argument('--allow-types', help='只放行这些资源类型，逗号分隔（主文档总是放行）')
+    group.add_argument('--block-domains', help='额外拦截的域名，逗号分隔（含子域名）')
+    group.add_argument('--allow-domains', help='总是放行的域名，逗号分隔（优先于其他规则）')
+    return group
+
+
+def blocking_rules_from_args(args):
+    """
+    根据 add_blocking_arguments 添加的参数构建规则
+
+    Returns:
+        BlockRules，没有任何拦截规则时返回 None
+
+    Raises:
+        ValueError: 资源类型无效
+    """
+    rules = BlockRules.from_preset(
+        args.block,
+        deny_types=_split(args.block_types),
+        allow_types=_split(args.allow_types),
+        deny_domains=_split(args.block_domains),
+        allow_domains=_split(args.allow_domains),
+    )
+    return None if rules.empty else rules
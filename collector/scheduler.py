@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量采集调度器
+
+在浏览器池之上并发采集（在途数量上限、单次尝试超时，超时的标签页重建），并提供:
+
+- 优先级：数值大的先采集，同优先级按提交顺序
+- 按域名限流：每个域名同时在途的请求数上限（per_domain），以及令牌桶限速
+  （rate 个请求/秒，burst 为桶容量）；被限流的域名不会挡住其他域名
+- 重试：导航异常、超时和探针失败（结果中有失败的分段）按指数退避重试，
+  延迟为 backoff * 2^(n-1)（不超过 backoff_max），再乘以 0.5~1 的随机抖动
+- 死信：重试次数用完仍失败的 URL 进入 dead_letters（可写成 JSONL，
+  直接作为下一次 --urls 的输入）
+
+探针失败但页面已加载的结果在最后一次尝试时照常交付（部分结果好于没有结果）。
+参数错误一类的异常（ValueError / TypeError / KeyError）不重试。
+
+用法:
+    scheduler = Scheduler(pool, collect_fn, on_result, per_domain=2, rate=1, retries=3)
+    scheduler.add('https://a.com', priority=10)
+    scheduler.add_many(read_jobs('urls.txt'))
+    stats = scheduler.run()
+    write_dead_letters(scheduler.dead_letters, 'dead.jsonl')
+"""
+
+import json
+import heapq
+import random
+import threading
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from probes import result_errors
+
+
+# 不重试的异常类型（参数或代码错误，重试也不会成功）
+NON_RETRYABLE = (ValueError, TypeError, KeyError)
+
+
+class TokenBucket:
+    """令牌桶：rate 个/秒，容量 burst"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_in(self, now):
+        """距离有一个可用令牌还要多少秒（0 表示现在就有）"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class ScheduledJob:
+    """一个 URL 的采集任务（跨多次尝试）"""
+
+    def __init__(self, index, url, priority=0):
+        self.index = index
+        self.url = url
+        self.priority = priority
+        self.domain = urlparse(url).hostname or ''
+        self.attempts = 0
+        self.errors = []
+        self.not_before = 0.0
+        self.slot = None
+        self.started_at = None
+        self.abandoned = False
+        self.lock = threading.Lock()
+
+    def reset(self):
+        """开始新一次尝试前清理运行状态"""
+        self.slot = None
+        self.started_at = None
+        self.abandoned = False
+
+    def to_dead_letter(self):
+        return {
+            'index': self.index,
+            'url': self.url,
+            'priority': self.priority,
+            'attempts': self.attempts,
+            'errors': self.errors,
+        }
+
+
+class Scheduler:
+    """带优先级、按域名限流、重试和死信的批量采集调度器"""
+
+    def __init__(self, pool, collect_fn, on_result, concurrency=None, max_inflight=None, timeout=60, per_domain=2,
+                 rate=None, burst=1, retries=2, backoff=1.0, backoff_max=30.0,
+                 retry_partial=True, on_retry=None, acquire_timeout=None):
+        """
+        Args:
+            pool: 已启动的 BrowserPool
+            collect_fn: 采集函数 collect_fn(page, url, timeout) -> data
+            on_result: 最终结果回调 on_result(index, url, data, error, elapsed)，每个 URL 调用一次，
+                       在主线程调用；进入死信的 URL 以最后一次的错误回调
+            concurrency: 并发标签页数，默认等于池中标签页总数
+            max_inflight: 同时在途的尝试数上限，默认为 concurrency
+            timeout: 单次尝试的超时时间（秒）
+            per_domain: 每个域名同时在途的请求数上限（0 表示不限）
+            rate: 每个域名每秒最多发起的请求数（None / 0 表示不限速）
+            burst: 令牌桶容量（允许的突发请求数）
+            retries: 失败后最多重试的次数
+            backoff: 第一次重试前的等待时间（秒）
+            backoff_max: 重试等待时间上限（秒）
+            retry_partial: 结果中有失败的探针时也重试（最后一次尝试照常交付）
+            on_retry: 重试回调 on_retry(index, url, attempt, error, delay)
+            acquire_timeout: 等待空闲标签页的超时时间（秒）
+        """
+        self.pool = pool
+        self.collect_fn = collect_fn
+        self.on_result = on_result
+        self.concurrency = concurrency or pool.size * pool.tabs_per_browser
+        self.max_inflight = max(max_inflight or self.concurrency, 1)
+        self.timeout = timeout
+        self.per_domain = per_domain
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.retry_partial = retry_partial
+        self.on_retry = on_retry
+        self.acquire_timeout = acquire_timeout
+
+        self.queues = {}
+        self.delayed = []
+        self.buckets = {}
+        self.active = {}
+        self.dead_letters = []
+        self.stats = {'total': 0, 'ok': 0, 'partial': 0, 'failed': 0, 'timeout': 0,
+                      'retried': 0, 'dead': 0}
+        self._seq = 0
+
+    # ---------- 提交 ----------
+
+    def add(self, url, priority=0, index=None):
+        """
+        提交一个 URL
+
+        Args:
+            url: 目标 URL
+            priority: 优先级，数值大的先采集
+            index: 序号（用于结果文件名），默认按提交顺序从 1 开始
+        """
+        self.stats['total'] += 1
+        job = ScheduledJob(index or self.stats['total'], url, priority)
+        self._enqueue(job)
+        return job
+
+    def add_many(self, jobs):
+        """提交 [(url, priority), ...] 或 URL 列表"""
+        for item in jobs:
+            if isinstance(item, str):
+                self.add(item)
+            else:
+                self.add(*item)
+
+    def _enqueue(self, job):
+        self._seq += 1
+        heapq.heappush(self.queues.setdefault(job.domain, []), (-job.priority, self._seq, job))
+
+    # ---------- 调度 ----------
+
+    def _bucket(self, domain):
+        if not self.rate:
+            return None
+        if domain not in self.buckets:
+            self.buckets[domain] = TokenBucket(self.rate, self.burst)
+        return self.buckets[domain]
+
+    def _promote(self, now):
+        """退避时间已到的任务回到就绪队列"""
+        while self.delayed and self.delayed[0][0] <= now:
+            _, _, job = heapq.heappop(self.delayed)
+            self._enqueue(job)
+
+    def _next(self, now):
+        """
+        选出下一个可以运行的任务
+
+        Returns:
+            tuple: (job, wait)，没有可运行任务时 job 为 None，wait 为最早可能就绪的等待秒数
+        """
+        best = None
+        wait_for = None
+        for domain, heap in self.queues.items():
+            if not heap:
+                continue
+            if self.per_domain and self.active.get(domain, 0) >= self.per_domain:
+                continue
+            bucket = self._bucket(domain)
+            if bucket is not None:
+                delay = bucket.ready_in(now)
+                if delay > 0:
+                    wait_for = delay if wait_for is None else min(wait_for, delay)
+                    continue
+            if best is None or heap[0][:2] < self.queues[best][0][:2]:
+                best = domain
+
+        if best is None:
+            return None, wait_for
+
+        _, _, job = heapq.heappop(self.queues[best])
+        if not self.queues[best]:
+            del self.queues[best]
+        bucket = self._bucket(best)
+        if bucket is not None:
+            bucket.take(now)
+        return job, 0
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _worker(self, job):
+        slot = self.pool.acquire(self.acquire_timeout)
+        with job.lock:
+            job.slot = slot
+            job.started_at = time.time()
+
+        broken = False
+        try:
+            return self.collect_fn(slot.page, job.url, self.timeout)
+        except Exception:
+            broken = not slot.healthy()
+            raise
+        finally:
+            with job.lock:
+                # 超时被放弃的任务，其标签页状态不可信，直接重建
+                broken = broken or job.abandoned
+            self.pool.release(slot, broken=broken)
+
+    def _failed(self, job, error, data=None, retryable=True):
+        """一次尝试失败：安排重试，或交付部分结果 / 进入死信"""
+        job.errors.append(error)
+        if retryable and job.attempts <= self.retries:
+            delay = self._backoff(job.attempts)
+            self.stats['retried'] += 1
+            if self.on_retry:
+                self.on_retry(job.index, job.url, job.attempts, error, delay)
+            self._seq += 1
+            heapq.heappush(self.delayed, (time.monotonic() + delay, self._seq, job))
+            return
+
+        elapsed = time.time() - (job.started_at or time.time())
+        if data is not None:
+            # 探针失败但页面已加载：交付部分结果
+            self.stats['partial'] += 1
+            self.on_result(job.index, job.url, data, None, elapsed)
+            return
+        self.stats['dead'] += 1
+        self.dead_letters.append(job.to_dead_letter())
+        self.on_result(job.index, job.url, None, error, elapsed)
+
+    def _completed(self, job, future):
+        try:
+            data = future.result()
+        except NON_RETRYABLE as e:
+            self.stats['failed'] += 1
+            self._failed(job, f'{type(e).__name__}: {e}', retryable=False)
+            return
+        except Exception as e:
+            self.stats['failed'] += 1
+            self._failed(job, str(e) or type(e).__name__)
+            return
+
+        errors = result_errors(data) if self.retry_partial else {}
+        if errors:
+            detail = ', '.join(f'{name}: {message}' for name, message in sorted(errors.items()))
+            self._failed(job, f'探针失败 ({detail})', data=data)
+            return
+
+        self.stats['ok'] += 1
+        self.on_result(job.index, job.url, data, None, time.time() - (job.started_at or time.time()))
+
+    def run(self):
+        """
+        运行到所有任务交付或进入死信
+
+        Returns:
+            dict: 统计信息 {total, ok, partial, failed, timeout, retried, dead, elapsed}
+                  （failed / timeout 按尝试次数计）
+        """
+        batch_start = time.time()
+        inflight = {}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while self.queues or self.delayed or inflight:
+                now = time.monotonic()
+                self._promote(now)
+
+                wait_for = None
+                while len(inflight) < self.max_inflight:
+                    job, wait_for = self._next(now)
+                    if job is None:
+                        break
+                    job.reset()
+                    job.attempts += 1
+                    self.active[job.domain] = self.active.get(job.domain, 0) + 1
+                    inflight[executor.submit(self._worker, job)] = job
+
+                # 没有在途任务时按最早的退避 / 限速时间休眠
+                timeout = 0.5
+                if self.delayed:
+                    timeout = min(timeout, max(self.delayed[0][0] - now, 0.01))
+                if wait_for:
+                    timeout = min(timeout, wait_for)
+                if not inflight:
+                    time.sleep(timeout)
+                    continue
+
+                done, _ = wait(list(inflight), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    job = inflight.pop(future)
+                    self.active[job.domain] -= 1
+                    # 已放弃（超时）的尝试在后台结束后才释放名额，结果丢弃
+                    if job.abandoned:
+                        continue
+                    self._completed(job, future)
+
+                # 检查超时
+                now_wall = time.time()
+                for future, job in list(inflight.items()):
+                    with job.lock:
+                        expired = (not job.abandoned and job.started_at
+                                   and now_wall - job.started_at > self.timeout)
+                        if expired:
+                            job.abandoned = True
+                            slot = job.slot
+                    if not expired:
+                        continue
+
+                    self.stats['timeout'] += 1
+                    try:
+                        slot.page.stop_loading()
+                    except Exception:
+                        pass
+                    # 原任务对象仍在后台运行，用新对象重试
+                    retry = ScheduledJob(job.index, job.url, job.priority)
+                    retry.attempts = job.attempts
+                    retry.errors = job.errors
+                    retry.started_at = job.started_at
+                    self._failed(retry, f'超时 ({self.timeout}s)')
+
+        self.stats['elapsed'] = time.time() - batch_start
+        return self.stats
+
+
+def write_dead_letters(dead_letters, path):
+    """
+    把死信写成 JSONL（每行一个 {"url", "priority", "attempts", "errors"}），
+    可以直接作为 --urls 的输入重新采集
+
+    Returns:
+        Path，没有死信时返回 None（并删除旧文件）
+    """
+    path = Path(path)
+    if not dead_letters:
+        if path.exists():
+            path.unlink()
+        return None
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for entry in dead_letters:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return path
+
+
+def add_scheduler_arguments(parser):
+    """为采集器命令行添加调度参数（批量模式）"""
+    group = parser.add_argument_group('调度')
+    group.add_argument('--retries', type=int, default=2, help='失败（导航异常/超时/探针失败）后的重试次数')
+    group.add_argument('--backoff', type=float, default=1.0, help='第一次重试前的等待时间（秒），之后指数增长')
+    group.add_argument('--backoff-max', type=float, default=30.0, help='重试等待时间上限（秒）')
+    group.add_argument('--per-domain', type=int, default=2, help='每个域名同时在途的请求数上限（0 不限）')
+    group.add_argument('--rate', type=float, default=0, help='每个域名每秒最多发起的请求数（0 不限速）')
+    group.add_argument('--burst', type=int, default=1, help='按域名限速时允许的突发请求数')
+    group.add_argument('--no-retry-partial', dest='retry_partial', action='store_false', default=True,
+                       help='探针失败（部分结果）时不重试，直接交付')
+    group.add_argument('--dead-letter', help='死信文件（JSONL，可作为 --urls 重新采集），默认 <输出目录>/dead_letter.urls')
+    return group
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统一的环境数据结构
+
+三个采集器的输出结构互不兼容:
+    collect.py                 分段在 objects.* 下，plugins 在顶层，音频为 audioContext
+    website-env-collector.py   扁平结构，plugins / mimeTypes 在 navigator 中，cookies 为字符串
+    fingerprint-collector.py   扁平结构，website 的子集
+
+这里定义带版本号的统一结构（env/1），提供从三种旧结构的转换，
+以及编译成 Python 函数的批量校验器（逐字段的直线代码，不做递归解释），
+混合语料可以先统一转换，下游只处理一种结构。
+
+统一结构（env/1）:
+    schema       'env/1'
+    source       来源结构: template / website / fingerprint
+    meta         {browser, version, collectedAt, sourceUrl, errors?, readiness?, blocking?, ...}
+    navigator    navigator 属性，plugins / mimeTypes 总在其中
+    screen / window / document / location / performance / timezone / features
+    cookies      document.cookie 字符串
+    webgl / canvas / audio
+
+失败的分段（旧结构中的 {"error": 信息}）写为 null，错误信息移到 meta.errors。
+未知字段原样保留（校验器只检查已知字段的类型）。
+
+用法:
+    record = to_canonical(json.load(open('website_env.json')))
+    errors = validate(record)
+    python schema.py convert templates/ envs/*.json -o canonical/
+    python schema.py validate canonical/ corpus/
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+
+SCHEMA_VERSION = 'env/1'
+
+LAYOUTS = ('template', 'website', 'fingerprint')
+
+# 统一结构中的分段（不含 meta）
+SECTIONS = ('navigator', 'screen', 'window', 'document', 'location', 'performance', 'timezone',
+            'features', 'cookies', 'webgl', 'canvas', 'audio')
+
+# 旧结构中移到 meta 的字段
+META_FIELDS = ('browser', 'version', 'collectedAt', 'sourceUrl', 'sections', 'readiness', 'cache',
+               'blocking', 'profile', 'rawBlobs', 'deepGraph', '__timings__', '__rawBlobs__')
+
+# 字段类型: str / num / int / bool / dict / list / list<类型> / any，后缀 ? 表示可为 null 或缺省；
+# 嵌套 dict 表示对象（对象本身总是可缺省）
+SCHEMA_SPEC = {
+    'meta': {
+        'browser': 'str?',
+        'version': 'str?',
+        'collectedAt': 'str?',
+        'sourceUrl': 'str?',
+        'errors': 'dict?',
+        'sections': 'list<str>?',
+    },
+    'navigator': {
+        'userAgent': 'str?',
+        'platform': 'str?',
+        'vendor': 'str?',
+        'language': 'str?',
+        'languages': 'list<str>?',
+        'hardwareConcurrency': 'num?',
+        'deviceMemory': 'num?',
+        'maxTouchPoints': 'num?',
+        'webdriver': 'bool?',
+        'cookieEnabled': 'bool?',
+        'plugins': 'list<dict>?',
+        'mimeTypes': 'list<dict>?',
+    },
+    'screen': {
+        'width': 'num?',
+        'height': 'num?',
+        'availWidth': 'num?',
+        'availHeight': 'num?',
+        'colorDepth': 'num?',
+        'pixelDepth': 'num?',
+    },
+    'window': {
+        'innerWidth': 'num?',
+        'innerHeight': 'num?',
+        'outerWidth': 'num?',
+        'outerHeight': 'num?',
+        'devicePixelRatio': 'num?',
+    },
+    'document': {
+        'title': 'str?',
+        'cookie': 'str?',
+        'referrer': 'str?',
+    },
+    'location': {
+        'href': 'str?',
+        'host': 'str?',
+        'origin': 'str?',
+    },
+    'performance': {
+        'timeOrigin': 'num?',
+        'timing': 'dict?',
+    },
+    'timezone': {
+        'timezone': 'str?',
+        'offset': 'num?',
+        'locale': 'str?',
+    },
+    'features': 'dict?',
+    'cookies': 'str?',
+    'webgl': {
+        'vendor': 'str?',
+        'renderer': 'str?',
+        'unmaskedVendor': 'str?',
+        'unmaskedRenderer': 'str?',
+        'extensions': 'list<str>?',
+    },
+    'canvas': 'dict?',
+    'audio': {
+        'sampleRate': 'num?',
+        'state': 'str?',
+        'output': 'any?',
+    },
+}
+
+# 必须存在的顶层字段（schema / source 在校验函数开头单独检查）
+_REQUIRED = ('meta',)
+
+
+def detect_layout(data):
+    """
+    判断数据的结构
+
+    Returns:
+        str: 'canonical' / 'template' / 'website' / 'fingerprint'，
+        没有任何已知分段时（如 .gen-code.json 清单等非采集结果）返回 None
+    """
+    if data.get('schema') == SCHEMA_VERSION:
+        return 'canonical'
+    # 采集器写入的结构名优先（probes.assemble_layout），没有时按键名判断
+    if data.get('layout') in LAYOUTS:
+        return data['layout']
+    if isinstance(data.get('objects'), dict):
+        return 'template'
+    if 'location' in data or 'document' in data or 'cookies' in data:
+        return 'website'
+    if any(section in data for section in SECTIONS):
+        return 'fingerprint'
+    return None
+
+
+def _split_error(value):
+    """旧结构中失败的分段为 {"error": 信息}，返回 (值, 错误信息)"""
+    if isinstance(value, dict) and len(value) == 1 and 'error' in value:
+        return None, value['error']
+    return value, None
+
+
+def _canonical(source, meta):
+    return {'schema': SCHEMA_VERSION, 'source': source, 'meta': meta}
+
+
+def from_template(data):
+    """collect.py 的模板结构 -> 统一结构"""
+    meta = {key: data[key] for key in META_FIELDS if key in data}
+    errors = dict(data.get('errors') or {})
+    result = _canonical('template', meta)
+
+    for name, value in (data.get('objects') or {}).items():
+        value, error = _split_error(value)
+        if error:
+            errors[name] = error
+        # 只采集部分分段时模板中的空对象不代表真实值
+        result[name] = value if value != {} else None
+
+    navigator = result.get('navigator')
+    if 'plugins' in data:
+        if isinstance(navigator, dict):
+            navigator = result['navigator'] = dict(navigator, plugins=data['plugins'])
+        elif navigator is None:
+            result['navigator'] = {'plugins': data['plugins']}
+
+    document = result.get('document')
+    if isinstance(document, dict) and 'cookie' in document:
+        result['cookies'] = document['cookie']
+
+    for name, target in (('webgl', 'webgl'), ('canvas', 'canvas'), ('audioContext', 'audio')):
+        if name in data:
+            result[target] = data[name]
+
+    if errors:
+        meta['errors'] = errors
+    return result
+
+
+def from_flat(data, source):
+    """website-env-collector.py / fingerprint-collector.py 的扁平结构 -> 统一结构"""
+    meta = {key: data[key] for key in META_FIELDS if key in data}
+    errors = {}
+    result = _canonical(source, meta)
+
+    for name, value in data.items():
+        if name in META_FIELDS or name in ('errors', 'layout'):
+            continue
+        value, error = _split_error(value)
+        if error:
+            errors[name] = error
+        result[name] = value
+
+    location = result.get('location')
+    if 'sourceUrl' not in meta and isinstance(location, dict) and location.get('href'):
+        meta['sourceUrl'] = location['href']
+
+    if errors:
+        meta['errors'] = errors
+    return result
+
+
+def to_canonical(data, layout=None):
+    """
+    任意采集器输出 -> 统一结构（已是统一结构时原样返回）
+
+    Args:
+        data: 采集结果
+        layout: 来源结构，默认自动判断
+
+    Returns:
+        dict: env/1 结构（新对象，分段的值与输入共享，不做深拷贝）
+
+    Raises:
+        ValueError: 未知的结构名，或无法判断结构
+    """
+    layout = layout or detect_layout(data)
+    if layout == 'canonical':
+        return data
+    if layout == 'template':
+        return from_template(data)
+    if layout in ('website', 'fingerprint'):
+        return from_flat(data, layout)
+    if layout is None:
+        raise ValueError('无法识别的结构：不是采集结果')
+    raise ValueError(f'未知的结构: {layout}（可用: {", ".join(LAYOUTS)}）')
+
+
+# ---------- 编译校验器 ----------
+
+_TYPE_CHECKS = {
+    'str': 'type({v}) is str',
+    'num': '(type({v}) is int or type({v}) is float)',
+    'int': 'type({v}) is int',
+    'bool': 'type({v}) is bool',
+    'dict': 'type({v}) is dict',
+    'list': 'type({v}) is list',
+    'any': 'True',
+}
+
+
+def _check_expression(kind, var):
+    if kind.startswith('list<') and kind.endswith('>'):
+        item = kind[5:-1]
+        return f"(type({var}) is list and all({_TYPE_CHECKS[item].format(v='x')} for x in {var}))"
+    if kind not in _TYPE_CHECKS:
+        raise ValueError(f'未知的字段类型: {kind}')
+    return _TYPE_CHECKS[kind].format(v=var)
+
+
+def _emit(spec, var, path, lines, indent, counter):
+    """为对象 spec 生成逐字段的校验代码（var 已确认是 dict）"""
+    pad = '    ' * indent
+    for key, kind in spec.items():
+        if kind == 'any?':
+            continue
+        counter[0] += 1
+        child = f'v{counter[0]}'
+        field = f'{path}.{key}' if path else key
+        lines.append(f'{pad}{child} = {var}.get({key!r})')
+        required = not path and key in _REQUIRED
+
+        if isinstance(kind, dict):
+            lines.append(f'{pad}if {child} is not None:')
+            lines.append(f'{pad}    if type({child}) is not dict:')
+            lines.append(f'{pad}        e.append({field + ": 应为对象"!r})')
+            lines.append(f'{pad}    else:')
+            _emit(kind, child, field, lines, indent + 2, counter)
+            if required:
+                lines.append(f'{pad}else:')
+                lines.append(f'{pad}    e.append({field + ": 缺少字段"!r})')
+            continue
+
+        optional = kind.endswith('?')
+        kind = kind.rstrip('?')
+        check = _check_expression(kind, child)
+        if optional and not required:
+            lines.append(f'{pad}if {child} is not None and not {check}:')
+        else:
+            lines.append(f'{pad}if not {check}:')
+        lines.append(f'{pad}    e.append({field + ": 应为 " + kind!r})')
+
+
+def compile_validator(spec=None, version=SCHEMA_VERSION):
+    """
+    把字段规格编译为校验函数
+
+    Args:
+        spec: 字段规格，默认 SCHEMA_SPEC
+        version: 要求的 schema 字段值
+
+    Returns:
+        function: validate(record) -> 错误列表（空列表表示通过）；函数源码在 validate.source
+    """
+    spec = SCHEMA_SPEC if spec is None else spec
+    lines = [
+        'def validate(r):',
+        '    if type(r) is not dict:',
+        "        return ['$: 应为对象']",
+        '    e = []',
+        f"    if r.get('schema') != {version!r}:",
+        f"        e.append('schema: 应为 {version}')",
+        f"    if r.get('source') not in {LAYOUTS!r}:",
+        f"        e.append('source: 应为 {' / '.join(LAYOUTS)} 之一')",
+    ]
+    _emit(spec, 'r', '', lines, 1, [0])
+    lines.append('    return e')
+    source = '\n'.join(lines) + '\n'
+
+    namespace = {}
+    exec(compile(source, f'<schema {version}>', 'exec'), namespace)
+    validate = namespace['validate']
+    validate.source = source
+    return validate
+
+
+validate = compile_validator()
+
+
+def validate_many(records, validator=None, max_errors=20):
+    """
+    批量校验
+
+    Args:
+        records: 可迭代的 (位置, 记录)
+        validator: compile_validator 的结果，默认 validate
+        max_errors: 最多保留的失败明细条数
+
+    Returns:
+        dict: {total, valid, invalid, failures: [(位置, 错误列表)], elapsed, rate}
+    """
+    validator = validator or validate
+    started = time.perf_counter()
+    total = invalid = 0
+    failures = []
+    for location, record in records:
+        total += 1
+        errors = validator(record)
+        if errors:
+            invalid += 1
+            if len(failures) < max_errors:
+                failures.append((location, errors))
+    elapsed = time.perf_counter() - started
+    return {
+        'total': total,
+        'valid': total - invalid,
+        'invalid': invalid,
+        'failures': failures,
+        'elapsed': elapsed,
+        'rate': total / elapsed if elapsed > 0 else 0,
+    }
+
+
+# ---------- 命令行 ----------
+
+def iter_records(paths):
+    """
+    读取 JSON 文件、目录（递归 *.json）和 JSONL 分片目录中的记录
+
+    Returns:
+        生成器: (位置, 记录)
+    """
+    from jsonl_sink import JsonlReader
+
+    for item in paths:
+        item = Path(item)
+        if item.is_dir() and any(item.glob('*.jsonl*')):
+            for seq, record in enumerate(JsonlReader(item)):
+                if isinstance(record, dict):
+                    yield f'sink:{item}#{seq}', record
+            continue
+        files = sorted(item.rglob('*.json')) if item.is_dir() else [item]
+        for path in files:
+            if path.name.endswith(('.raw.json', '.graph.json')) or path.name.startswith('.'):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError) as e:
+                record = {'__error__': str(e)}
+            if isinstance(record, dict):
+                yield str(path), record
+
+
+def converted_path(root, location):
+    """
+    转换结果在输出目录中的相对路径
+
+    保留相对输入目录的路径（以输入目录名开头），不同目录中的同名文件
+    （如不同批次的 0001_host_hash.json）不会互相覆盖。
+
+    Args:
+        root: 输入（JSON 文件、目录或 JSONL 分片目录）
+        location: iter_records 给出的位置
+
+    Returns:
+        Path
+    """
+    root = Path(root)
+    if location.startswith('sink:'):
+        return Path(root.name) / f"{int(location.rsplit('#', 1)[1]):08d}.json"
+    path = Path(location)
+    if root.is_dir():
+        return Path(root.name) / path.relative_to(root)
+    return Path(path.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='统一环境数据结构（env/1）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    convert = sub.add_parser('convert', help='把采集结果转换为统一结构')
+    convert.add_argument('inputs', nargs='+', help='JSON 文件、目录或 JSONL 分片目录')
+    convert.add_argument('--output-dir', '-o', required=True, help='输出目录')
+
+    check = sub.add_parser('validate', help='校验记录（先转换为统一结构）')
+    check.add_argument('inputs', nargs='+', help='JSON 文件、目录或 JSONL 分片目录')
+    check.add_argument('--strict', action='store_true', help='不转换，要求记录已是统一结构')
+
+    sub.add_parser('source', help='打印编译出的校验函数源码')
+
+    args = parser.parse_args()
+
+    if args.command == 'source':
+        print(validate.source)
+        return 0
+
+    if args.command == 'convert':
+        output_dir = Path(args.output_dir)
+        count = 0
+        written = set()
+        for root in args.inputs:
+            for location, record in iter_records([root]):
+                if '__error__' in record:
+                    print(f"跳过 {location}: {record['__error__']}")
+                    continue
+                if detect_layout(record) is None:
+                    print(f"跳过 {location}: 不是采集结果")
+                    continue
+                path = output_dir / converted_path(root, location)
+                if path in written:
+                    print(f"跳过 {location}: 与已转换的记录同名 ({path})")
+                    continue
+                written.add(path)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(to_canonical(record), f, ensure_ascii=False)
+                count += 1
+        print(f"已转换 {count} 条记录 -> {output_dir}")
+        return 0
+
+    def records():
+        for location, record in iter_records(args.inputs):
+            if args.strict or '__error__' in record or detect_layout(record) is None:
+                yield location, record
+            else:
+                yield location, to_canonical(record)
+
+    stats = validate_many(records())
+    print(f"记录: {stats['total']}，通过: {stats['valid']}，失败: {stats['invalid']}"
+          f"（{stats['rate']:.0f} 条/秒）")
+    for location, errors in stats['failures']:
+        print(f"  {location}: {'; '.join(errors[:5])}")
+    return 1 if stats['invalid'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
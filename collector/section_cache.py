@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+采集分段缓存
+
+WebGL、AudioContext、plugins、canvas、screen 这类结果只取决于
+本机硬件和浏览器构建，与访问的页面无关，同一台机器上重复采集
+得到的值几乎不变。本模块把这些分段缓存到磁盘，键由以下内容组成：
+
+- 浏览器版本（Browser.getVersion 的 product）
+- 浏览器可执行文件的内容哈希
+- 启动参数（去掉端口、用户目录等每次都会变化的参数）
+
+location、document、cookie 等与页面相关的分段永远不会进入缓存。
+
+缓存支持 TTL 过期和按最近访问时间的 LRU 淘汰。
+
+用法:
+    cache = SectionCache('.cache/sections', ttl=7 * 24 * 3600, max_entries=256)
+    collector = BrowserEnvCollector(cache=cache)
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+
+# 允许缓存的分段（与页面无关）
+CACHEABLE_SECTIONS = ('screen', 'plugins', 'webgl', 'canvas', 'audioContext')
+
+# 每次启动都会变化、不影响指纹的启动参数前缀
+VOLATILE_FLAG_PREFIXES = (
+    '--remote-debugging-port', '--user-data-dir', '--remote-allow-origins',
+    '--crash-dumps-dir', '--field-trial-handle', '--type=', '--enable-crash-reporter',
+)
+
+
+def normalize_flags(flags):
+    """去掉易变参数并排序，保证同一配置得到相同的键"""
+    result = []
+    for flag in flags or []:
+        if not flag.startswith('-'):
+            continue
+        if flag.startswith(VOLATILE_FLAG_PREFIXES):
+            continue
+        result.append(flag)
+    return sorted(set(result))
+
+
+def process_cmdline(pid):
+    """读取进程命令行（需要 Linux /proc 或 psutil），失败返回 None"""
+    if not pid:
+        return None
+    try:
+        import psutil
+        return psutil.Process(pid).cmdline()
+    except Exception:
+        pass
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return [arg.decode('utf-8', 'replace') for arg in f.read().split(b'\0') if arg]
+    except OSError:
+        return None
+
+
+def browser_identity(page, browser_path=None, flags=None):
+    """
+    获取页面所属浏览器的身份信息
+
+    Args:
+        page: DrissionPage 页面/标签页
+        browser_path: 已知的可执行文件路径（可选）
+        flags: 已知的启动参数（可选），默认从浏览器进程命令行读取
+
+    Returns:
+        dict: {version, executable, flags}
+    """
+    browser = getattr(page, 'browser', None)
+    version = getattr(browser, 'version', None)
+    if not version:
+        try:
+            version = page.run_js('return navigator.userAgent')
+        except Exception:
+            version = 'unknown'
+
+    cmdline = process_cmdline(getattr(browser, 'process_id', None))
+    if cmdline:
+        browser_path = browser_path or cmdline[0]
+        if flags is None:
+            flags = cmdline[1:]
+
+    return {
+        'version': version,
+        'executable': browser_path or '',
+        'flags': normalize_flags(flags),
+    }
+
+
+class SectionCache:
+    """与页面无关分段的磁盘缓存"""
+
+    def __init__(self, cache_dir='.cache/sections', ttl=7 * 24 * 3600, max_entries=256):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            ttl: 过期时间（秒），None 表示不过期
+            max_entries: 最多保留的分段数量，超过后按最近访问时间淘汰
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._index_path = self.cache_dir / 'index.json'
+        self._hash_path = self.cache_dir / 'executables.json'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._index = self._load_json(self._index_path)
+        self._exe_hashes = self._load_json(self._hash_path)
+
+    @staticmethod
+    def _load_json(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_json(path, data):
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def executable_hash(self, path):
+        """
+        计算可执行文件内容哈希
+
+        按 (路径, 大小, 修改时间) 记住结果，浏览器升级前只需计算一次。
+        文件不可读时退化为路径本身的哈希。
+        """
+        if not path:
+            return ''
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return hashlib.sha256(str(path).encode('utf-8')).hexdigest()
+
+        memo_key = f'{os.path.abspath(path)}|{stat.st_size}|{int(stat.st_mtime)}'
+        with self._lock:
+            cached = self._exe_hashes.get(memo_key)
+        if cached:
+            return cached
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        value = digest.hexdigest()
+
+        with self._lock:
+            self._exe_hashes[memo_key] = value
+            self._write_json(self._hash_path, self._exe_hashes)
+        return value
+
+    def make_key(self, identity):
+        """
+        由浏览器身份生成缓存键
+
+        Args:
+            identity: browser_identity() 的返回值
+        """
+        material = json.dumps({
+            'version': identity.get('version'),
+            'executable': self.executable_hash(identity.get('executable')),
+            'flags': normalize_flags(identity.get('flags')),
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()[:32]
+
+    def _entry_path(self, key, section):
+        return self.cache_dir / key[:2] / f'{key}.{section}.json'
+
+    def get(self, key, sections=CACHEABLE_SECTIONS):
+        """
+        读取缓存
+
+        Args:
+            key: make_key 生成的键
+            sections: 要读取的分段
+
+        Returns:
+            dict: 命中的 {分段: 值}
+        """
+        now = time.time()
+        hits = {}
+        expired = []
+
+        with self._lock:
+            for section in sections:
+                if section not in CACHEABLE_SECTIONS:
+                    continue
+                entry_id = f'{key}.{section}'
+                meta = self._index.get(entry_id)
+                if not meta:
+                    continue
+                if self.ttl is not None and now - meta['createdAt'] > self.ttl:
+                    expired.append(entry_id)
+                    continue
+                try:
+                    with open(self._entry_path(key, section), 'r', encoding='utf-8') as f:
+                        hits[section] = json.load(f)
+                    meta['lastAccess'] = now
+                except (OSError, ValueError):
+                    expired.append(entry_id)
+
+            for entry_id in expired:
+                self._remove(entry_id)
+            if hits or expired:
+                self._write_json(self._index_path, self._index)
+
+        return hits
+
+    def put(self, key, values):
+        """
+        写入缓存，只保存 CACHEABLE_SECTIONS 中且值非空的分段
+
+        Args:
+            key: make_key 生成的键
+            values: {分段: 值}
+        """
+        now = time.time()
+        with self._lock:
+            for section, value in values.items():
+                if section not in CACHEABLE_SECTIONS or value in (None, {}, []):
+                    continue
+                path = self._entry_path(key, section)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._write_json(path, value)
+                self._index[f'{key}.{section}'] = {'createdAt': now, 'lastAccess': now}
+
+            self._evict()
+            self._write_json(self._index_path, self._index)
+
+    def _remove(self, entry_id):
+        self._index.pop(entry_id, None)
+        key, _, section = entry_id.partition('.')
+        try:
+            self._entry_path(key, section).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """按最近访问时间淘汰多余的分段"""
+        if not self.max_entries or len(self._index) <= self.max_entries:
+            return
+        ordered = sorted(self._index.items(), key=lambda item: item[1]['lastAccess'])
+        for entry_id, _ in ordered[:len(self._index) - self.max_entries]:
+            self._remove(entry_id)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for entry_id in list(self._index):
+                self._remove(entry_id)
+            self._write_json(self._index_path, self._index)
@@ -0,0 +1,622 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻采集服务
+
+每次 npm run collect 都要新起 Python 进程、导入 DrissionPage、冷启动浏览器，
+刷新一次 cookie 就要等几秒。serve 模式常驻一个浏览器池（见 browser_pool.py），
+通过本地 HTTP（TCP 或 Unix socket）接收采集请求，在已预热的标签页上采集。
+
+- 请求队列：超过 --queue-size 个请求排队时返回 503（带 Retry-After），调用方自行重试
+- 截止时间：每个请求带 deadline（秒，含排队时间），排队超时直接丢弃，
+  运行中超时停止页面加载、结果作废，返回 504
+- 取消：DELETE /jobs/<id>，排队中的请求不再执行，运行中的请求停止加载并作废
+
+接口（JSON）:
+    POST   /collect       同步采集，等到结果或截止时间
+    POST   /jobs          异步提交，返回 202 {"id": ...}
+    GET    /jobs/<id>     查询状态和结果
+    DELETE /jobs/<id>     取消
+    GET    /health        队列长度、在途请求数、浏览器池统计
+
+请求体:
+    {
+        "kind": "website" | "template" | "fingerprint",
+        "url": "https://example.com",
+        "id": "可选，调用方指定的任务 ID（用于取消）",
+        "deadline": 30,
+        "wait": "networkidle", "waitTimeout": 10,
+        "sections": ["navigator", "screen"],
+        "format": "json" | "js", "compact": true,
+        "block": "heavy", "blockTypes": [...], "allowTypes": [...],
+        "blockDomains": [...], "allowDomains": [...]          (仅 website)
+    }
+
+响应:
+    {"id", "state", "kind", "url", "queuedMs", "runMs", "version", "data", "code"}
+    version 为结果的内容哈希，可作为 /api/sandbox/inject-env 的 version，
+    之后用 env_diff.py 生成的补丁增量更新
+
+用法:
+    python serve.py --port 8765 --tabs 4 --fast-start
+    python serve.py --socket /tmp/env-collector.sock
+    curl -s localhost:8765/collect -d '{"kind": "website", "url": "https://example.com", "deadline": 20}'
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import queue
+import signal
+import argparse
+import threading
+import importlib.util
+from pathlib import Path
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from browser_pool import BrowserPool
+from collect import BrowserEnvCollector, generate_env_code
+from launch_profile import add_launch_arguments, launch_profile_from_args
+from probes import layout_probes
+from readiness import parse_strategy
+from resource_blocking import BlockRules
+from template_store import content_hash
+
+
+COLLECTOR_DIR = Path(__file__).resolve().parent
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, EXPIRED = (
+    'queued', 'running', 'done', 'failed', 'cancelled', 'expired')
+
+FINAL_STATES = (DONE, FAILED, CANCELLED, EXPIRED)
+
+# 同步接口按任务最终状态返回的 HTTP 状态码
+STATUS_CODES = {DONE: 200, FAILED: 500, CANCELLED: 409, EXPIRED: 504}
+
+DEFAULT_WAIT = {'website': 'networkidle', 'template': 'load', 'fingerprint': 'load'}
+
+# 截止时间检查间隔（秒）
+WATCHDOG_INTERVAL = 0.1
+
+
+class ServiceBusy(Exception):
+    """队列已满"""
+
+    def __init__(self, retry_after):
+        super().__init__('采集队列已满')
+        self.retry_after = retry_after
+
+
+def load_script_module(name):
+    """按文件路径加载带连字符的采集器脚本（website-env-collector.py 等）"""
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), COLLECTOR_DIR / f'{name}.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _list(value):
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return tuple(item.strip() for item in value.split(',') if item.strip())
+    return tuple(value)
+
+
+class Job:
+    """一个采集请求"""
+
+    def __init__(self, kind, url, params, deadline, job_id=None):
+        self.id = job_id or uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.url = url
+        self.params = params
+        self.deadline = deadline
+        self.created = time.monotonic()
+        self.deadline_at = self.created + deadline
+        self.started = None
+        self.finished = None
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.slot = None
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    def remaining(self):
+        return self.deadline_at - time.monotonic()
+
+    def begin(self, slot):
+        """进入运行状态，任务已取消或过期时返回 False"""
+        with self.lock:
+            if self.state != QUEUED:
+                return False
+            self.state = RUNNING
+            self.slot = slot
+            self.started = time.monotonic()
+            return True
+
+    def finish(self, state, result=None, error=None):
+        """
+        设置最终状态（只有第一次调用生效）
+
+        Returns:
+            bool: 本次调用是否生效
+        """
+        with self.lock:
+            if self.state in FINAL_STATES:
+                return False
+            self.state = state
+            self.result = result
+            self.error = error
+            self.finished = time.monotonic()
+        self.done.set()
+        return True
+
+    def to_dict(self, include_result=True):
+        end = self.finished or time.monotonic()
+        info = {
+            'id': self.id,
+            'state': self.state,
+            'kind': self.kind,
+            'url': self.url,
+            'queuedMs': round(((self.started or end) - self.created) * 1000, 3),
+            'runMs': round((end - self.started) * 1000, 3) if self.started else None,
+        }
+        if self.error:
+            info['error'] = self.error
+        if include_result and self.result is not None:
+            info.update(self.result)
+        return info
+
+
+class CollectorService:
+    """请求队列 + 工作线程 + 截止时间检查，在浏览器池的标签页上执行采集"""
+
+    def __init__(self, pool, workers, queue_size=64, default_deadline=60, keep_finished=256):
+        """
+        Args:
+            pool: BrowserPool（或提供 start/acquire/release/close/stats 的替身）
+            workers: 工作线程数，通常等于池中标签页总数
+            queue_size: 排队请求上限，超过时 submit 抛出 ServiceBusy
+            default_deadline: 请求未指定 deadline 时的截止时间（秒）
+            keep_finished: 保留供查询的已结束任务数
+        """
+        self.pool = pool
+        self.workers = workers
+        self.queue_size = queue_size
+        self.default_deadline = default_deadline
+        self.keep_finished = keep_finished
+        self.queue = queue.Queue()
+        self.jobs = OrderedDict()
+        self.stats = {'submitted': 0, 'rejected': 0, DONE: 0, FAILED: 0, CANCELLED: 0, EXPIRED: 0}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._run_ms = []
+        self._modules = {}
+        self.handlers = {
+            'template': self._collect_template,
+            'website': self._collect_website,
+            'fingerprint': self._collect_fingerprint,
+        }
+
+    # ---------- 生命周期 ----------
+
+    def start(self):
+        """启动浏览器池、工作线程和截止时间检查线程"""
+        self.pool.start()
+        for name in ('website-env-collector', 'fingerprint-collector'):
+            self._modules[name] = load_script_module(name)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'collector-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._watchdog, name='collector-watchdog', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def close(self):
+        """停止接收请求，取消排队中的请求并关闭浏览器池"""
+        self._stopping.set()
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            self._abort(job, CANCELLED, '服务已停止')
+        self.pool.close()
+
+    # ---------- 请求 ----------
+
+    def validate(self, kind, url, params):
+        """
+        校验请求参数
+
+        Raises:
+            ValueError: 参数无效
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"未知的采集类型: {kind}（可用: {', '.join(self.handlers)}）")
+        if kind == 'website' and not url:
+            raise ValueError('website 采集需要 url')
+        layout_probes(kind, _list(params.get('sections')) or None)
+        parse_strategy(params.get('wait') or DEFAULT_WAIT[kind])
+        if params.get('format', 'json') not in ('json', 'js'):
+            raise ValueError(f"未知的输出格式: {params.get('format')}")
+        if kind == 'fingerprint' and params.get('format') == 'js':
+            raise ValueError('fingerprint 不支持 js 格式')
+        if kind == 'website':
+            self._blocking(params)
+
+    def submit(self, kind, url=None, params=None, deadline=None, job_id=None):
+        """
+        提交采集请求
+
+        Returns:
+            Job
+
+        Raises:
+            ValueError: 参数无效或任务 ID 重复
+            ServiceBusy: 排队请求已达上限
+        """
+        params = params or {}
+        self.validate(kind, url, params)
+        deadline = float(deadline or self.default_deadline)
+        if deadline <= 0:
+            raise ValueError('deadline 必须大于 0')
+
+        with self._lock:
+            if self._stopping.is_set():
+                raise ServiceBusy(1)
+            if job_id and job_id in self.jobs:
+                raise ValueError(f'任务 ID 已存在: {job_id}')
+            queued = sum(1 for job in self.jobs.values() if job.state == QUEUED)
+            if queued >= self.queue_size:
+                self.stats['rejected'] += 1
+                raise ServiceBusy(self._retry_after(queued))
+            job = Job(kind, url, params, deadline, job_id)
+            self.jobs[job.id] = job
+            self.stats['submitted'] += 1
+            self._trim()
+        self.queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        取消任务
+
+        Returns:
+            Job，任务不存在时返回 None
+        """
+        job = self.get(job_id)
+        if job is not None:
+            self._abort(job, CANCELLED, '已取消')
+        return job
+
+    def health(self):
+        with self._lock:
+            states = {}
+            for job in self.jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            stats = dict(self.stats)
+        return {
+            'status': 'stopping' if self._stopping.is_set() else 'ok',
+            'workers': self.workers,
+            'queueSize': self.queue_size,
+            'queued': states.get(QUEUED, 0),
+            'running': states.get(RUNNING, 0),
+            'stats': stats,
+            'pool': dict(getattr(self.pool, 'stats', {})),
+        }
+
+    # ---------- 内部 ----------
+
+    def _retry_after(self, queued):
+        """按最近的平均采集耗时估算排到的时间（秒）"""
+        recent = self._run_ms[-50:]
+        average = sum(recent) / len(recent) / 1000 if recent else 1
+        return max(1, math.ceil(queued * average / max(self.workers, 1)))
+
+    def _trim(self):
+        """只保留最近 keep_finished 个已结束任务"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in FINAL_STATES]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    def _abort(self, job, state, error):
+        """取消或过期：设置最终状态，运行中的任务停止页面加载"""
+        with job.lock:
+            slot = job.slot
+        if not job.finish(state, error=error):
+            return
+        with self._lock:
+            self.stats[state] += 1
+        if slot is not None:
+            try:
+                slot.page.stop_loading()
+            except Exception:
+                pass
+
+    def _watchdog(self):
+        while not self._stopping.wait(WATCHDOG_INTERVAL):
+            with self._lock:
+                expired = [job for job in self.jobs.values()
+                           if job.state in (QUEUED, RUNNING) and job.remaining() <= 0]
+            for job in expired:
+                self._abort(job, EXPIRED, f'超过截止时间 ({job.deadline:g}s)')
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if job.state != QUEUED:
+                continue
+
+            try:
+                slot = self.pool.acquire(timeout=max(job.remaining(), 0.01))
+            except TimeoutError:
+                self._abort(job, EXPIRED, '等待空闲标签页超时')
+                continue
+            except Exception as e:
+                if job.finish(FAILED, error=str(e)):
+                    self._count(FAILED)
+                continue
+
+            if not job.begin(slot):
+                self.pool.release(slot)
+                continue
+
+            broken = False
+            try:
+                result = self.handlers[job.kind](slot.page, job)
+                if job.finish(DONE, result=result):
+                    self._count(DONE, job)
+            except Exception as e:
+                broken = not slot.healthy()
+                if job.finish(FAILED, error=str(e)):
+                    self._count(FAILED)
+            finally:
+                with job.lock:
+                    job.slot = None
+                    # 运行中被取消或过期的任务，页面加载被中途停止，标签页状态不可信，直接重建
+                    broken = broken or job.state in (CANCELLED, EXPIRED)
+                self.pool.release(slot, broken=broken)
+
+    def _count(self, state, job=None):
+        with self._lock:
+            self.stats[state] += 1
+            if job is not None and job.started:
+                self._run_ms.append((job.finished - job.started) * 1000)
+                del self._run_ms[:-200]
+
+    def _common(self, job):
+        params = job.params
+        remaining = max(job.remaining(), 0.1)
+        return {
+            'timeout': remaining,
+            'wait': params.get('wait') or DEFAULT_WAIT[job.kind],
+            'wait_timeout': min(float(params.get('waitTimeout', 10)), remaining),
+            'sections': list(_list(params.get('sections'))) or None,
+        }
+
+    def _blocking(self, params):
+        if not any(params.get(key) for key in ('block', 'blockTypes', 'allowTypes', 'blockDomains')):
+            return None
+        rules = BlockRules.from_preset(
+            params.get('block') or 'none',
+            deny_types=_list(params.get('blockTypes')),
+            allow_types=_list(params.get('allowTypes')),
+            deny_domains=_list(params.get('blockDomains')),
+            allow_domains=_list(params.get('allowDomains')),
+        )
+        return None if rules.empty else rules
+
+    def _package(self, data, code=None):
+        result = {'version': content_hash(data), 'data': data}
+        if code is not None:
+            result['code'] = code
+        return result
+
+    def _collect_template(self, page, job):
+        options = self._common(job)
+        collector = BrowserEnvCollector(page=page, wait=options['wait'], wait_timeout=options['wait_timeout'],
+                                        sections=options['sections'])
+        data = collector.collect_all(job.url, timeout=options['timeout'])
+        code = None
+        if job.params.get('format') == 'js':
+            code = generate_env_code(data, compact=bool(job.params.get('compact')))
+        return self._package(data, code)
+
+    def _collect_website(self, page, job):
+        module = self._modules['website-env-collector']
+        options = self._common(job)
+        data = module.collect_website_environment(job.url, page=page, blocking=self._blocking(job.params),
+                                                  **options)
+        code = None
+        if job.params.get('format') == 'js':
+            code = module.generate_js_code(data, job.url, compact=bool(job.params.get('compact')))
+        return self._package(data, code)
+
+    def _collect_fingerprint(self, page, job):
+        module = self._modules['fingerprint-collector']
+        data = module.collect_fingerprint(job.url or 'about:blank', page=page, **self._common(job))
+        return self._package(data)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP 接口（service 由 make_server 挂到 server 上）"""
+
+    server_version = 'EnvCollector/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if getattr(self.server, 'verbose', False):
+            sys.stderr.write(f"[serve] {self.command} {self.path} - {format % args}\n")
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        body = json.loads(self.rfile.read(length).decode('utf-8'))
+        if not isinstance(body, dict):
+            raise ValueError('请求体必须是 JSON 对象')
+        return body
+
+    def _job_id(self):
+        parts = self.path.split('?', 1)[0].strip('/').split('/')
+        return parts[1] if len(parts) == 2 and parts[0] == 'jobs' else None
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path == '/health':
+            return self._send(200, self.service.health())
+        job_id = self._job_id()
+        job = self.service.get(job_id) if job_id else None
+        if job is None:
+            return self._send(404, {'error': 'not found'})
+        return self._send(200, job.to_dict())
+
+    def do_DELETE(self):
+        job_id = self._job_id()
+        job = self.service.cancel(job_id) if job_id else None
+        if job is None:
+            return self._send(404, {'error': 'not found'})
+        return self._send(200, job.to_dict(include_result=False))
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path not in ('/collect', '/jobs'):
+            return self._send(404, {'error': 'not found'})
+
+        try:
+            body = self._body()
+            params = {k: v for k, v in body.items() if k not in ('kind', 'url', 'deadline', 'id')}
+            job = self.service.submit(body.get('kind', 'website'), body.get('url'), params,
+                                      body.get('deadline'), body.get('id'))
+        except ServiceBusy as e:
+            return self._send(503, {'error': str(e), 'retryAfter': e.retry_after},
+                              {'Retry-After': e.retry_after})
+        except (ValueError, TypeError) as e:
+            return self._send(400, {'error': str(e)})
+
+        if path == '/jobs':
+            return self._send(202, job.to_dict(include_result=False), {'Location': f'/jobs/{job.id}'})
+
+        # 同步接口：截止时间由 watchdog 负责，这里多等一点避免与其竞争
+        job.done.wait(max(job.remaining(), 0) + 1)
+        if not job.done.is_set():
+            self.service._abort(job, EXPIRED, f'超过截止时间 ({job.deadline:g}s)')
+        return self._send(STATUS_CODES.get(job.state, 500), job.to_dict())
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """Unix socket 上的 HTTP 服务"""
+
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler 记录日志时会读取 client_address[0]
+        return request, ('unix', 0)
+
+
+def make_server(service, host='127.0.0.1', port=8765, socket_path=None, verbose=False):
+    """
+    创建 HTTP 服务（未开始监听循环）
+
+    Args:
+        service: CollectorService
+        host / port: TCP 地址（socket_path 为空时使用）
+        socket_path: Unix socket 路径
+        verbose: 打印访问日志
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, ServiceHandler)
+        os.chmod(socket_path, 0o600)
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceHandler)
+        server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='常驻采集服务（本地 HTTP / Unix socket）')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--socket', help='改为监听 Unix socket（如 /tmp/env-collector.sock）')
+    parser.add_argument('--browser', '-b', choices=['chrome', 'edge'], default='chrome', help='浏览器类型')
+    parser.add_argument('--headless', action='store_true', default=True, help='无头模式')
+    parser.add_argument('--no-headless', dest='headless', action='store_false', help='有头模式')
+    parser.add_argument('--browsers', type=int, default=1, help='常驻浏览器数')
+    parser.add_argument('--tabs', type=int, default=4, help='每个浏览器预开的标签页数（即并发采集数）')
+    parser.add_argument('--queue-size', type=int, default=64, help='排队请求上限，超过返回 503')
+    parser.add_argument('--deadline', type=float, default=60, help='请求未指定 deadline 时的截止时间（秒）')
+    parser.add_argument('--max-uses', type=int, default=100, help='单个浏览器借出次数上限，达到后回收重启')
+    parser.add_argument('--max-memory-mb', type=float, help='单个浏览器内存上限（MB）')
+    parser.add_argument('--verbose', '-v', action='store_true', help='打印访问日志')
+    add_launch_arguments(parser)
+
+    args = parser.parse_args()
+
+    pool = BrowserPool(size=args.browsers, tabs_per_browser=args.tabs, max_uses=args.max_uses,
+                       max_memory_mb=args.max_memory_mb,
+                       launch=launch_profile_from_args(args, args.browser, args.headless))
+    service = CollectorService(pool, workers=args.browsers * args.tabs, queue_size=args.queue_size,
+                               default_deadline=args.deadline)
+
+    started = time.perf_counter()
+    print(f"启动浏览器池: {args.browsers} 个浏览器 x {args.tabs} 个标签页...")
+    service.start()
+    server = make_server(service, args.host, args.port, args.socket, args.verbose)
+    address = args.socket or f'http://{args.host}:{args.port}'
+    print(f"采集服务已就绪: {address}（启动耗时 {time.perf_counter() - started:.1f}s，"
+          f"队列上限 {args.queue_size}）")
+
+    def shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("正在关闭采集服务...")
+        server.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址的模板仓库
+
+不同网站采集到的模板中，navigator、plugins、mimeTypes、WebGL 扩展列表、
+screen 等分段大多完全相同。仓库把每份采集拆成若干分段，每个分段按内容
+哈希只存一份，每次采集只保存一个很小的清单（manifest）指向这些分段。
+
+目录结构:
+    <root>/objects/ab/<sha256>.json    分段内容（紧凑 JSON）
+    <root>/manifests/<id>.json         清单：原始文档，分段替换为 {"$ref": 哈希}
+    <root>/index.jsonl                 清单摘要，列出模板时只读这一个文件
+
+拆分规则:
+    - 顶层值为对象/数组的字段单独成段（objects 下的每个子对象再各自成段）
+    - 长度超过 LARGE_STRING 的字符串（如 canvas dataURL）单独成段
+    - 其余标量保留在清单中
+
+用法:
+    python template_store.py put templates/*.json --store templates/store
+    python template_store.py list --store templates/store
+    python template_store.py get <id> --store templates/store -o full.json
+    python template_store.py gc --store templates/store
+"""
+
+import os
+import sys
+import json
+import glob
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+
+# 这些顶层字段的子对象各自成段
+SPLIT_CONTAINERS = ('objects',)
+
+# 超过该长度的字符串单独成段
+LARGE_STRING = 256
+
+# 写入 index.jsonl 的摘要字段
+SUMMARY_FIELDS = ('browser', 'version', 'collectedAt', 'sourceUrl')
+
+
+def canonical_json(value):
+    """稳定的紧凑 JSON，用于计算内容哈希"""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def content_hash(value):
+    return hashlib.sha256(canonical_json(value).encode('utf-8')).hexdigest()
+
+
+def _is_section(value):
+    if isinstance(value, (dict, list)):
+        return len(value) > 0
+    return isinstance(value, str) and len(value) > LARGE_STRING
+
+
+class TemplateStore:
+    """内容寻址的模板仓库"""
+
+    def __init__(self, root='templates/store'):
+        self.root = Path(root)
+        self.objects_dir = self.root / 'objects'
+        self.manifests_dir = self.root / 'manifests'
+        self.index_path = self.root / 'index.jsonl'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 分段文本缓存按实例创建：装饰在方法上时缓存持有 self，各仓库也会共用同一份容量
+        self._load_object_text = lru_cache(maxsize=4096)(self._read_object_text)
+
+    # ---------- 分段 ----------
+
+    def _object_path(self, digest):
+        return self.objects_dir / digest[:2] / f'{digest}.json'
+
+    def _put_object(self, value):
+        """写入分段，已存在时直接复用，返回 (哈希, 是否新写入)"""
+        data = canonical_json(value)
+        digest = hashlib.sha256(data.encode('utf-8')).hexdigest()
+        path = self._object_path(digest)
+        if path.exists():
+            return digest, False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return digest, True
+
+    def _read_object_text(self, digest):
+        with open(self._object_path(digest), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def load_object(self, digest):
+        """读取分段内容（同一分段的文本在进程内缓存）"""
+        return json.loads(self._load_object_text(digest))
+
+    # ---------- 拆分与重建 ----------
+
+    def split(self, data):
+        """
+        把一份采集拆成清单文档和分段
+
+        Returns:
+            tuple: (document, sections)，document 中分段已替换为 {"$ref": 哈希}，
+                   sections 为 {哈希: 值}
+        """
+        sections = {}
+
+        def ref(value):
+            digest = content_hash(value)
+            sections[digest] = value
+            return {'$ref': digest}
+
+        document = {}
+        for key, value in data.items():
+            if key in SPLIT_CONTAINERS and isinstance(value, dict):
+                document[key] = {k: ref(v) if _is_section(v) else v for k, v in value.items()}
+            elif _is_section(value):
+                document[key] = ref(value)
+            else:
+                document[key] = value
+        return document, sections
+
+    def rebuild(self, document):
+        """把清单文档中的 {"$ref": 哈希} 还原为分段内容"""
+        def resolve(value):
+            if isinstance(value, dict) and len(value) == 1 and '$ref' in value:
+                return self.load_object(value['$ref'])
+            return value
+
+        data = {}
+        for key, value in document.items():
+            if key in SPLIT_CONTAINERS and isinstance(value, dict) and '$ref' not in value:
+                data[key] = {k: resolve(v) for k, v in value.items()}
+            else:
+                data[key] = resolve(value)
+        return data
+
+    # ---------- 模板 ----------
+
+    def put(self, data, name=None):
+        """
+        保存一份采集
+
+        Args:
+            data: 采集结果（任意三种采集器的输出）
+            name: 模板 ID，默认使用清单内容哈希（相同采集只存一份）
+
+        Returns:
+            str: 模板 ID
+        """
+        document, sections = self.split(data)
+        written = 0
+        for value in sections.values():
+            _, new = self._put_object(value)
+            written += new
+
+        template_id = name or content_hash(document)[:16]
+        manifest = {
+            'id': template_id,
+            'storedAt': datetime.utcnow().isoformat() + 'Z',
+            'document': document,
+        }
+        manifest_path = self.manifests_dir / f'{template_id}.json'
+        existed = manifest_path.exists()
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+
+        if not existed:
+            summary = {'id': template_id, 'sections': len(sections), 'newSections': written}
+            for field in SUMMARY_FIELDS:
+                if field in data:
+                    summary[field] = data[field]
+            with self._lock, open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+
+        return template_id
+
+    def manifest(self, template_id):
+        with open(self.manifests_dir / f'{template_id}.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def get(self, template_id):
+        """重建完整的采集文档"""
+        return self.rebuild(self.manifest(template_id)['document'])
+
+    def list(self):
+        """列出模板摘要（只读 index.jsonl，已删除的模板被跳过）"""
+        if not self.index_path.exists():
+            return []
+        items = {}
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    item = json.loads(line)
+                    items[item['id']] = item
+        return [item for item in items.values()
+                if (self.manifests_dir / f"{item['id']}.json").exists()]
+
+    def delete(self, template_id):
+        """删除清单（分段由 gc 回收）"""
+        try:
+            (self.manifests_dir / f'{template_id}.json').unlink()
+            return True
+        except OSError:
+            return False
+
+    def _referenced(self):
+        refs = set()
+
+        def collect(value):
+            if isinstance(value, dict):
+                if len(value) == 1 and '$ref' in value:
+                    refs.add(value['$ref'])
+                else:
+                    for v in value.values():
+                        collect(v)
+
+        for path in self.manifests_dir.glob('*.json'):
+            with open(path, 'r', encoding='utf-8') as f:
+                collect(json.load(f)['document'])
+        return refs
+
+    def gc(self):
+        """删除没有被任何清单引用的分段，并压缩 index.jsonl"""
+        refs = self._referenced()
+        removed = 0
+        for path in self.objects_dir.glob('*/*.json'):
+            if path.stem not in refs:
+                path.unlink()
+                removed += 1
+
+        items = self.list()
+        with self._lock, open(self.index_path, 'w', encoding='utf-8') as f:
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+        self._load_object_text.cache_clear()
+        return removed
+
+    def stats(self):
+        """仓库统计：模板数、分段数、实际占用与展开后大小"""
+        manifests = list(self.manifests_dir.glob('*.json'))
+        objects = list(self.objects_dir.glob('*/*.json'))
+        stored = sum(p.stat().st_size for p in manifests) + sum(p.stat().st_size for p in objects)
+        expanded = 0
+        for path in manifests:
+            expanded += len(canonical_json(self.get(path.stem)).encode('utf-8'))
+        return {
+            'templates': len(manifests),
+            'sections': len(objects),
+            'storedBytes': stored,
+            'expandedBytes': expanded,
+            'ratio': round(expanded / stored, 2) if stored else 0,
+        }
+
+
+def add_store_arguments(parser):
+    """为采集器命令行添加模板仓库参数"""
+    parser.add_argument('--store', help='同时写入内容寻址模板仓库目录（分段去重存储）')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='内容寻址的模板仓库')
+    parser.add_argument('--store', default='templates/store', help='仓库目录')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    put = sub.add_parser('put', help='导入 JSON 模板')
+    put.add_argument('files', nargs='+', help='JSON 文件（支持通配符）')
+
+    get = sub.add_parser('get', help='重建完整模板')
+    get.add_argument('id', help='模板 ID')
+    get.add_argument('--output', '-o', help='输出文件路径，默认打印')
+
+    sub.add_parser('list', help='列出模板')
+    sub.add_parser('gc', help='回收未引用的分段')
+    sub.add_parser('stats', help='仓库统计')
+
+    args = parser.parse_args()
+    store = TemplateStore(args.store)
+
+    if args.command == 'put':
+        paths = []
+        for pattern in args.files:
+            paths.extend(glob.glob(pattern) or [pattern])
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                template_id = store.put(json.load(f))
+            print(f"{template_id}  {path}")
+    elif args.command == 'get':
+        data = store.get(args.id)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            print(f"模板已重建到: {args.output}")
+        else:
+            print(json.dumps(data, indent=2, ensure_ascii=False))
+    elif args.command == 'list':
+        for item in store.list():
+            print(f"{item['id']}  {item.get('browser', '')} {item.get('version', '')}  {item.get('sourceUrl', '')}")
+    elif args.command == 'gc':
+        print(f"已回收 {store.gc()} 个分段")
+    elif args.command == 'stats':
+        print(json.dumps(store.stats(), indent=2))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
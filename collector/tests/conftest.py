@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 采集器以脚本方式运行，模块之间直接按文件名导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,47 @@
+import asyncio
+
+from async_collect import AsyncBrowserEnvCollector
+from fake_cdp import FakeCDPServer
+from probes import build_result, layout_probes
+
+
+def run_collect_many(urls, concurrency=8, latency=0.0, fail_urls=None):
+    async def main():
+        async with FakeCDPServer(latency=latency, fail_urls=fail_urls) as server:
+            async with AsyncBrowserEnvCollector(server.address, concurrency=concurrency) as collector:
+                results = await collector.collect_many(urls, timeout=5)
+            return results, server.stats
+    return asyncio.run(main())
+
+
+def test_result_shape():
+    results, stats = run_collect_many(['https://a.example/', 'https://b.example/'])
+
+    expected = set(build_result({name: None for name in layout_probes('template')}, 'x'))
+    assert [r['sourceUrl'] for r in results] == ['https://a.example/', 'https://b.example/']
+    for result in results:
+        assert 'error' not in result
+        assert expected <= set(result)
+        assert result['readiness']['strategy'] == 'load'
+        assert result['readiness']['ready'] is True
+        assert result['objects']['navigator']['userAgent']
+    assert stats['targets'] == 2
+
+
+def test_per_target_error():
+    urls = ['https://a.example/', 'https://down.example/', 'https://c.example/']
+    results, _ = run_collect_many(urls, fail_urls={'https://down.example/'})
+
+    assert results[1] == {'sourceUrl': 'https://down.example/', 'error': '导航失败: net::ERR_NAME_NOT_RESOLVED'}
+    assert 'error' not in results[0] and 'error' not in results[2]
+    assert results[2]['sourceUrl'] == 'https://c.example/'
+
+
+def test_concurrency_bound():
+    urls = [f'https://site{i}.example/' for i in range(12)]
+    results, stats = run_collect_many(urls, concurrency=3, latency=0.01)
+
+    assert len(results) == 12
+    assert all('error' not in r for r in results)
+    assert stats['targets'] == 12
+    assert stats['max_open_targets'] == 3
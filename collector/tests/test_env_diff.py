@@ -0,0 +1,36 @@
+import pytest
+
+from env_diff import diff, apply, content_hash, version_hash
+
+
+@pytest.mark.parametrize('old, new', [
+    ({'r': 1}, {'r': True}),
+    ({'r': 0}, {'r': False}),
+    ({'r': 1}, {'r': 1.0}),
+    ({'a': [1, {'b': 0}]}, {'a': [1, {'b': False}]}),
+])
+def test_diff_is_type_strict(old, new):
+    patch = diff(old, new)
+    assert patch['ops']
+    result = apply(old, patch)
+    assert content_hash(result) == patch['target']
+
+
+def test_diff_equal_documents():
+    doc = {'navigator': {'plugins': [1, 2.5, True, None]}, 'screen': {'width': 1920}}
+    assert diff(doc, {'navigator': {'plugins': [1, 2.5, True, None]}, 'screen': {'width': 1920}})['ops'] == []
+
+
+def test_chained_patches_with_ignore():
+    ignore = ['/collectedAt']
+    a = {'collectedAt': '2024-01-01', 'cookies': {'sid': '1'}, 'screen': {'width': 1920}}
+    b = {'collectedAt': '2024-01-02', 'cookies': {'sid': '2'}, 'screen': {'width': 1920}}
+    c = {'collectedAt': '2024-01-03', 'cookies': {'sid': '3'}, 'screen': {'width': 1280}}
+
+    p1, p2 = diff(a, b, ignore=ignore), diff(b, c, ignore=ignore)
+    step1 = apply(a, p1)
+    assert version_hash(step1, ignore) == p1['target'] == p2['base']
+    step2 = apply(step1, p2)
+    assert version_hash(step2, ignore) == p2['target']
+    assert step2['cookies'] == c['cookies'] and step2['screen'] == c['screen']
+    assert step2['collectedAt'] == a['collectedAt']
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段计时
+
+采集过程中按阶段记录 span（启动、导航、就绪等待、探针、序列化、保存），
+每个 span 包含墙钟时间、CPU 时间、CDP 消息数和字节数，
+结果写入采集结果的 __timings__ 分段，也可以导出为 Prometheus textfile
+或 JSON 指标文件，用于在大批量采集中找出慢网站和慢探针。
+
+说明:
+    - CPU 时间是当前线程的 CPU 时间（time.thread_time），批量模式下每个任务
+      运行在独立的工作线程中，互不干扰；DrissionPage 收包线程的开销不计入
+    - CDP 计数通过包装页面 driver 的 websocket 得到，包含收到的事件消息；
+      同一标签页上并发的其他操作也会计入
+    - 页面内单个探针的耗时由批量脚本回传（probe:<name>），没有 CPU / CDP 数据
+
+用法:
+    timings = Timings(page)
+    with timings.span('navigate'):
+        page.get(url)
+    data['__timings__'] = timings.to_dict()
+
+    metrics = MetricsCollector()
+    metrics.add(url, data['__timings__'])
+    metrics.write('metrics.prom')
+"""
+
+import json
+import time
+import threading
+from pathlib import Path
+from contextlib import contextmanager, nullcontext
+
+
+TIMINGS_KEY = '__timings__'
+
+PROMETHEUS_PREFIX = 'env_collector'
+
+
+class CountingSocket:
+    """包装 websocket 连接，统计收发的消息数和字节数"""
+
+    def __init__(self, ws):
+        self._ws = ws
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.bytes = 0
+
+    def _count(self, payload):
+        size = len(payload.encode('utf-8')) if isinstance(payload, str) else len(payload or b'')
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+
+    def send(self, payload, *args, **kwargs):
+        self._count(payload)
+        return self._ws.send(payload, *args, **kwargs)
+
+    def recv(self, *args, **kwargs):
+        payload = self._ws.recv(*args, **kwargs)
+        self._count(payload)
+        return payload
+
+    def snapshot(self):
+        return self.messages, self.bytes
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+
+class _StatsCounter:
+    """读取页面自带的 cdp_stats（FakeChromiumPage 等替身）"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def snapshot(self):
+        return self.stats.get('messages', 0), self.stats.get('bytes', 0)
+
+
+def cdp_counter(page):
+    """
+    为页面挂上 CDP 计数器（重复调用返回同一个计数器）
+
+    Args:
+        page: DrissionPage 页面/标签页，或带 cdp_stats 的替身
+
+    Returns:
+        带 snapshot() -> (messages, bytes) 的对象，无法计数时返回 None
+    """
+    stats = getattr(page, 'cdp_stats', None)
+    if isinstance(stats, dict):
+        return _StatsCounter(stats)
+
+    driver = getattr(page, '_driver', None)
+    ws = getattr(driver, '_ws', None)
+    if ws is None:
+        return None
+    if not isinstance(ws, CountingSocket):
+        ws = CountingSocket(ws)
+        driver._ws = ws
+    return ws
+
+
+class Timings:
+    """一次采集的 span 记录"""
+
+    def __init__(self, page=None):
+        """
+        Args:
+            page: 要统计 CDP 流量的页面，可以之后用 attach 指定
+        """
+        self.spans = []
+        self.started = time.perf_counter()
+        self.counter = None
+        if page is not None:
+            self.attach(page)
+
+    def attach(self, page):
+        """指定要统计 CDP 流量的页面（浏览器启动后才有 driver）"""
+        self.counter = cdp_counter(page)
+
+    def _cdp(self):
+        return self.counter.snapshot() if self.counter else (0, 0)
+
+    @contextmanager
+    def span(self, name):
+        """记录一个阶段，异常时也会记录（并标记 error）"""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        messages, size = self._cdp()
+        error = None
+        try:
+            yield self
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            end_messages, end_size = self._cdp()
+            self.record(name, (time.perf_counter() - wall) * 1000, (time.thread_time() - cpu) * 1000,
+                        end_messages - messages, end_size - size, error)
+
+    def record(self, name, wall_ms, cpu_ms=None, cdp_messages=None, cdp_bytes=None, error=None):
+        """直接追加一个 span（如页面内回传的探针耗时）"""
+        span = {'name': name, 'wallMs': round(wall_ms, 3)}
+        if cpu_ms is not None:
+            span['cpuMs'] = round(cpu_ms, 3)
+        if cdp_messages is not None:
+            span['cdpMessages'] = cdp_messages
+            span['cdpBytes'] = cdp_bytes
+        if error:
+            span['error'] = error
+        self.spans.append(span)
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: {totalMs, spans: [{name, wallMs, cpuMs, cdpMessages, cdpBytes}]}
+        """
+        return {
+            'totalMs': round((time.perf_counter() - self.started) * 1000, 3),
+            'spans': list(self.spans),
+        }
+
+
+class NullTimings:
+    """不计时时使用，接口与 Timings 相同"""
+
+    spans = ()
+
+    def attach(self, page):
+        pass
+
+    def span(self, name):
+        return nullcontext(self)
+
+    def record(self, *args, **kwargs):
+        pass
+
+    def to_dict(self):
+        return None
+
+
+NULL_TIMINGS = NullTimings()
+
+
+def make_timings(enabled, page=None):
+    """enabled 为真时返回 Timings，否则返回 NULL_TIMINGS"""
+    return Timings(page) if enabled else NULL_TIMINGS
+
+
+class MetricsCollector:
+    """汇总多次采集的 span，导出 Prometheus textfile 或 JSON"""
+
+    def __init__(self, keep_runs=True):
+        """
+        Args:
+            keep_runs: JSON 导出时是否保留每个 URL 的明细
+        """
+        self.keep_runs = keep_runs
+        self.aggregate = {}
+        self.runs = []
+        self._lock = threading.Lock()
+
+    def add(self, url, timings):
+        """
+        加入一次采集的 __timings__
+
+        Args:
+            url: 采集的 URL
+            timings: Timings.to_dict() 的结果（None 时忽略）
+        """
+        if not timings:
+            return
+        with self._lock:
+            for span in timings.get('spans', []):
+                entry = self.aggregate.setdefault(span['name'], {
+                    'count': 0, 'wallMs': 0.0, 'maxWallMs': 0.0, 'cpuMs': 0.0,
+                    'cdpMessages': 0, 'cdpBytes': 0, 'errors': 0,
+                })
+                entry['count'] += 1
+                entry['wallMs'] += span['wallMs']
+                entry['maxWallMs'] = max(entry['maxWallMs'], span['wallMs'])
+                entry['cpuMs'] += span.get('cpuMs', 0)
+                entry['cdpMessages'] += span.get('cdpMessages', 0)
+                entry['cdpBytes'] += span.get('cdpBytes', 0)
+                entry['errors'] += 1 if span.get('error') else 0
+            if self.keep_runs:
+                self.runs.append({'url': url, **timings})
+
+    def to_prometheus(self):
+        """
+        Returns:
+            str: Prometheus 文本格式（按 span 名称聚合，不带 URL 标签）
+        """
+        metrics = [
+            ('span_count', 'counter', 'Number of recorded spans', 'count', 1),
+            ('span_wall_seconds_total', 'counter', 'Wall time spent in span', 'wallMs', 1000),
+            ('span_wall_seconds_max', 'gauge', 'Slowest single span', 'maxWallMs', 1000),
+            ('span_cpu_seconds_total', 'counter', 'Thread CPU time spent in span', 'cpuMs', 1000),
+            ('span_cdp_messages_total', 'counter', 'CDP messages sent and received', 'cdpMessages', 1),
+            ('span_cdp_bytes_total', 'counter', 'CDP payload bytes sent and received', 'cdpBytes', 1),
+            ('span_errors_total', 'counter', 'Spans that raised', 'errors', 1),
+        ]
+        lines = []
+        for suffix, kind, help_text, field, scale in metrics:
+            name = f'{PROMETHEUS_PREFIX}_{suffix}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for span, entry in sorted(self.aggregate.items()):
+                value = entry[field] / scale
+                lines.append(f'{name}{{span={json.dumps(span)}}} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        result = {'aggregate': self.aggregate}
+        if self.keep_runs:
+            result['runs'] = self.runs
+        return result
+
+    def write(self, path):
+        """
+        写出指标文件：.prom 后缀为 Prometheus textfile，其他为 JSON
+
+        先写临时文件再替换，node_exporter 不会读到写了一半的文件。
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == '.prom':
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(text, encoding='utf-8')
+        tmp.replace(path)
+        return path
+
+
+def add_timing_arguments(parser):
+    """为采集器命令行添加计时参数"""
+    parser.add_argument('--timings', action='store_true',
+                        help='记录分阶段耗时（墙钟/CPU/CDP 消息数与字节数）到 __timings__')
+    parser.add_argument('--metrics-file',
+                        help='汇总耗时写到指标文件（.prom 为 Prometheus textfile，其他为 JSON），隐含 --timings')
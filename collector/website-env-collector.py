@@ -7,253 +7,109 @@
 用法:
     python website-env-collector.py --url https://example.com
     python website-env-collector.py --url https://example.com --output env.js --format js
+    python website-env-collector.py --urls urls.txt --output-dir envs --format js -c 4
+    python website-env-collector.py --url https://www.douyin.com --block heavy --allow-domains douyinstatic.com
 """
 
 import json
 import argparse
 from pathlib import Path
 
-try:
-    from DrissionPage import ChromiumPage, ChromiumOptions
-except ImportError:
-    print("❌ 请先安装 DrissionPage: pip install DrissionPage")
-    exit(1)
+from batch import add_batch_arguments, run_batch_cli
+from template_store import TemplateStore, add_store_arguments
+from jsonl_sink import add_sink_arguments, open_sink
+from codegen import generate_module, add_codegen_arguments, codegen_options
+from launch_profile import LaunchProfile, add_launch_arguments, launch_profile_from_args
+from readiness import navigate as navigate_and_wait, add_wait_arguments
+from resource_blocking import ResourceBlocker, add_blocking_arguments, blocking_rules_from_args
+from probes import (
+    build_batch_script, unpack_batch_result, layout_probes, assemble_layout,
+    describe_layout, add_sections_arguments, raw_blobs_path, save_raw_blobs
+)
 
 
-def collect_website_environment(url, headless=False):
-    """深度采集网站环境"""
+def collect_website_environment(url, headless=False, page=None, timeout=None,
+                                wait='networkidle', wait_timeout=10, raw_blobs=False,
+                                sections=None, launch=None, blocking=None):
+    """
+    深度采集网站环境
     
-    print(f"🚀 启动浏览器并访问: {url}")
+    Args:
+        url: 要采集的网站URL
+        headless: 是否无头模式
+        page: 外部提供的页面/标签页（如 BrowserPool 借出的标签页），
+              提供时复用该页面，不再启动和关闭浏览器
+        timeout: 页面加载超时时间（秒），默认使用 DrissionPage 配置
+        wait: 页面就绪策略（见 readiness.py）
+        wait_timeout: 就绪等待的硬性截止时间（秒）
+        raw_blobs: 同时回传 canvas dataURL 和音频采样（由 save_raw_blobs 写到旁路文件），
+                   默认只回传页面内计算的摘要
+        sections: 只采集指定分段（见 probes.LAYOUTS['website']），None 表示全部
+        launch: LaunchProfile（见 launch_profile.py），默认按 headless 使用默认启动参数
+        blocking: BlockRules（见 resource_blocking.py），导航期间拦截图片、字体等资源，
+                  拦截记录写入结果的 blocking 字段
+    """
     
-    # 配置浏览器
-    co = ChromiumOptions()
-    if headless:
-        co.headless()
+    owns_page = page is None
     
-    page = ChromiumPage(co)
+    if owns_page:
+        print(f"🚀 启动浏览器并访问: {url}")
+        
+        # 按启动配置启动浏览器
+        launch = launch or LaunchProfile(headless=headless)
+        page = launch.launch()
+        print(f"⏱️ 浏览器启动: {launch.describe()}")
+    else:
+        print(f"🌐 访问: {url}")
+    
+    blocker = ResourceBlocker(page, blocking) if blocking else None
     
     try:
-        # 访问页面
-        page.get(url)
-        
-        # 等待页面加载
-        import time
-        time.sleep(2)
+        # 访问页面并按策略等待就绪（按规则拦截不需要的资源）
+        if blocker:
+            blocker.start()
+        readiness = navigate_and_wait(page, url, wait, wait_timeout, timeout)
+        if readiness['timedOut']:
+            print(f"⚠️  等待就绪超时 ({wait}, {wait_timeout}s)，继续采集")
         
         print("🔍 采集网站环境...")
         
-        # 深度采集脚本
-        collect_script = """
-        return {
-            // ========== Location 对象 ==========
-            location: {
-                href: location.href,
-                protocol: location.protocol,
-                host: location.host,
-                hostname: location.hostname,
-                port: location.port,
-                pathname: location.pathname,
-                search: location.search,
-                hash: location.hash,
-                origin: location.origin
-            },
-            
-            // ========== Navigator 对象（完整） ==========
-            navigator: {
-                userAgent: navigator.userAgent,
-                vendor: navigator.vendor,
-                vendorSub: navigator.vendorSub,
-                platform: navigator.platform,
-                language: navigator.language,
-                languages: Array.from(navigator.languages || []),
-                hardwareConcurrency: navigator.hardwareConcurrency,
-                deviceMemory: navigator.deviceMemory,
-                maxTouchPoints: navigator.maxTouchPoints,
-                webdriver: navigator.webdriver,
-                cookieEnabled: navigator.cookieEnabled,
-                doNotTrack: navigator.doNotTrack,
-                appCodeName: navigator.appCodeName,
-                appName: navigator.appName,
-                appVersion: navigator.appVersion,
-                product: navigator.product,
-                productSub: navigator.productSub,
-                onLine: navigator.onLine,
-                pdfViewerEnabled: navigator.pdfViewerEnabled,
-                plugins: Array.from(navigator.plugins || []).map(p => ({
-                    name: p.name,
-                    description: p.description,
-                    filename: p.filename,
-                    length: p.length
-                })),
-                mimeTypes: Array.from(navigator.mimeTypes || []).map(m => ({
-                    type: m.type,
-                    description: m.description,
-                    suffixes: m.suffixes
-                }))
-            },
-            
-            // ========== Screen 对象 ==========
-            screen: {
-                width: screen.width,
-                height: screen.height,
-                availWidth: screen.availWidth,
-                availHeight: screen.availHeight,
-                colorDepth: screen.colorDepth,
-                pixelDepth: screen.pixelDepth,
-                orientation: screen.orientation ? {
-                    type: screen.orientation.type,
-                    angle: screen.orientation.angle
-                } : null
-            },
-            
-            // ========== Window 对象 ==========
-            window: {
-                innerWidth: window.innerWidth,
-                innerHeight: window.innerHeight,
-                outerWidth: window.outerWidth,
-                outerHeight: window.outerHeight,
-                devicePixelRatio: window.devicePixelRatio,
-                screenX: window.screenX,
-                screenY: window.screenY,
-                screenLeft: window.screenLeft,
-                screenTop: window.screenTop,
-                scrollX: window.scrollX,
-                scrollY: window.scrollY,
-                name: window.name,
-                closed: window.closed,
-                isSecureContext: window.isSecureContext
-            },
-            
-            // ========== Document 对象 ==========
-            document: {
-                URL: document.URL,
-                documentURI: document.documentURI,
-                domain: document.domain,
-                referrer: document.referrer,
-                title: document.title,
-                characterSet: document.characterSet,
-                charset: document.charset,
-                contentType: document.contentType,
-                readyState: document.readyState,
-                hidden: document.hidden,
-                visibilityState: document.visibilityState,
-                cookie: document.cookie
-            },
-            
-            // ========== 时区信息 ==========
-            timezone: {
-                offset: new Date().getTimezoneOffset(),
-                timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
-                locale: Intl.DateTimeFormat().resolvedOptions().locale
-            },
-            
-            // ========== Performance ==========
-            performance: {
-                timeOrigin: performance.timeOrigin,
-                timing: {
-                    navigationStart: performance.timing.navigationStart,
-                    loadEventEnd: performance.timing.loadEventEnd,
-                    domComplete: performance.timing.domComplete
-                }
-            },
-            
-            // ========== WebGL 指纹 ==========
-            webgl: (() => {
-                try {
-                    const canvas = document.createElement('canvas');
-                    const gl = canvas.getContext('webgl') || canvas.getContext('experimental-webgl');
-                    if (!gl) return null;
-                    
-                    const debugInfo = gl.getExtension('WEBGL_debug_renderer_info');
-                    return {
-                        vendor: gl.getParameter(gl.VENDOR),
-                        renderer: gl.getParameter(gl.RENDERER),
-                        version: gl.getParameter(gl.VERSION),
-                        shadingLanguageVersion: gl.getParameter(gl.SHADING_LANGUAGE_VERSION),
-                        unmaskedVendor: debugInfo ? gl.getParameter(debugInfo.UNMASKED_VENDOR_WEBGL) : null,
-                        unmaskedRenderer: debugInfo ? gl.getParameter(debugInfo.UNMASKED_RENDERER_WEBGL) : null,
-                        extensions: gl.getSupportedExtensions()
-                    };
-                } catch (e) {
-                    return { error: e.message };
-                }
-            })(),
-            
-            // ========== Canvas 指纹 ==========
-            canvas: (() => {
-                try {
-                    const canvas = document.createElement('canvas');
-                    canvas.width = 200;
-                    canvas.height = 50;
-                    const ctx = canvas.getContext('2d');
-                    ctx.textBaseline = 'top';
-                    ctx.font = '14px Arial';
-                    ctx.fillStyle = '#f60';
-                    ctx.fillRect(125, 1, 62, 20);
-                    ctx.fillStyle = '#069';
-                    ctx.fillText('Hello, World! 你好', 2, 15);
-                    ctx.fillStyle = 'rgba(102, 204, 0, 0.7)';
-                    ctx.fillText('Hello, World! 你好', 4, 17);
-                    return canvas.toDataURL();
-                } catch (e) {
-                    return { error: e.message };
-                }
-            })(),
-            
-            // ========== Audio 指纹 ==========
-            audio: (() => {
-                try {
-                    const AudioContext = window.AudioContext || window.webkitAudioContext;
-                    if (!AudioContext) return null;
-                    const context = new AudioContext();
-                    return {
-                        sampleRate: context.sampleRate,
-                        state: context.state,
-                        maxChannelCount: context.destination.maxChannelCount,
-                        numberOfInputs: context.destination.numberOfInputs,
-                        numberOfOutputs: context.destination.numberOfOutputs,
-                        channelCount: context.destination.channelCount
-                    };
-                } catch (e) {
-                    return { error: e.message };
-                }
-            })(),
-            
-            // ========== 特征检测 ==========
-            features: {
-                localStorage: typeof localStorage !== 'undefined',
-                sessionStorage: typeof sessionStorage !== 'undefined',
-                indexedDB: typeof indexedDB !== 'undefined',
-                webWorker: typeof Worker !== 'undefined',
-                serviceWorker: 'serviceWorker' in navigator,
-                webRTC: typeof RTCPeerConnection !== 'undefined' || typeof webkitRTCPeerConnection !== 'undefined',
-                webSocket: typeof WebSocket !== 'undefined',
-                geolocation: 'geolocation' in navigator,
-                notification: 'Notification' in window,
-                permissions: 'permissions' in navigator,
-                bluetooth: 'bluetooth' in navigator,
-                usb: 'usb' in navigator,
-                credentials: 'credentials' in navigator
-            },
-            
-            // ========== Cookies ==========
-            cookies: document.cookie
-        };
-        """
-        
-        # 执行采集
-        env_data = page.run_js(collect_script)
+        # 按分段执行注册表中的探针（合并为一次 run_js）
+        names = layout_probes('website', sections, raw_blobs)
+        values, errors = unpack_batch_result(page.run_js(build_batch_script(names)), names)
+        for name, error in errors.items():
+            print(f"⚠️  探针 {name} 失败: {error}")
+        env_data = assemble_layout('website', values, errors, sections)
+        env_data['readiness'] = readiness
+        if blocker:
+            blocker.stop()
+            env_data['blocking'] = blocker.summary()
+            print(f"🚫 已拦截 {env_data['blocking']['blocked']} 个请求")
         
         print("✅ 环境采集完成！")
         return env_data
         
     finally:
-        page.quit()
-        print("🔚 浏览器已关闭")
+        if blocker:
+            blocker.stop()
+        if owns_page:
+            launch.quit(page)
+            print("🔚 浏览器已关闭")
 
 
-def generate_js_code(env_data, url):
-    """生成 JS 环境代码"""
+def generate_js_code(env_data, url, compact=False, target_script=None, keep=()):
+    """
+    生成 JS 环境代码
+    
+    Args:
+        env_data: 采集的环境数据
+        url: 来源URL
+        compact: 生成压缩的惰性环境模块（见 codegen.py）
+        target_script: 目标脚本源码，提供时按其中出现的名称裁剪分段（仅 compact）
+        keep: 裁剪时总是保留的分段/属性名
+    """
+    if compact:
+        return generate_module(env_data, 'website', target_script, keep)
     
     code = f'''/**
  * 网站环境代码 - 自动采集生成
@@ -263,16 +119,16 @@ def generate_js_code(env_data, url):
 
 (function() {{
     // ========== Location 对象 ==========
-    const location = {json.dumps(env_data['location'], indent=4, ensure_ascii=False)};
+    const location = {json.dumps(env_data.get('location') or {}, indent=4, ensure_ascii=False)};
     
     // ========== Navigator 对象 ==========
-    const navigator = {json.dumps(env_data['navigator'], indent=4, ensure_ascii=False)};
+    const navigator = {json.dumps(env_data.get('navigator') or {}, indent=4, ensure_ascii=False)};
     
     // ========== Screen 对象 ==========
-    const screen = {json.dumps(env_data['screen'], indent=4, ensure_ascii=False)};
+    const screen = {json.dumps(env_data.get('screen') or {}, indent=4, ensure_ascii=False)};
     
     // ========== Document 对象（部分属性） ==========
-    const documentProps = {json.dumps(env_data['document'], indent=4, ensure_ascii=False)};
+    const documentProps = {json.dumps(env_data.get('document') or {}, indent=4, ensure_ascii=False)};
     
     // 注入到 window
     Object.assign(window, {{
@@ -299,34 +155,107 @@ def import_datetime():
     return datetime.now().isoformat()
 
 
+def write_env_file(env_data, output_path, url, fmt='json', pretty=False, codegen=None):
+    """按指定格式写出采集结果，codegen 为传给 generate_js_code 的选项"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    if fmt == 'js':
+        # 生成 JS 代码
+        js_code = generate_js_code(env_data, url, **(codegen or {}))
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(js_code)
+    else:
+        # 输出 JSON
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(env_data, f, indent=2 if pretty else None, ensure_ascii=False)
+
+
+def run_batch_mode(args, blocking=None):
+    """批量模式：共享浏览器、多标签页并发采集 URL 列表"""
+    
+    def collect_one(page, url, timeout):
+        return collect_website_environment(url, page=page, timeout=timeout,
+                                           wait=args.wait, wait_timeout=args.wait_timeout,
+                                           raw_blobs=args.raw_blobs, sections=args.sections,
+                                           blocking=blocking)
+    
+    store = TemplateStore(args.store) if args.store else None
+    codegen = codegen_options(args)
+    
+    def write_one(env_data, path, url):
+        if path is not None:
+            write_env_file(env_data, path, url, args.format, args.pretty, codegen)
+        if store:
+            store.put(env_data)
+    
+    return run_batch_cli(args, collect_one, write_one, headless=args.headless,
+                         suffix='.js' if args.format == 'js' else '.json', sink_prefix='website')
+
+
 def main():
     parser = argparse.ArgumentParser(description='网站环境深度采集器')
-    parser.add_argument('--url', required=True, help='要采集的网站URL')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='要采集的网站URL')
     parser.add_argument('--output', '-o', help='输出文件路径')
     parser.add_argument('--format', choices=['json', 'js'], default='json', help='输出格式')
     parser.add_argument('--headless', action='store_true', help='无头模式运行')
     parser.add_argument('--pretty', action='store_true', help='格式化输出')
+    parser.add_argument('--raw-blobs', action='store_true',
+                        help='同时保存 canvas dataURL 和音频采样到 .raw.json 旁路文件（默认只保存摘要）')
+    add_sections_arguments(parser, 'website')
+    add_codegen_arguments(parser)
+    add_store_arguments(parser)
+    add_sink_arguments(parser)
+    add_launch_arguments(parser)
+    add_blocking_arguments(parser)
+    add_wait_arguments(parser, default='networkidle')
+    add_batch_arguments(parser, urls_group=target)
     
     args = parser.parse_args()
     
+    if args.list_sections:
+        print('\n'.join(describe_layout('website')))
+        return 0
+    if not args.url and not args.urls:
+        parser.error('需要 --url 或 --urls')
+    
+    try:
+        layout_probes('website', args.sections)
+        blocking = blocking_rules_from_args(args)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    
+    if args.urls:
+        return run_batch_mode(args, blocking)
+    
     try:
         # 采集环境
-        env_data = collect_website_environment(args.url, args.headless)
+        env_data = collect_website_environment(args.url, args.headless,
+                                               wait=args.wait, wait_timeout=args.wait_timeout,
+                                               raw_blobs=args.raw_blobs, sections=args.sections,
+                                               launch=launch_profile_from_args(args, headless=args.headless),
+                                               blocking=blocking)
+        
+        raw_path = save_raw_blobs(env_data, raw_blobs_path(args.output or 'website_env.json'))
+        if raw_path:
+            print(f"🧾 原始数据已保存到: {raw_path}")
+        
+        if args.store:
+            template_id = TemplateStore(args.store).put(env_data)
+            print(f"📦 已写入模板仓库: {args.store} (ID: {template_id})")
+        
+        if args.sink:
+            with open_sink(args, prefix='website') as sink:
+                path, _ = sink.write(env_data)
+            print(f"🗂️ 已追加到 JSONL 分片: {path}")
         
         # 输出结果
         if args.output:
             output_path = Path(args.output)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            if args.format == 'js':
-                # 生成 JS 代码
-                js_code = generate_js_code(env_data, args.url)
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(js_code)
-            else:
-                # 输出 JSON
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(env_data, f, indent=2 if args.pretty else None, ensure_ascii=False)
+            write_env_file(env_data, output_path, args.url, args.format, args.pretty,
+                           codegen_options(args))
             
             print(f"\n📁 环境已保存到: {output_path}")
             print(f"📊 文件大小: {output_path.stat().st_size} bytes")
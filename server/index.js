@@ -7,6 +7,7 @@
  * - /api/ai/*      - AI补环境
  * - /api/snapshot/*- 快照管理
  * - /api/log/*     - 日志管理
+ * - /api/collector/* - 常驻采集服务（collector/serve.py）
  */
 
 import express from 'express';
@@ -21,6 +22,7 @@ import aiRouter, { setSandboxGetter as setAISandboxGetter } from './routes/ai.js
 import snapshotRouter, { setSandboxGetter } from './routes/snapshot.js';
 import logRouter from './routes/log.js';
 import mockRouter from './routes/mock.js';
+import collectorRouter from './routes/collector.js';
 
 // 沙箱管理
 import { SimpleSandbox } from './sandbox/SimpleSandbox.js';
@@ -45,6 +47,7 @@ app.use('/api/ai', aiRouter);
 app.use('/api/snapshot', snapshotRouter);
 app.use('/api/log', logRouter);
 app.use('/api/mock', mockRouter);
+app.use('/api/collector', collectorRouter);
 
 // 全局沙箱实例
 let globalSandbox = null;
@@ -80,7 +83,9 @@ app.get('/api', (req, res) => {
                 'GET /api/env/list': '获取环境代码目录结构',
                 'GET /api/env/file?path=': '读取指定环境文件',
                 'POST /api/env/file': '写入/更新环境文件',
-                'DELETE /api/env/file?path=': '删除AI生成的文件'
+                'DELETE /api/env/file?path=': '删除AI生成的文件',
+                'GET /api/env/templates': '列出模板仓库中的采集模板',
+                'GET /api/env/templates/:id': '重建模板仓库中的完整模板'
             },
             sandbox: {
                 'POST /api/sandbox/run': '执行JS代码',
@@ -124,6 +129,13 @@ app.get('/api', (req, res) => {
                 'GET /api/mock/presets': '获取预设模板',
                 'POST /api/mock/presets/:name/apply': '应用预设模板',
                 'GET /api/mock/inject-code': '生成注入代码'
+            },
+            collector: {
+                'GET /api/collector/health': '采集服务状态',
+                'POST /api/collector/collect': '同步采集（需先运行 collector/serve.py）',
+                'POST /api/collector/jobs': '异步提交采集',
+                'GET /api/collector/jobs/:id': '查询采集任务',
+                'DELETE /api/collector/jobs/:id': '取消采集任务'
             }
         }
     });
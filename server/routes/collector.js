@@ -0,0 +1,154 @@
+/**
+ * 采集服务路由 - 转发到常驻采集服务（collector/serve.py）
+ *
+ * 采集服务常驻预热的浏览器，刷新一次环境只需一次标签页采集，
+ * 不必每次新起 Python 进程、冷启动浏览器。
+ *
+ * 地址配置:
+ *   COLLECTOR_SOCKET=/tmp/env-collector.sock   Unix socket（优先）
+ *   COLLECTOR_URL=http://127.0.0.1:8765        HTTP 地址（默认）
+ */
+
+import express from 'express';
+import http from 'http';
+import crypto from 'crypto';
+
+const COLLECTOR_SOCKET = process.env.COLLECTOR_SOCKET || null;
+const COLLECTOR_URL = new URL(process.env.COLLECTOR_URL || 'http://127.0.0.1:8765');
+
+// 在采集截止时间之外再多等的时间（毫秒）
+const DEADLINE_GRACE_MS = 5000;
+const DEFAULT_DEADLINE = 60;
+
+const router = express.Router();
+
+/**
+ * 向采集服务发请求
+ *
+ * @returns {Promise<{ status: number, headers: object, body: object }>}
+ */
+function callCollector(method, path, body, timeoutMs = 10000) {
+    return new Promise((resolve, reject) => {
+        const payload = body === undefined ? null : Buffer.from(JSON.stringify(body));
+        const options = {
+            method,
+            path,
+            headers: { 'Content-Type': 'application/json' },
+            timeout: timeoutMs
+        };
+        if (payload) options.headers['Content-Length'] = payload.length;
+        if (COLLECTOR_SOCKET) {
+            options.socketPath = COLLECTOR_SOCKET;
+        } else {
+            options.hostname = COLLECTOR_URL.hostname;
+            options.port = COLLECTOR_URL.port || 80;
+        }
+
+        const request = http.request(options, (response) => {
+            const chunks = [];
+            response.on('data', chunk => chunks.push(chunk));
+            response.on('end', () => {
+                try {
+                    const text = Buffer.concat(chunks).toString('utf-8');
+                    resolve({ status: response.statusCode, headers: response.headers, body: text ? JSON.parse(text) : {} });
+                } catch (e) {
+                    reject(e);
+                }
+            });
+        });
+        request.on('timeout', () => request.destroy(new Error('collector request timed out')));
+        request.on('error', reject);
+        if (payload) request.write(payload);
+        request.end();
+    });
+}
+
+function sendUnavailable(res, error) {
+    res.status(502).json({
+        success: false,
+        error: `采集服务不可用: ${error.message}（先运行 python collector/serve.py）`
+    });
+}
+
+function forward(res, result) {
+    if (result.headers['retry-after']) {
+        res.set('Retry-After', result.headers['retry-after']);
+    }
+    res.status(result.status).json(result.body);
+}
+
+/**
+ * 采集服务状态
+ * GET /collector/health
+ */
+router.get('/health', async (req, res) => {
+    try {
+        forward(res, await callCollector('GET', '/health'));
+    } catch (error) {
+        sendUnavailable(res, error);
+    }
+});
+
+/**
+ * 同步采集，客户端断开时取消任务
+ * POST /collector/collect
+ * Body: { kind: 'website', url: 'https://...', deadline: 30, format: 'js', block: 'heavy', ... }
+ */
+router.post('/collect', async (req, res) => {
+    const body = { ...req.body, id: req.body.id || crypto.randomUUID() };
+    const deadline = Number(body.deadline) || DEFAULT_DEADLINE;
+
+    let finished = false;
+    res.on('close', () => {
+        if (!finished) {
+            callCollector('DELETE', `/jobs/${encodeURIComponent(body.id)}`).catch(() => {});
+        }
+    });
+
+    try {
+        const result = await callCollector('POST', '/collect', body, deadline * 1000 + DEADLINE_GRACE_MS);
+        finished = true;
+        forward(res, result);
+    } catch (error) {
+        finished = true;
+        sendUnavailable(res, error);
+    }
+});
+
+/**
+ * 异步提交
+ * POST /collector/jobs
+ */
+router.post('/jobs', async (req, res) => {
+    try {
+        forward(res, await callCollector('POST', '/jobs', req.body));
+    } catch (error) {
+        sendUnavailable(res, error);
+    }
+});
+
+/**
+ * 查询任务
+ * GET /collector/jobs/:id
+ */
+router.get('/jobs/:id', async (req, res) => {
+    try {
+        forward(res, await callCollector('GET', `/jobs/${encodeURIComponent(req.params.id)}`));
+    } catch (error) {
+        sendUnavailable(res, error);
+    }
+});
+
+/**
+ * 取消任务
+ * DELETE /collector/jobs/:id
+ */
+router.delete('/jobs/:id', async (req, res) => {
+    try {
+        forward(res, await callCollector('DELETE', `/jobs/${encodeURIComponent(req.params.id)}`));
+    } catch (error) {
+        sendUnavailable(res, error);
+    }
+});
+
+export default router;
@@ -9,6 +9,8 @@ import { fileURLToPath } from 'url';
 
 const __dirname = path.dirname(fileURLToPath(import.meta.url));
 const ENV_DIR = path.join(__dirname, '../../env');
+// 采集器内容寻址模板仓库（collector/template_store.py）
+const TEMPLATE_STORE_DIR = process.env.TEMPLATE_STORE || path.join(__dirname, '../../templates/store');
 
 const router = express.Router();
 
@@ -191,6 +193,112 @@ router.delete('/file', (req, res) => {
     }
 });
 
+/**
+ * 列出模板仓库中的采集模板（只读 index.jsonl，不扫描目录）
+ * GET /env/templates
+ */
+router.get('/templates', (req, res) => {
+    const indexPath = path.join(TEMPLATE_STORE_DIR, 'index.jsonl');
+
+    if (!fs.existsSync(indexPath)) {
+        return res.json({
+            success: true,
+            data: [],
+            total: 0
+        });
+    }
+
+    try {
+        const items = new Map();
+        const lines = fs.readFileSync(indexPath, 'utf-8').split('\n');
+        for (const line of lines) {
+            if (!line.trim()) continue;
+            const item = JSON.parse(line);
+            items.set(item.id, item);
+        }
+
+        const data = [...items.values()].filter(item =>
+            fs.existsSync(path.join(TEMPLATE_STORE_DIR, 'manifests', `${item.id}.json`))
+        );
+
+        res.json({
+            success: true,
+            data,
+            total: data.length
+        });
+    } catch (error) {
+        res.status(500).json({
+            success: false,
+            error: error.message
+        });
+    }
+});
+
+/**
+ * 读取并重建模板仓库中的完整模板
+ * GET /env/templates/:id
+ */
+router.get('/templates/:id', (req, res) => {
+    const id = req.params.id;
+
+    // 安全检查：模板 ID 只允许字母数字和 - _ .
+    if (!/^[\w.-]+$/.test(id) || id.includes('..')) {
+        return res.status(400).json({
+            success: false,
+            error: 'Invalid template id'
+        });
+    }
+
+    const manifestPath = path.join(TEMPLATE_STORE_DIR, 'manifests', `${id}.json`);
+    if (!fs.existsSync(manifestPath)) {
+        return res.status(404).json({
+            success: false,
+            error: 'Template not found'
+        });
+    }
+
+    try {
+        const manifest = JSON.parse(fs.readFileSync(manifestPath, 'utf-8'));
+        res.json({
+            success: true,
+            data: rebuildTemplate(manifest.document)
+        });
+    } catch (error) {
+        res.status(500).json({
+            success: false,
+            error: error.message
+        });
+    }
+});
+
+/**
+ * 把清单中的 {"$ref": hash} 还原为分段内容
+ */
+function rebuildTemplate(document) {
+    const resolve = (value) => {
+        if (value && typeof value === 'object' && !Array.isArray(value)
+            && Object.keys(value).length === 1 && typeof value.$ref === 'string') {
+            const hash = value.$ref;
+            const objectPath = path.join(TEMPLATE_STORE_DIR, 'objects', hash.slice(0, 2), `${hash}.json`);
+            return JSON.parse(fs.readFileSync(objectPath, 'utf-8'));
+        }
+        return value;
+    };
+
+    const data = {};
+    for (const [key, value] of Object.entries(document)) {
+        if (key === 'objects' && value && typeof value === 'object' && !('$ref' in value)) {
+            data[key] = {};
+            for (const [subKey, subValue] of Object.entries(value)) {
+                data[key][subKey] = resolve(subValue);
+            }
+        } else {
+            data[key] = resolve(value);
+        }
+    }
+    return data;
+}
+
 /**
  * 获取目录结构
  */
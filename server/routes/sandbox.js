@@ -326,14 +326,21 @@ router.post('/logs/clear', async (req, res) => {
 /**
  * 注入环境数据
  * POST /sandbox/inject-env
- * Body: { code: '...', data: {...} }
+ * Body: { code: '...', data: {...}, version: '<hash>' }
+ *       { patch: {...}, force: false }  增量补丁（collector/env_diff.py diff）
  */
 router.post('/inject-env', async (req, res) => {
-    const { code, data } = req.body;
+    const { code, data, version, patch, force = false } = req.body;
     
     try {
         const sandbox = await getSandbox();
-        const result = sandbox.injectEnvironment(code || data);
+        
+        if (patch) {
+            const result = sandbox.applyEnvPatch(patch, { force });
+            return res.status(result.conflict ? 409 : 200).json(result);
+        }
+        
+        const result = sandbox.injectEnvironment(code || data, version || null);
         
         res.json({
             success: result.success,
@@ -6,6 +6,7 @@
 import vm from 'vm';
 import fs from 'fs';
 import path from 'path';
+import { applyEnvPatch } from './envPatch.js';
 
 export class SimpleSandbox {
     constructor() {
@@ -13,6 +14,8 @@ export class SimpleSandbox {
         this.undefinedPaths = [];
         this.accessLogs = [];
         this.callLogs = [];
+        // 当前环境的内容哈希（collector/env_diff.py hash），用于校验补丁的 base
+        this.envVersion = null;
     }
 
     /**
@@ -207,7 +210,7 @@ export class SimpleSandbox {
     /**
      * 注入环境对象（从文件或对象）
      */
-    injectEnvironment(envData) {
+    injectEnvironment(envData, version = null) {
         try {
             if (typeof envData === 'string') {
                 // 如果是文件路径
@@ -222,6 +225,7 @@ export class SimpleSandbox {
                 // 如果是对象，直接注入到上下文
                 Object.assign(this.context.window, envData);
             }
+            this.envVersion = version;
             return { success: true };
         } catch (e) {
             console.error('[SimpleSandbox] 注入环境失败:', e.message);
@@ -229,6 +233,30 @@ export class SimpleSandbox {
         }
     }
 
+    /**
+     * 增量应用环境补丁（collector/env_diff.py 生成），不重置沙箱
+     *
+     * 已知当前环境版本时校验补丁的 base，不一致时拒绝（force 跳过校验）
+     */
+    applyEnvPatch(patch, { force = false } = {}) {
+        if (!force && this.envVersion && patch && patch.base && patch.base !== this.envVersion) {
+            return {
+                success: false,
+                error: `Patch base ${patch.base.slice(0, 12)} does not match env version ${this.envVersion.slice(0, 12)}`,
+                conflict: true
+            };
+        }
+
+        try {
+            const result = applyEnvPatch(this.context.window, patch);
+            this.envVersion = patch.target || null;
+            return { success: result.failed.length === 0, ...result, version: this.envVersion };
+        } catch (e) {
+            console.error('[SimpleSandbox] 应用环境补丁失败:', e.message);
+            return { success: false, error: e.message };
+        }
+    }
+
     /**
      * 序列化结果
      */
@@ -255,6 +283,7 @@ export class SimpleSandbox {
     reset() {
         this.vm = null;
         this.undefinedPaths = [];
+        this.envVersion = null;
         this.init();
     }
 
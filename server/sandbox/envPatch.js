@@ -0,0 +1,113 @@
+/**
+ * 环境补丁 - 在已加载的环境上增量应用 collector/env_diff.py 生成的补丁
+ *
+ * 补丁格式: { format: 'env-patch/1', base, target, ops: [[op, pointer, value?], ...] }
+ *   op: 'r' 替换 / 'a' 新增 / 'd' 删除，pointer 为 JSON Pointer
+ *
+ * 路径映射到沙箱全局对象（window）:
+ *   /objects/navigator/...   -> window.navigator...（collect.py 模板结构）
+ *   /window/innerWidth       -> window.innerWidth（window 分段直接挂在 window 上）
+ *   /navigator/userAgent     -> window.navigator.userAgent（网站 / 指纹采集结构）
+ *   /plugins/...             -> window.navigator.plugins...（collect.py 模板的 plugins 在顶层，同 schema.from_template）
+ *   /cookies                 -> window.document.cookie
+ *   采集元信息（collectedAt、readiness、blocking、__timings__ 等，以及统一结构的 schema / source / meta）和指纹摘要（webgl、canvas 等）
+ *   不对应环境对象，跳过
+ */
+
+export const PATCH_FORMAT = 'env-patch/1';
+
+// 不对应沙箱环境对象的顶层字段
+const METADATA_KEYS = new Set([
+    'schema', 'source', 'meta', 'layout', 'browser', 'version', 'collectedAt', 'sourceUrl', 'sections', 'errors', 'readiness',
+    'cache', 'profile', 'blocking', 'rawBlobs', 'deepGraph', '__timings__', '__rawBlobs__',
+    'webgl', 'canvas', 'audioContext', 'audio', 'features', 'timezone'
+]);
+
+function unescapeToken(token) {
+    return token.replace(/~1/g, '/').replace(/~0/g, '~');
+}
+
+/**
+ * 把补丁路径映射为沙箱全局对象上的属性路径，返回 null 表示跳过
+ */
+export function mapPointer(pointer) {
+    if (!pointer.startsWith('/')) return null;
+    const tokens = pointer.slice(1).split('/').map(unescapeToken);
+    if (tokens[0] === 'objects' || tokens[0] === 'window') {
+        tokens.shift();
+    } else if (tokens[0] === 'plugins') {
+        return ['navigator', ...tokens];
+    } else if (tokens[0] === 'cookies' && tokens.length === 1) {
+        return ['document', 'cookie'];
+    } else if (METADATA_KEYS.has(tokens[0])) {
+        return null;
+    }
+    return tokens.length ? tokens : null;
+}
+
+function clone(value) {
+    return value === undefined ? undefined : JSON.parse(JSON.stringify(value));
+}
+
+/**
+ * 在 root（沙箱 window）上应用补丁
+ *
+ * @param {object} root - 沙箱全局对象
+ * @param {object} patch - env_diff.py 生成的补丁
+ * @returns {{ applied: number, skipped: number, failed: Array }}
+ */
+export function applyEnvPatch(root, patch) {
+    if (!patch || patch.format !== PATCH_FORMAT) {
+        throw new Error(`Unsupported patch format: ${patch && patch.format}`);
+    }
+
+    let applied = 0;
+    let skipped = 0;
+    const failed = [];
+
+    for (const [op, pointer, value] of patch.ops || []) {
+        const tokens = mapPointer(pointer);
+        if (!tokens) {
+            skipped++;
+            continue;
+        }
+
+        try {
+            const key = tokens[tokens.length - 1];
+            // '-' 只表示在数组末尾追加：父数组不存在时报错，不能补建中间对象、建成键为 "-" 的对象
+            const append = key === '-';
+            let target = root;
+            for (const token of tokens.slice(0, -1)) {
+                if (target[token] === null || typeof target[token] !== 'object') {
+                    if (op === 'd' || append) throw new Error('path not found');
+                    target[token] = {};
+                }
+                target = target[token];
+            }
+            if (append && !Array.isArray(target)) throw new Error('array not found');
+
+            if (op === 'd') {
+                if (Array.isArray(target)) target.splice(Number(key), 1);
+                else delete target[key];
+            } else if (op === 'a' && Array.isArray(target)) {
+                if (key === '-') target.push(clone(value));
+                else target.splice(Number(key), 0, clone(value));
+            } else {
+                // 属性可能是 getter（如 codegen 生成的惰性环境），先重新定义为数据属性
+                const desc = Object.getOwnPropertyDescriptor(target, key);
+                if (desc && !('value' in desc) && desc.configurable) {
+                    Object.defineProperty(target, key, {
+                        value: clone(value), writable: true, configurable: true, enumerable: true
+                    });
+                } else {
+                    target[key] = clone(value);
+                }
+            }
+            applied++;
+        } catch (e) {
+            failed.push({ op, path: pointer, error: e.message });
+        }
+    }
+
+    return { applied, skipped, failed };
+}